@@ -1,17 +1,49 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from . import autocomplete, loans
 from .models import Author, Genre, Book, BookInstance, Language
+from .pagination import EstimatedCountPaginator
 
-admin.site.register(Genre)
-admin.site.register(Language)
+# Сколько отклонённых экземпляров перечислять в сообщении админки
+MAX_REPORTED_REJECTIONS = 20
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    """Жанры: поиск нужен для автодополнения в книгах"""
+    search_fields = ('name',)
+
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    """Языки: поиск нужен для автодополнения в книгах"""
+    search_fields = ('name',)
+
+
+class PrefixAutocompleteMixin:
+    """Автодополнение админки (autocomplete_fields других моделей) через поиск
+    по началу строки из catalog/autocomplete.py: диапазон по индексу вместо
+    icontains по всей таблице. Поиск в списке объектов остаётся прежним.
+    """
+    autocomplete_lookup = None
+
+    def get_search_results(self, request, queryset, search_term):
+        match = request.resolver_match
+        if match is None or match.url_name != 'autocomplete':
+            return super().get_search_results(request, queryset, search_term)
+        return self.autocomplete_lookup(search_term, queryset), False
 
 
 class BooksInline(admin.TabularInline):
     """Определяет формат встроенной вставки книги (используется в AuthorAdmin)"""
     model = Book
+    autocomplete_fields = ['genre', 'language']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('language').prefetch_related('genre')
 
 
 @admin.register(Author)
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     """Объект администрирования для авторских моделей.
     Определяет:
     - поля, которые будут отображаться в виде списка (list_display)
@@ -23,14 +55,23 @@ class AuthorAdmin(admin.ModelAdmin):
                     'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
     inlines = [BooksInline]
+    search_fields = ('last_name', 'first_name')
+    autocomplete_lookup = staticmethod(autocomplete.authors)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class BooksInstanceInline(admin.TabularInline):
     """Определяет формат вставки встроенного экземпляра книги (используется в BookAdmin)"""
     model = BookInstance
+    autocomplete_fields = ['borrower']
 
+    def get_queryset(self, request):
+        # __str__ экземпляра выводит название книги
+        return super().get_queryset(request).select_related('book', 'borrower')
 
-class BookAdmin(admin.ModelAdmin):
+
+class BookAdmin(PrefixAutocompleteMixin, admin.ModelAdmin):
     """
     Объект администрирования для книжных моделей.
     Определяет:
@@ -38,12 +79,55 @@ class BookAdmin(admin.ModelAdmin):
     - добавляет встроенное добавление экземпляров книги в просмотр книги (inlines)
     """
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
     inlines = [BooksInstanceInline]
+    search_fields = ('title', 'isbn')
+    autocomplete_lookup = staticmethod(autocomplete.books)
+    autocomplete_fields = ['author', 'genre', 'language']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # display_genre берёт жанры из prefetch, а не запросом на строку
+        return super().get_queryset(request).prefetch_related('genre')
 
 
 admin.site.register(Book, BookAdmin)
 
 
+def report_bulk_result(modeladmin, request, result):
+    """Сообщает итог массовой операции и причины отказа по строкам."""
+    if result.updated:
+        modeladmin.message_user(request, 'Updated %d copies.' % len(result.updated), messages.SUCCESS)
+    if result.rejected:
+        lines = ['%s: %s' % (pk, reason) for pk, reason in list(result.rejected.items())[:MAX_REPORTED_REJECTIONS]]
+        if len(result.rejected) > MAX_REPORTED_REJECTIONS:
+            lines.append('... and %d more' % (len(result.rejected) - MAX_REPORTED_REJECTIONS))
+        modeladmin.message_user(request, 'Rejected %d copies: %s' % (len(result.rejected), '; '.join(lines)),
+                                messages.WARNING)
+
+
+@admin.action(description='Mark selected copies as returned', permissions=['change'])
+def mark_returned(modeladmin, request, queryset):
+    report_bulk_result(modeladmin, request, loans.mark_returned(queryset.values_list('pk', flat=True)))
+
+
+def renew_action(weeks):
+    def action(modeladmin, request, queryset):
+        report_bulk_result(modeladmin, request, loans.renew(queryset.values_list('pk', flat=True), weeks))
+
+    action.__name__ = 'renew_%d_weeks' % weeks
+    return admin.action(description='Renew selected copies by %d week(s)' % weeks, permissions=['change'])(action)
+
+
+def set_status_action(status, label):
+    def action(modeladmin, request, queryset):
+        report_bulk_result(modeladmin, request, loans.set_status(queryset.values_list('pk', flat=True), status))
+
+    action.__name__ = 'set_status_%s' % status
+    return admin.action(description='Set status of selected copies: %s' % label, permissions=['change'])(action)
+
+
 @admin.register(BookInstance)
 class BookInstanceAdmin(admin.ModelAdmin):
     """Объект администрирования для моделей BookInstance.
@@ -54,6 +138,12 @@ class BookInstanceAdmin(admin.ModelAdmin):
     """
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    list_select_related = ('book', 'borrower')
+    autocomplete_fields = ['book', 'borrower']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = [mark_returned] + [renew_action(weeks) for weeks in (1, 2, 3, 4)] \
+        + [set_status_action(status, label) for status, label in BookInstance.LOAN_STATUS if status != 'o']
 
     fieldsets = (
         (None, {
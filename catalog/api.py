@@ -0,0 +1,209 @@
+"""JSON API каталога только для чтения (для киосков).
+
+Строки сериализуются прямо из queryset.values(), без создания экземпляров
+моделей. Параметры списков:
+
+- fields=id,title - только перечисленные поля;
+- cursor= - курсор следующей или предыдущей страницы из ответа;
+- limit= - размер страницы, не больше max_page_size.
+
+Связанные объекты (автор, жанры, книга экземпляра) встраиваются одним
+дополнительным запросом на связь для всей страницы, поэтому число запросов
+не зависит от её размера.
+"""
+from django.http import JsonResponse
+from django.views import View
+
+from . import autocomplete
+from .models import Author, Book, BookInstance
+from .pagination import InvalidCursor, keyset_fields, paginate
+
+
+class ApiError(Exception):
+    pass
+
+
+class ApiListView(View):
+    """Курсорный список строк values() модели.
+
+    columns - {поле ответа: поле ORM}; для встраиваемых полей это поле-ключ,
+    по которому embed_<поле>() дополняет строки страницы.
+    """
+    model = None
+    columns = {}
+    default_fields = ()
+    paginate_by = 20
+    max_page_size = 100
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def get_fields(self):
+        if not self.request.GET.get('fields'):
+            return list(self.default_fields)
+        fields = [name.strip() for name in self.request.GET['fields'].split(',') if name.strip()]
+        unknown = [name for name in fields if name not in self.columns]
+        if unknown:
+            raise ApiError('Unknown fields: %s' % ', '.join(unknown))
+        return list(dict.fromkeys(fields))
+
+    def get_page_size(self):
+        try:
+            limit = int(self.request.GET.get('limit') or self.paginate_by)
+        except ValueError:
+            raise ApiError('Invalid limit')
+        return max(1, min(limit, self.max_page_size))
+
+    def get_int_param(self, name):
+        value = self.request.GET.get(name)
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ApiError('Invalid %s' % name)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            fields = self.get_fields()
+            page_size = self.get_page_size()
+            keys = keyset_fields(self.model)
+            queryset = self.get_queryset().values(*dict.fromkeys([self.columns[name] for name in fields] + keys))
+            page = paginate(queryset, request.GET.get('cursor'), page_size, keys)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+        rows = page.object_list
+        results = [{name: row[self.columns[name]] for name in fields} for row in rows]
+        for name in fields:
+            embed = getattr(self, 'embed_%s' % name, None)
+            if embed:
+                embed(results, name)
+        return JsonResponse({'results': results, 'next': page.next_cursor, 'previous': page.previous_cursor})
+
+
+class BookListApi(ApiListView):
+    """Книги с автором и жанрами"""
+    model = Book
+    columns = {
+        'id': 'id',
+        'title': 'title',
+        'isbn': 'isbn',
+        'summary': 'summary',
+        'language': 'language__name',
+        'author': 'author_id',
+        'genres': 'id',
+        'copies_total': 'copies_total',
+        'copies_available': 'copies_available',
+    }
+    default_fields = ('id', 'title', 'author', 'genres')
+
+    def get_queryset(self):
+        queryset = Book.objects.all()
+        author_id = self.get_int_param('author')
+        if author_id is not None:
+            queryset = queryset.filter(author_id=author_id)
+        return queryset
+
+    def embed_author(self, results, name):
+        authors = {author['id']: author for author in Author.objects.filter(
+            pk__in={row[name] for row in results} - {None}).values('id', 'first_name', 'last_name')}
+        for row in results:
+            row[name] = authors.get(row[name])
+
+    def embed_genres(self, results, name):
+        genres = {}
+        for book_id, genre_id, genre_name in Book.genre.through.objects \
+                .filter(book_id__in=[row[name] for row in results]) \
+                .order_by('genre__name').values_list('book_id', 'genre_id', 'genre__name'):
+            genres.setdefault(book_id, []).append({'id': genre_id, 'name': genre_name})
+        for row in results:
+            row[name] = genres.get(row[name], [])
+
+
+class AuthorListApi(ApiListView):
+    """Авторы"""
+    model = Author
+    columns = {
+        'id': 'id',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'date_of_birth': 'date_of_birth',
+        'date_of_death': 'date_of_death',
+    }
+    default_fields = ('id', 'first_name', 'last_name')
+
+
+class CopyListApi(ApiListView):
+    """Экземпляры книг (без сведений о читателях)"""
+    model = BookInstance
+    columns = {
+        'id': 'id',
+        'book': 'book_id',
+        'imprint': 'imprint',
+        'status': 'status',
+        'due_back': 'due_back',
+    }
+    default_fields = ('id', 'book', 'status', 'due_back')
+
+    def get_queryset(self):
+        queryset = BookInstance.objects.all()
+        book_id = self.get_int_param('book')
+        if book_id is not None:
+            queryset = queryset.filter(book_id=book_id)
+        if self.request.GET.get('status'):
+            queryset = queryset.filter(status__exact=self.request.GET['status'])
+        return queryset
+
+    def embed_book(self, results, name):
+        books = dict(Book.objects.filter(pk__in={row[name] for row in results} - {None}).values_list('id', 'title'))
+        for row in results:
+            row[name] = {'id': row[name], 'title': books[row[name]]} if row[name] in books else None
+
+
+class AvailabilityApi(View):
+    """Число экземпляров по книгам из счётчиков книг: ?book=1,2,3"""
+    max_books = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            book_ids = [int(pk) for pk in request.GET.get('book', '').split(',') if pk.strip()]
+        except ValueError:
+            return JsonResponse({'error': 'Invalid book id'}, status=400)
+        if not book_ids or len(book_ids) > self.max_books:
+            return JsonResponse({'error': 'Pass 1-%d book ids in ?book=' % self.max_books}, status=400)
+
+        counts = {pk: (total, available, on_loan) for pk, total, available, on_loan
+                  in Book.objects.filter(pk__in=book_ids).order_by()
+                  .values_list('id', 'copies_total', 'copies_available', 'copies_on_loan')}
+        results = [dict(zip(('book', 'total', 'available', 'on_loan'), (pk,) + counts.get(pk, (0, 0, 0))))
+                   for pk in dict.fromkeys(book_ids)]
+        return JsonResponse({'results': results})
+
+
+class AutocompleteApi(View):
+    """Автодополнение для виджетов форм: ?q=начало -> {'results': [{'id', 'text'}], 'more': true/false}"""
+    lookup = None
+    columns = ()
+    label = ''
+
+    def get(self, request, *args, **kwargs):
+        rows, more = autocomplete.search(self.lookup(request.GET.get('q', '')).values_list(*self.columns))
+        return JsonResponse({'results': [{'id': row[0], 'text': self.label.format(*row)} for row in rows],
+                             'more': more})
+
+
+class AuthorAutocompleteApi(AutocompleteApi):
+    """Авторы по началу фамилии и имени"""
+    lookup = staticmethod(autocomplete.authors)
+    columns = ('id', 'last_name', 'first_name')
+    label = '{1}, {2}'
+
+
+class BookAutocompleteApi(AutocompleteApi):
+    """Книги по началу названия или ISBN"""
+    lookup = staticmethod(autocomplete.books)
+    columns = ('id', 'title', 'isbn')
+    label = '{1} ({2})'
@@ -0,0 +1,59 @@
+"""Автодополнение авторов и книг для форм каталога и админки.
+
+Поиск идёт по началу строки без учёта регистра: условие
+lower(поле) >= 'smi' AND lower(поле) < 'smj' - это диапазон по индексу
+на lower(поле) (Meta.indexes моделей), в отличие от LIKE/ILIKE, которым
+нужен полный просмотр таблицы или отдельный класс операторов. Каждый
+поиск - один запрос на limit + 1 строк в порядке индекса.
+
+На SQLite lower() меняет регистр только у латиницы, поэтому кириллические
+префиксы там ищутся с учётом регистра.
+"""
+import re
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Author, Book
+
+LIMIT = 20
+
+_ISBN = re.compile(r'^[\d-]+$')
+
+
+def prefix_range(field, prefix):
+    """Условия filter() "field начинается с prefix": поле >= prefix и < следующей строки."""
+    return {field + '__gte': prefix, field + '__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+
+def authors(term, queryset=None):
+    """Авторы по началу фамилии, а после запятой или пробела - и имени: 'smi, jo' или 'smi jo'."""
+    parts = term.replace(',', ' ').lower().split(None, 1)
+    queryset = (Author.objects.all() if queryset is None else queryset) \
+        .annotate(last=Lower('last_name'), first=Lower('first_name'))
+    if parts:
+        queryset = queryset.filter(**prefix_range('last', parts[0]))
+    if len(parts) > 1:
+        queryset = queryset.filter(**prefix_range('first', parts[1].strip()))
+    return queryset.order_by('last', 'first')
+
+
+def books(term, queryset=None):
+    """Книги по началу названия, а если введены только цифры и дефисы - ещё и ISBN ('978-5', '1984')."""
+    term = term.strip()
+    queryset = (Book.objects.all() if queryset is None else queryset) \
+        .annotate(lower_title=Lower('title')).order_by('lower_title')
+    if not term:
+        return queryset
+    condition = Q(**prefix_range('lower_title', term.lower()))
+    if _ISBN.match(term) and term.replace('-', ''):
+        # ISBN уникален, значит уже проиндексирован; при частом префиксе ISBN
+        # база идёт по индексу названий, при редком - сортирует найденное
+        condition |= Q(**prefix_range('isbn', term.replace('-', '')))
+    return queryset.filter(condition)
+
+
+def search(queryset, limit=LIMIT):
+    """Первые limit строк и признак того, что есть ещё (один запрос)."""
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,172 @@
+"""Замеры числа SQL-запросов, времени и памяти для представлений каталога."""
+import math
+import statistics
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.db.models import Count, Q
+from django.urls import resolve, reverse
+
+from . import seeding
+from .models import Author, Book, BookInstance
+
+Fixture = namedtuple('Fixture', ['librarian', 'book', 'author', 'loan'])
+Target = namedtuple('Target', ['url_name', 'url', 'paginated'])
+Measurement = namedtuple('Measurement', ['url_name', 'page_size', 'status_code', 'queries', 'seconds', 'peak_memory'])
+HttpResult = namedtuple('HttpResult', ['url', 'requests', 'errors', 'per_second', 'p50', 'p99'])
+
+# (url name, функция, возвращающая аргументы reverse по фикстуре[, строка запроса или функция фикстуры])
+URLS = (
+    ('index', lambda f: []),
+    ('books', lambda f: []),
+    ('book-detail', lambda f: [f.book.pk]),
+    ('authors', lambda f: []),
+    ('author-detail', lambda f: [f.author.pk]),
+    ('my-borrowed', lambda f: []),
+    ('all-borrowed', lambda f: []),
+    ('renew-book-librarian', lambda f: [f.loan.pk]),
+    ('author-create', lambda f: []),
+    ('author-update', lambda f: [f.author.pk]),
+    ('author-delete', lambda f: [f.author.pk]),
+    ('book-create', lambda f: []),
+    ('book-update', lambda f: [f.book.pk]),
+    ('book-delete', lambda f: [f.book.pk]),
+    ('search', lambda f: [], '?q=the'),
+    ('api-books', lambda f: []),
+    ('api-authors', lambda f: []),
+    ('api-copies', lambda f: [], '?fields=id,book,status'),
+    ('api-availability', lambda f: [], lambda f: '?book=%s' % f.book.pk),
+)
+
+
+def seed_catalog(num_instances):
+    """Заполняет базу каталогом из num_instances экземпляров книг (seeding.seed).
+
+    Книги, экземпляры и выдачи распределены по закону Ципфа, поэтому самая
+    популярная книга и самый плодовитый автор растут вместе с размером
+    набора, и N+1 на страницах деталей видно при сравнении размеров.
+    """
+    num_books = max(10, num_instances // 20)
+    seeding.seed(authors=max(5, num_books // 10), books=num_books, copies=num_instances,
+                 users=max(1, num_books // 2))
+
+    # библиотекарь - читатель с наибольшим числом выдач
+    librarian = User.objects.annotate(loans=Count('bookinstance', filter=Q(bookinstance__status__exact='o'))) \
+        .order_by('-loans', 'pk').first()
+    librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+
+    return Fixture(librarian=librarian,
+                   book=Book.objects.order_by('-copies_total', 'pk').first(),
+                   author=Author.objects.annotate(books=Count('book')).order_by('-books', 'pk').first(),
+                   loan=BookInstance.objects.filter(status__exact='o', borrower=librarian).first())
+
+
+def targets(fixture):
+    """Список замеряемых URL каталога."""
+    result = []
+    for url_name, args, *query in URLS:
+        path = reverse(url_name, args=args(fixture))
+        view_class = getattr(resolve(path).func, 'view_class', None)
+        query = ''.join(part(fixture) if callable(part) else part for part in query)
+        result.append(Target(url_name, path + query, getattr(view_class, 'paginate_by', None) is not None))
+    return result
+
+
+@contextmanager
+def page_size(url, size):
+    """Временно меняет paginate_by у представления, обслуживающего url."""
+    view_class = resolve(url.split('?')[0]).func.view_class
+    original = view_class.__dict__.get('paginate_by')
+    view_class.paginate_by = size
+    try:
+        yield
+    finally:
+        if original is None:
+            del view_class.paginate_by
+        else:
+            view_class.paginate_by = original
+
+
+class QueryCounter:
+    """Считает SQL-запросы через connection.execute_wrapper.
+
+    CaptureQueriesContext не подходит: request_started сбрасывает
+    connection.queries посреди запроса тестового клиента.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(client, target, repeat=1, size=None):
+    """Замеряет один URL: число запросов, медианное время и пик памяти."""
+    context = page_size(target.url, size) if size else nullcontext()
+    with context:
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            response = client.get(target.url)
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(target.url)
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            client.get(target.url)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return Measurement(target.url_name, size, response.status_code, queries.count,
+                       statistics.median(timings) if timings else 0.0, peak_memory)
+
+
+def find_growth(measurements):
+    """Возвращает URL, у которых число запросов зависит от размера данных или страницы."""
+    counts = {}
+    for measurement in measurements:
+        counts.setdefault(measurement.url_name, set()).add(measurement.queries)
+    return sorted(url_name for url_name, values in counts.items() if len(values) > 1)
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу: percentile(timings, 0.99)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def load_url(url, requests, concurrency, headers=None, timeout=10):
+    """Отправляет requests GET-запросов на url из concurrency потоков.
+
+    Ошибкой считается исключение или код ответа 400 и выше; время
+    учитывается только у успешных запросов.
+    """
+    def fetch(_):
+        start = time.perf_counter()
+        try:
+            request = urllib.request.Request(url, headers=headers or {})
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except (urllib.error.URLError, OSError):
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = list(executor.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - start
+    ok = [timing for timing in timings if timing is not None]
+    return HttpResult(url, requests, requests - len(ok), len(ok) / elapsed if elapsed else 0.0,
+                      percentile(ok, 0.5), percentile(ok, 0.99))
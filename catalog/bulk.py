@@ -0,0 +1,36 @@
+"""Массовая вставка строк: COPY на PostgreSQL, bulk_create на остальных базах."""
+import csv
+import io
+
+from django.db import connections, router
+
+BATCH_SIZE = 5000
+
+
+def insert(model, objects, using=None):
+    """Вставляет несохранённые объекты модели одной операцией.
+
+    Сигналы не посылаются, как и у bulk_create. Первичные ключи должны быть
+    заданы заранее (UUID) либо не нужны вызывающему коду.
+    """
+    if not objects:
+        return
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        model.objects.using(using).bulk_create(objects, batch_size=BATCH_SIZE)
+        return
+
+    fields = [field for field in model._meta.concrete_fields
+              if not (field.primary_key and getattr(objects[0], field.attname) is None)]
+    buffer = io.StringIO()
+    # строки в кавычках, пустое значение без кавычек - NULL
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC)
+    for obj in objects:
+        writer.writerow([field.get_db_prep_save(field.pre_save(obj, add=True), connection) for field in fields])
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = 'COPY %s (%s) FROM STDIN WITH (FORMAT csv)' % (
+        quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields))
+    with connection.cursor() as cursor:
+        cursor.copy_expert(sql, buffer)
@@ -0,0 +1,199 @@
+"""Кэш страниц каталога с инвалидацией по тегам.
+
+Каждая запись хранит версии тегов, от которых она зависит. Сигналы моделей
+(catalog/signals.py) после коммита транзакции увеличивают версии тегов
+изменённых объектов, и запись с устаревшей версией хотя бы одного тега
+считается промахом. Глобальной очистки нет - сбрасываются только записи
+затронутых объектов.
+
+Теги:
+
+- 'book-list', 'author-list' - состав и порядок списков;
+- 'book:<pk>' - страница книги (книга, её автор, язык, жанры, экземпляры);
+- 'author:<pk>' - страница автора (автор, его книги и их экземпляры);
+- 'catalog' - все записи сразу, для массовых изменений без сигналов.
+
+Версии тегов снимаются до построения страницы, поэтому изменение,
+закоммиченное во время рендеринга, не попадёт в кэш под новой версией.
+
+ConditionalGetMixin отвечает 304 браузерам и CDN по ETag/Last-Modified,
+которые строятся по полям updated_at моделей каталога.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+PREFIX = 'catalog'
+GLOBAL_TAG = 'catalog'
+
+# Имена страниц, для которых собирается статистика
+NAMES = ('books', 'book-detail', 'authors', 'author-detail')
+
+# Заголовки ответа, которые сохраняются вместе с содержимым страницы
+STORED_HEADERS = ('Content-Type', 'Content-Language')
+
+
+def timeout():
+    """Время жизни записей в секундах; 0 отключает кэш."""
+    return getattr(settings, 'CATALOG_PAGE_CACHE_TIMEOUT', 0)
+
+
+def _tag_key(tag):
+    return '%s:tag:%s' % (PREFIX, tag)
+
+
+def versions(tags):
+    """Текущие версии тегов одним обращением к кэшу."""
+    tags = [GLOBAL_TAG] + [tag for tag in tags if tag != GLOBAL_TAG]
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        # Начальная версия от времени: если тег вытеснен из кэша, старые
+        # записи с ним не станут снова актуальными
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+        found[key] = version
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _bump(tags):
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            # тега нет в кэше - от него не зависит ни одна запись
+            pass
+
+
+def invalidate(*tags):
+    """Сбрасывает записи, зависящие от тегов, после коммита транзакции."""
+    tags = set(tags)
+    if tags:
+        transaction.on_commit(lambda: _bump(tags))
+
+
+def lookup(key, tag_versions):
+    """Значение записи, если версии её тегов совпадают с tag_versions."""
+    entry = cache.get(key)
+    if entry is None or entry['versions'] != tag_versions:
+        return None
+    return entry['value']
+
+
+def store(key, value, tag_versions):
+    """Сохраняет запись после коммита транзакции, в которой она построена."""
+    entry = {'versions': tag_versions, 'value': value}
+    transaction.on_commit(lambda: cache.set(key, entry, timeout()))
+
+
+def record(name, hit):
+    """Увеличивает счётчик попаданий или промахов."""
+    key = '%s:stats:%s:%s' % (PREFIX, name, 'hits' if hit else 'misses')
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def stats(names=NAMES):
+    """Попадания и промахи: {имя: {'hits': ..., 'misses': ...}}."""
+    keys = {'%s:stats:%s:%s' % (PREFIX, name, kind): (name, kind) for name in names for kind in ('hits', 'misses')}
+    values = cache.get_many(keys)
+    result = {name: {'hits': 0, 'misses': 0} for name in names}
+    for key, (name, kind) in keys.items():
+        result[name][kind] = values.get(key, 0)
+    return result
+
+
+def reset_stats(names=NAMES):
+    cache.delete_many(['%s:stats:%s:%s' % (PREFIX, name, kind) for name in names for kind in ('hits', 'misses')])
+
+
+def page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return '%s:page:%s:%s' % (PREFIX, request.method, path)
+
+
+class CachedPageMixin:
+    """Кэширует страницу для анонимных GET-запросов.
+
+    Теги, от которых зависит страница, возвращает get_cache_tags(); они
+    должны определяться по URL, без запросов к базе.
+    """
+    cache_name = None
+
+    def get_cache_tags(self):
+        return []
+
+    def dispatch(self, request, *args, **kwargs):
+        if not timeout() or request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        key = page_key(request)
+        tag_versions = versions(self.get_cache_tags())
+        page = lookup(key, tag_versions)
+        record(self.cache_name, page is not None)
+        if page is not None:
+            content, headers = page
+            response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        if response.status_code == 200 and not response.streaming and not response.cookies:
+            headers = {header: response[header] for header in STORED_HEADERS if header in response}
+            store(key, (response.content, headers), tag_versions)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class ConditionalGetMixin:
+    """Отвечает 304 на If-None-Match/If-Modified-Since до построения страницы.
+
+    get_validators() одним запросом возвращает (версия, время изменения);
+    версия None - объекта нет, запрос обрабатывается как обычно. Без времени
+    изменения (списки, где его не видно после удаления строк) ответ
+    проверяется только по ETag.
+    """
+
+    def get_validators(self):
+        return None, None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        version, last_modified = self.get_validators()
+        if version is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        # страница зависит и от пользователя (боковая панель)
+        user = request.user
+        etag = quote_etag(hashlib.md5(
+            ('%s:%s:%s' % (version, user.pk or '', request.get_full_path())).encode()).hexdigest())
+        timestamp = None
+        if last_modified:
+            if user.is_authenticated and user.last_login:
+                last_modified = max(last_modified, user.last_login)
+            timestamp = int(last_modified.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if timestamp and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(timestamp)
+        response.headers.setdefault('ETag', etag)
+        # браузер должен перепроверять страницу, а не показывать её по эвристике
+        patch_cache_control(response, no_cache=True, private=user.is_authenticated or None)
+        return response
@@ -0,0 +1,57 @@
+"""Проверки Django для каталога."""
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.template.utils import get_app_template_dirs
+
+# src/href тегов, загружающих ресурс, с абсолютным адресом (http://, https://, //)
+EXTERNAL_ASSET = re.compile(
+    r'<(?:link|script|img|source|iframe)\b[^>]*?\b(?:src|href)\s*=\s*["\']((?:https?:)?//[^"\']+)', re.I)
+
+
+def template_dirs():
+    dirs = [Path(path) for engine in settings.TEMPLATES for path in engine.get('DIRS', [])]
+    return dirs + [Path(path) for path in get_app_template_dirs('templates')]
+
+
+@register(Tags.staticfiles, Tags.templates)
+def check_external_assets(app_configs, **kwargs):
+    """Шаблоны не должны загружать CSS/JS/картинки с внешних серверов.
+
+    Закрытая сеть не пропускает такие запросы, и страница ждёт их до таймаута.
+    Проверка с тегом staticfiles выполняется перед collectstatic.
+    """
+    errors = []
+    for directory in template_dirs():
+        for path in sorted(directory.rglob('*.html')):
+            text = path.read_text(encoding='utf-8', errors='replace')
+            for match in EXTERNAL_ASSET.finditer(text):
+                line = text.count('\n', 0, match.start()) + 1
+                errors.append(Error(
+                    'Template references external asset %s' % match.group(1),
+                    hint='Vendor the file under catalog/static and use {% static %}.',
+                    obj='%s:%d' % (path, line),
+                    id='catalog.E001',
+                ))
+    return errors
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш страниц каталога требует кэша, общего для всех процессов.
+
+    Версии тегов (catalog/caching.py) хранятся в кэше: с LocMemCache
+    инвалидация в одном воркере или в management-команде не видна
+    остальным воркерам, и они отдают устаревшие страницы.
+    """
+    if getattr(settings, 'CATALOG_PAGE_CACHE_TIMEOUT', 0) and isinstance(caches['default'], LocMemCache):
+        return [Error(
+            'CATALOG_PAGE_CACHE_TIMEOUT is set but the default cache is process-local (LocMemCache).',
+            hint='Set CACHE_URL to a Redis, Memcached or database cache, or set CATALOG_PAGE_CACHE_TIMEOUT = 0.',
+            id='catalog.E002',
+        )]
+    return []
@@ -0,0 +1,112 @@
+"""Материализованные счётчики каталога.
+
+Общие счётчики домашней страницы хранятся в CatalogCounter, число
+экземпляров каждой книги по статусам - в полях Book.copies_*. Там же
+хранятся версии списков книг и авторов для ETag: они увеличиваются при
+каждом изменении, видном в списке.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Author, Book, BookInstance, CatalogCounter
+
+BOOKS = 'books'
+INSTANCES = 'instances'
+INSTANCES_AVAILABLE = 'instances_available'
+AUTHORS = 'authors'
+
+NAMES = (BOOKS, INSTANCES, INSTANCES_AVAILABLE, AUTHORS)
+
+BOOK_LIST_VERSION = 'book_list_version'
+AUTHOR_LIST_VERSION = 'author_list_version'
+
+
+def compute():
+    """Точные значения счётчиков по таблицам каталога (четыре COUNT(*))."""
+    return {
+        BOOKS: Book.objects.count(),
+        INSTANCES: BookInstance.objects.count(),
+        INSTANCES_AVAILABLE: BookInstance.objects.filter(status__exact='a').count(),
+        AUTHORS: Author.objects.count(),
+    }
+
+
+def rebuild(dry_run=False):
+    """Пересчитывает счётчики и возвращает расхождения {имя: (было, стало)}."""
+    stored = dict(CatalogCounter.objects.values_list('name', 'value'))
+    actual = compute()
+    drift = {name: (stored.get(name), value) for name, value in actual.items() if stored.get(name) != value}
+    if not dry_run:
+        for name, value in actual.items():
+            CatalogCounter.objects.update_or_create(name=name, defaults={'value': value})
+    return drift
+
+
+def read(names=NAMES):
+    """Счётчики names одним запросом; если каких-то нет, все пересчитываются."""
+    counters = dict(CatalogCounter.objects.filter(name__in=names).values_list('name', 'value'))
+    if any(name not in counters for name in names):
+        rebuild()
+        counters = {name: value for name, value in compute().items() if name in names}
+    return counters
+
+
+def add(**deltas):
+    """Атомарно изменяет счётчики на deltas, например add(books=1)."""
+    for name, delta in deltas.items():
+        if delta and not CatalogCounter.objects.filter(name=name).update(value=F('value') + delta):
+            # строки счётчика нет (например, после flush) - пересчитать всё
+            rebuild()
+            return
+
+
+def list_version(version, counter):
+    """Версия списка и число его строк одним запросом - для ETag без COUNT(*) по таблице."""
+    values = dict(CatalogCounter.objects.filter(name__in=[version, counter]).values_list('name', 'value'))
+    return '%s:%s' % (values.get(version, 0), values.get(counter))
+
+
+def bump(*names):
+    """Увеличивает версии names; отсутствующие версии создаются."""
+    for name in names:
+        if not CatalogCounter.objects.filter(name=name).update(value=F('value') + 1):
+            CatalogCounter.objects.get_or_create(name=name, defaults={'value': 1})
+
+
+# Поле книги: статус экземпляров (None - все экземпляры)
+BOOK_COPIES = {
+    'copies_total': None,
+    'copies_available': 'a',
+    'copies_on_loan': 'o',
+}
+
+
+def _book_copies(status):
+    """Подзапрос: число экземпляров внешней книги с данным статусом."""
+    copies = BookInstance.objects.filter(book=OuterRef('pk'))
+    if status:
+        copies = copies.filter(status__exact=status)
+    return Coalesce(Subquery(copies.order_by().values('book').annotate(count=Count('pk')).values('count')), 0)
+
+
+def book_copies_drift(book_ids=None):
+    """Книги с неверными счётчиками экземпляров: {id: (хранимые, фактические)}."""
+    books = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    books = books.annotate(**{'actual_' + name: _book_copies(status) for name, status in BOOK_COPIES.items()})
+    mismatch = Q()
+    for name in BOOK_COPIES:
+        mismatch |= ~Q(**{name: F('actual_' + name)})
+    rows = books.filter(mismatch).order_by('pk') \
+        .values_list('pk', *BOOK_COPIES, *['actual_' + name for name in BOOK_COPIES])
+    size = len(BOOK_COPIES)
+    return {pk: (tuple(values[:size]), tuple(values[size:])) for pk, *values in rows}
+
+
+def rebuild_book_copies(book_ids=None, dry_run=False):
+    """Исправляет счётчики экземпляров книг одним UPDATE и возвращает расхождения."""
+    drift = book_copies_drift(book_ids)
+    if drift and not dry_run:
+        Book.objects.filter(pk__in=drift).update(
+            updated_at=timezone.now(), **{name: _book_copies(status) for name, status in BOOK_COPIES.items()})
+    return drift
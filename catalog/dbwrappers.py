@@ -0,0 +1,43 @@
+"""Обёртки SQL-запросов, привязанные к контексту запроса, а не к потоку.
+
+connection.execute_wrapper действует только на соединение текущего потока.
+Под ASGI представление выполняет SQL в потоках sync_to_async, а index - ещё
+и параллельно в нескольких потоках со своими соединениями. Поэтому метрики
+и журнал запросов подключают обёртки через wrap(): список обёрток хранится
+в ContextVar, который asgiref и asyncio копируют во все потоки и задачи
+запроса, а на каждое новое соединение (сигнал connection_created) ставится
+одна постоянная обёртка, вызывающая их.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_wrappers = ContextVar('catalog_execute_wrappers', default=())
+
+
+def dispatch(execute, sql, params, many, context):
+    """Постоянная обёртка соединения: вызывает обёртки текущего контекста."""
+    wrappers = _wrappers.get()
+    # как у execute_wrapper: первая подключённая обёртка - внешняя
+    for wrapper in reversed(wrappers):
+        execute = functools.partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch)
+
+
+@contextmanager
+def wrap(wrapper):
+    """Передаёт wrapper все запросы внутри блока, в каких бы потоках они ни выполнялись."""
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield
+    finally:
+        _wrappers.reset(token)
@@ -0,0 +1,112 @@
+"""Потоковая выгрузка каталога в CSV и JSONL.
+
+Строки читаются через values_list().iterator(), без создания экземпляров
+моделей, и сразу сериализуются, поэтому память не зависит от числа строк.
+"""
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Book, BookInstance
+
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# набор данных: (queryset, [(колонка, поле ORM)])
+DATASETS = {
+    'books': (lambda: Book.objects.all(), [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('isbn', 'isbn'),
+        ('author_id', 'author_id'),
+        ('author_last_name', 'author__last_name'),
+        ('author_first_name', 'author__first_name'),
+        ('language', 'language__name'),
+        ('summary', 'summary'),
+    ]),
+    'copies': (lambda: BookInstance.objects.all(), [
+        ('id', 'id'),
+        ('book_id', 'book_id'),
+        ('title', 'book__title'),
+        ('imprint', 'imprint'),
+        ('status', 'status'),
+        ('due_back', 'due_back'),
+        ('borrower_id', 'borrower_id'),
+    ]),
+    'loans': (lambda: BookInstance.objects.filter(status__exact='o'), [
+        ('id', 'id'),
+        ('book_id', 'book_id'),
+        ('title', 'book__title'),
+        ('isbn', 'book__isbn'),
+        ('borrower_id', 'borrower_id'),
+        ('borrower', 'borrower__username'),
+        ('due_back', 'due_back'),
+    ]),
+}
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def rows(dataset):
+    """Заголовок и кортежи значений набора данных."""
+    queryset, columns = DATASETS[dataset]
+    yield tuple(name for name, _ in columns)
+    yield from queryset().order_by('pk').values_list(*[field for _, field in columns]) \
+        .iterator(chunk_size=CHUNK_SIZE)
+
+
+def _csv_lines(dataset):
+    writer = csv.writer(Echo())
+    for row in rows(dataset):
+        yield writer.writerow(row)
+
+
+def _jsonl_lines(dataset):
+    data = rows(dataset)
+    header = next(data)
+    for row in data:
+        yield json.dumps(dict(zip(header, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _buffered(lines):
+    """Склеивает мелкие строки в куски по BUFFER_SIZE байт."""
+    buffer, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(dataset, file_format='csv', gzip=False):
+    """Байтовые куски выгрузки набора данных в указанном формате."""
+    if dataset not in DATASETS or file_format not in FORMATS:
+        raise KeyError(dataset if dataset not in DATASETS else file_format)
+    lines = _jsonl_lines(dataset) if file_format == 'jsonl' else _csv_lines(dataset)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if gzip else chunks
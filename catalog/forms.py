@@ -1,8 +1,12 @@
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-import datetime
+import uuid
 
 from django import forms
+from django.urls import reverse
+
+from .loans import validate_renewal_date
+from .models import Book
 
 
 class RenewBookForm(forms.Form):
@@ -11,12 +15,76 @@ class RenewBookForm(forms.Form):
         help_text="Enter a date between now and 4 weeks (default 3).")
 
     def clean_renewal_date(self):
-        data = self.cleaned_data['renewal_date']
+        return validate_renewal_date(self.cleaned_data['renewal_date'])
+
+
+class BulkLoanForm(forms.Form):
+    """Форма для библиотекаря для продления или возврата нескольких книг сразу."""
+    RENEW = 'renew'
+    RETURN = 'return'
+    ACTIONS = (
+        (RENEW, 'Renew'),
+        (RETURN, 'Mark returned'),
+    )
+
+    copies = forms.Field(widget=forms.MultipleHiddenInput)
+    action = forms.ChoiceField(choices=ACTIONS)
+    weeks = forms.IntegerField(min_value=1, max_value=4, initial=3, required=False,
+                               help_text="Renew by this many weeks (1-4).")
+
+    def clean_copies(self):
+        try:
+            return [uuid.UUID(value) for value in self.cleaned_data['copies']]
+        except (TypeError, ValueError):
+            raise ValidationError(_('Invalid copy id'))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == self.RENEW and not cleaned_data.get('weeks'):
+            self.add_error('weeks', _('This field is required.'))
+        return cleaned_data
+
+
+class AutocompleteSelect(forms.Select):
+    """Select, в котором отрисован только выбранный вариант.
+
+    Остальные варианты js/autocomplete.js подгружает по мере ввода из
+    url - имени представления автодополнения (catalog/api.py), поэтому
+    страница не зависит от размера таблицы.
+    """
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', field.empty_label or '', not value, 0))
+        selected = [v for v in value if v not in field.empty_values]
+        if selected:
+            key = field.to_field_name or 'pk'
+            for obj in self.choices.queryset.filter(**{key + '__in': selected}):
+                options.append(self.create_option(name, str(getattr(obj, key)), field.label_from_instance(obj),
+                                                  True, len(options)))
+        return [(None, options, 0)]
+
 
-        if data < datetime.date.today():
-            raise ValidationError(_('Invalid date - renewal in past'))
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(
-                _('Invalid date - renewal more than 4 weeks ahead'))
+class BookForm(forms.ModelForm):
+    """Книга: автор выбирается автодополнением, а не списком всех авторов."""
 
-        return data
+    class Meta:
+        model = Book
+        fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language']
+        widgets = {
+            'author': AutocompleteSelect('api-author-autocomplete'),
+        }
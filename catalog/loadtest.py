@@ -0,0 +1,135 @@
+"""Нагрузочный тест: смоделированные читатели и библиотекари против живого сервера.
+
+Каждый виртуальный пользователь - поток со своим набором cookie. Он входит
+через accounts/login (с CSRF-токеном формы) и до конца теста повторяет свой
+сценарий:
+
+- читатель: список книг, случайная книга из списка, свои выдачи;
+- библиотекарь: все выдачи, форма продления случайной выдачи и её отправка.
+
+Каждый запрос записывается под именем URL (books, book-detail, ...), по
+ним считаются пропускная способность и перцентили задержки.
+"""
+import datetime
+import http.cookiejar
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+from django.urls import reverse
+
+from .benchmark import percentile
+
+Sample = namedtuple('Sample', ['url_name', 'seconds', 'ok'])
+Summary = namedtuple('Summary', ['url_name', 'requests', 'errors', 'per_second', 'p50', 'p95', 'p99'])
+
+CSRF_TOKEN = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+BOOK_LINK = re.compile(r'href="(/catalog/book/\d+)"')
+RENEW_LINK = re.compile(r'href="(/catalog/book/[0-9a-f-]{36}/renew/)"')
+
+
+class VirtualUser:
+    """HTTP-клиент одного пользователя; cookie (сессия, CSRF) сохраняются между запросами."""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.samples = []
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, url_name, path, data=None):
+        """Выполняет запрос и записывает замер; возвращает HTML или None при ошибке."""
+        url = self.base_url + path
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        request = urllib.request.Request(url, data=body, headers={'Referer': url})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                content = response.read().decode('utf-8', 'replace')
+        except (urllib.error.URLError, OSError):
+            self.samples.append(Sample(url_name, time.perf_counter() - start, False))
+            return None
+        self.samples.append(Sample(url_name, time.perf_counter() - start, True))
+        return content
+
+    def submit(self, url_name, path, data):
+        """GET формы и POST с её CSRF-токеном (оба запроса под одним именем)."""
+        page = self.request(url_name, path)
+        token = CSRF_TOKEN.search(page or '')
+        if token is None:
+            return None
+        return self.request(url_name, path, {'csrfmiddlewaretoken': token.group(1), **data})
+
+    def login(self, username, password):
+        page = self.submit('login', reverse('login'), {'username': username, 'password': password})
+        if page is None or 'logout' not in page:
+            # неверный пароль - та же форма с кодом 200, но это ошибка
+            if self.samples:
+                self.samples[-1] = self.samples[-1]._replace(ok=False)
+            return False
+        return True
+
+
+def patron(user, rng):
+    """Сценарий читателя."""
+    page = user.request('books', reverse('books'))
+    links = BOOK_LINK.findall(page or '')
+    if links:
+        user.request('book-detail', rng.choice(links))
+    user.request('my-borrowed', reverse('my-borrowed'))
+
+
+def librarian(user, rng):
+    """Сценарий библиотекаря."""
+    page = user.request('all-borrowed', reverse('all-borrowed'))
+    links = RENEW_LINK.findall(page or '')
+    if links:
+        renewal_date = datetime.date.today() + datetime.timedelta(weeks=2)
+        user.submit('renew-book-librarian', rng.choice(links), {'renewal_date': renewal_date.isoformat()})
+
+
+def run(base_url, users, duration, think_time=0.0, seed=0):
+    """Запускает пользователей users = [(сценарий, логин, пароль)] на duration секунд.
+
+    Возвращает (замеры, длительность в секундах).
+    """
+    deadline = time.monotonic() + duration
+    virtual_users = [VirtualUser(base_url) for _ in users]
+
+    def worker(user, number, scenario, username, password):
+        rng = random.Random('%s:%d' % (seed, number))
+        if not user.login(username, password):
+            return
+        while time.monotonic() < deadline:
+            scenario(user, rng)
+            if think_time:
+                time.sleep(rng.uniform(0, 2 * think_time))
+
+    threads = [threading.Thread(target=worker, args=(virtual_users[number], number, *user), daemon=True)
+               for number, user in enumerate(users)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+    return [sample for user in virtual_users for sample in user.samples], elapsed
+
+
+def summarize(samples, elapsed):
+    """Итоги по именам URL: число запросов, ошибки, запросов в секунду, p50/p95/p99."""
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample.url_name, []).append(sample)
+    result = []
+    for url_name, group in sorted(by_name.items()):
+        timings = [sample.seconds for sample in group if sample.ok]
+        result.append(Summary(url_name, len(group), len(group) - len(timings),
+                              len(timings) / elapsed if elapsed else 0.0,
+                              percentile(timings, 0.5), percentile(timings, 0.95), percentile(timings, 0.99)))
+    return result
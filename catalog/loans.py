@@ -0,0 +1,117 @@
+"""Массовые операции библиотекаря с экземплярами книг.
+
+Каждая операция выполняется в одной транзакции: выбранные строки
+блокируются (SELECT ... FOR UPDATE), проверяются по тем же правилам, что и
+RenewBookForm, и подходящие обновляются одним UPDATE ... WHERE id IN (...).
+Отклонённые строки возвращаются с причиной.
+"""
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+
+from .models import BookInstance
+
+MAX_RENEWAL = datetime.timedelta(weeks=4)
+
+
+def validate_renewal_date(value, today=None):
+    """Новая дата возврата не раньше сегодняшней и не дальше четырёх недель."""
+    today = today or datetime.date.today()
+    if value < today:
+        raise ValidationError(_('Invalid date - renewal in past'))
+    if value > today + MAX_RENEWAL:
+        raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+    return value
+
+
+class BulkResult:
+    """Итог массовой операции: обновлённые id и {id: причина} отклонённых."""
+
+    def __init__(self):
+        self.updated = []
+        self.rejected = {}
+
+    def __repr__(self):
+        return '<BulkResult updated=%d rejected=%d>' % (len(self.updated), len(self.rejected))
+
+
+def _update(ids, check, new_status=None, **values):
+    """Блокирует строки, отбирает прошедшие check(row) и обновляет их одним UPDATE.
+
+    check возвращает причину отказа или None.
+    """
+    ids = list(dict.fromkeys(ids))
+    result = BulkResult()
+    with transaction.atomic():
+        rows = {row['id']: row for row in BookInstance.objects.select_for_update().filter(pk__in=ids)
+                .values('id', 'status', 'due_back', 'book_id')}
+        accepted = []
+        for pk in ids:
+            row = rows.get(pk)
+            reason = _('Copy not found') if row is None else check(row)
+            if reason:
+                result.rejected[pk] = reason
+            else:
+                accepted.append(row)
+        if not accepted:
+            return result
+
+        if new_status is not None:
+            values['status'] = new_status
+        # BookInstanceQuerySet.update() сам обновит счётчики, updated_at и кэш
+        BookInstance.objects.filter(pk__in=[row['id'] for row in accepted]).update(**values)
+        result.updated = [row['id'] for row in accepted]
+    return result
+
+
+def _on_loan(row):
+    if row['status'] != 'o':
+        return _('Copy is not on loan')
+    return None
+
+
+def mark_returned(ids):
+    """Возвращает выданные экземпляры: статус 'a', без читателя и срока."""
+    return _update(ids, _on_loan, new_status='a', borrower=None, due_back=None)
+
+
+def renew(ids, weeks, today=None):
+    """Продлевает выданные экземпляры на weeks недель от текущего срока возврата."""
+    delta = datetime.timedelta(weeks=weeks)
+
+    def check(row):
+        reason = _on_loan(row)
+        if reason:
+            return reason
+        if row['due_back'] is None:
+            return _('Copy has no due date')
+        try:
+            validate_renewal_date(row['due_back'] + delta, today)
+        except ValidationError as e:
+            return e.messages[0]
+        return None
+
+    return _update(ids, check, due_back=F('due_back') + delta)
+
+
+def set_status(ids, status):
+    """Устанавливает статус экземплярам; неизвестный статус - ValueError.
+
+    Выдать экземпляр можно только с читателем и сроком возврата, поэтому
+    статус 'o' отклоняется для всех, кроме уже выданных. Остальные статусы,
+    как и mark_returned, снимают читателя и срок.
+    """
+    if status not in dict(BookInstance.LOAN_STATUS):
+        raise ValueError('Unknown status %r' % status)
+    if status == 'o':
+        return _update(ids, _lent_with_borrower, new_status=status)
+    return _update(ids, lambda row: None, new_status=status, borrower=None, due_back=None)
+
+
+def _lent_with_borrower(row):
+    if row['status'] != 'o':
+        return _('A copy can only be lent with a borrower and a due date')
+    return None
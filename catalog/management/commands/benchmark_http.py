@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from catalog import benchmark
+
+
+class Command(BaseCommand):
+    """Сравнение развёртываний (WSGI и ASGI) под одинаковой нагрузкой.
+
+    Каждый адрес каждого сервера получает одно и то же число запросов с
+    одной и той же конкурентностью; выводятся запросы в секунду, p50 и p99.
+    """
+    help = 'Load running servers with concurrent GET requests and report req/s and p50/p99 latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('servers', nargs='+', help='Base URLs, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Path to request, may be repeated (default: /catalog/)')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per path and server')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--cookie', action='append', default=[],
+                            help='Cookie name=value sent with every request, e.g. sessionid=...')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per path before measuring')
+
+    def handle(self, *args, **options):
+        headers = {'Cookie': '; '.join(options['cookie'])} if options['cookie'] else {}
+        self.stdout.write('%-50s %8s %8s %10s %10s' % ('url', 'errors', 'req/s', 'p50 ms', 'p99 ms'))
+        for server in options['servers']:
+            for path in options['paths'] or ['/catalog/']:
+                url = server.rstrip('/') + path
+                if options['warmup']:
+                    benchmark.load_url(url, options['warmup'], options['concurrency'], headers)
+                result = benchmark.load_url(url, options['requests'], options['concurrency'], headers)
+                style = self.style.WARNING if result.errors else self.style.SUCCESS
+                self.stdout.write(style('%-50s %8d %8.1f %10.2f %10.2f' % (
+                    result.url, result.errors, result.per_second, result.p50 * 1000, result.p99 * 1000)))
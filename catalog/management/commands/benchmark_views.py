@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from catalog import benchmark
+
+
+class Command(BaseCommand):
+    """Бенчмарк всех URL каталога на наборах данных разного размера.
+
+    Работает на отдельной тестовой базе и падает, если число SQL-запросов
+    представления растёт вместе с размером данных или страницы.
+    """
+    help = 'Measure SQL queries, wall time and peak memory of every catalog view'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 100000, 1000000],
+                            help='Number of BookInstance rows in each seeded dataset')
+        parser.add_argument('--page-sizes', nargs='+', type=int, default=[10, 50],
+                            help='Page sizes to try on paginated views')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per view')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the benchmark database')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            measurements = []
+            for size in options['sizes']:
+                measurements += self.run_size(size, options['page_sizes'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        growing = benchmark.find_growth(measurements)
+        if growing:
+            raise CommandError('Query count grows with data or page size: %s' % ', '.join(growing))
+        self.stdout.write(self.style.SUCCESS('Query counts are constant for every view'))
+
+    def run_size(self, size, page_sizes, repeat):
+        """Наполняет базу, замеряет все URL и откатывает данные."""
+        measurements = []
+        with transaction.atomic():
+            self.stdout.write('Seeding %d book instances...' % size)
+            fixture = benchmark.seed_catalog(size)
+            client = Client()
+            client.force_login(fixture.librarian)
+            self.stdout.write('%-22s %6s %6s %8s %10s %10s' % ('view', 'page', 'status', 'queries', 'ms', 'peak KiB'))
+            for target in benchmark.targets(fixture):
+                for page_size in (page_sizes if target.paginated else [None]):
+                    result = benchmark.measure(client, target, repeat=repeat, size=page_size)
+                    measurements.append(result)
+                    self.stdout.write('%-22s %6s %6d %8d %10.2f %10.1f' % (
+                        result.url_name, result.page_size or '-', result.status_code, result.queries,
+                        result.seconds * 1000, result.peak_memory / 1024))
+            transaction.set_rollback(True)
+        return measurements
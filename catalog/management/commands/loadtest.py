@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import loadtest
+
+
+class Command(BaseCommand):
+    """Нагрузка смесью читателей и библиотекарей на работающий сервер.
+
+    Читатели входят под учётными записями seed_catalog (patron0000000, ...),
+    библиотекари - под учётными записями из --librarian. Каждый пользователь
+    работает в своём потоке, так что конкурентность = patrons + librarians.
+    """
+    help = 'Simulate logged-in patrons and librarians against a running server and report latency per URL name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('server', help='Base URL, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--patrons', type=int, default=20, help='Concurrent simulated patrons')
+        parser.add_argument('--librarians', type=int, default=2, help='Concurrent simulated librarians')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to run')
+        parser.add_argument('--think-time', type=float, default=0.0,
+                            help='Mean pause in seconds between scenario iterations of a user')
+        parser.add_argument('--patron-prefix', default='patron', help='Username prefix of seeded patrons')
+        parser.add_argument('--patron-count', type=int, default=1000,
+                            help='Patrons are picked from <prefix>0000000 .. <prefix><count - 1>')
+        parser.add_argument('--patron-password', default='patron', help='Password of seeded patrons')
+        parser.add_argument('--librarian', action='append', default=[], metavar='USERNAME:PASSWORD',
+                            help='Librarian account with can_mark_returned, may be repeated')
+        parser.add_argument('--seed', default=0, help='Random seed for user and book choices')
+
+    def handle(self, *args, **options):
+        librarians = [account.partition(':')[::2] for account in options['librarian']]
+        if options['librarians'] and not librarians:
+            raise CommandError('--librarians needs at least one --librarian USERNAME:PASSWORD')
+        if any(not username for username, password in librarians):
+            raise CommandError('--librarian must be USERNAME:PASSWORD')
+
+        users = [(loadtest.patron, '%s%07d' % (options['patron_prefix'], i % max(options['patron_count'], 1)),
+                  options['patron_password']) for i in range(options['patrons'])]
+        users += [(loadtest.librarian, *librarians[i % len(librarians)]) for i in range(options['librarians'])]
+
+        samples, elapsed = loadtest.run(options['server'], users, options['duration'], options['think_time'],
+                                        options['seed'])
+        self.stdout.write('%-22s %8s %8s %8s %10s %10s %10s' % (
+            'url name', 'requests', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+        for row in loadtest.summarize(samples, elapsed):
+            style = self.style.WARNING if row.errors else self.style.SUCCESS
+            self.stdout.write(style('%-22s %8d %8d %8.1f %10.2f %10.2f %10.2f' % (
+                row.url_name, row.requests, row.errors, row.per_second, row.p50 * 1000, row.p95 * 1000,
+                row.p99 * 1000)))
+        total = len(samples)
+        self.stdout.write('%d requests in %.1f s (%.1f req/s)' % (total, elapsed, total / elapsed if elapsed else 0))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from catalog import caching, counters
+
+
+class Command(BaseCommand):
+    """Пересчёт материализованных счётчиков домашней страницы и экземпляров книг."""
+    help = 'Rebuild catalog and per-book copy counters from scratch and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not write')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        drift = counters.rebuild(dry_run=dry_run)
+        for name, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(self.style.WARNING('%s: stored %s, actual %d' % (name, stored, actual)))
+
+        book_drift = counters.rebuild_book_copies(dry_run=dry_run)
+        for pk, (stored, actual) in book_drift.items():
+            self.stdout.write(self.style.WARNING('book %s copies (total, available, on loan): stored %s, actual %s'
+                                                 % (pk, stored, actual)))
+        if book_drift and not dry_run:
+            caching.invalidate(caching.GLOBAL_TAG)
+
+        if not drift and not book_drift:
+            self.stdout.write(self.style.SUCCESS('Counters are up to date'))
+        elif not dry_run:
+            self.stdout.write(self.style.SUCCESS('Rebuilt %d counter(s) and copy counters of %d book(s)'
+                                                 % (len(drift), len(book_drift))))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    """Полная перестройка полнотекстового индекса книг."""
+    help = 'Rebuild the full-text search index of books'
+
+    def handle(self, *args, **options):
+        backend = search.rebuild()
+        if backend == search.BASIC:
+            self.stdout.write(self.style.WARNING('No full-text index on this database, search uses LIKE'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Rebuilt %s search index' % backend))
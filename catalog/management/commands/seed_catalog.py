@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog import seeding
+
+
+class Command(BaseCommand):
+    """Синтетический каталог заданного размера (см. catalog/seeding.py).
+
+    Данные добавляются к уже имеющимся; одинаковые --seed и размеры на
+    одинаковой базе дают одинаковый результат. Читатели получают имена
+    patronNNNNNNN и общий пароль --password.
+    """
+    help = 'Generate a deterministic synthetic catalog with skewed popularity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=10000)
+        parser.add_argument('--books', type=int, default=100000)
+        parser.add_argument('--copies', type=int, default=1000000, help='BookInstance rows')
+        parser.add_argument('--users', type=int, default=10000, help='Borrower accounts')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--skew', type=float, default=1.0,
+                            help='Zipf exponent of authors per book, copies per book and loans per borrower '
+                                 '(0 = uniform)')
+        parser.add_argument('--password', default='patron', help='Password of generated borrowers')
+        parser.add_argument('--batch-size', type=int, default=seeding.bulk.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+
+        def progress(model, count):
+            elapsed = time.monotonic() - start
+            self.stdout.write('%s: %d rows (%.1f s)' % (model._meta.verbose_name_plural, count, elapsed))
+
+        with transaction.atomic():
+            totals = seeding.seed(options['authors'], options['books'], options['copies'], options['users'],
+                                  seed=options['seed'], skew=options['skew'], password=options['password'],
+                                  batch_size=options['batch_size'], progress=progress)
+        elapsed = time.monotonic() - start
+        rows = totals.authors + totals.books + totals.copies + totals.users
+        self.stdout.write(self.style.SUCCESS(
+            'Seeded %d authors, %d books, %d copies and %d users (%.0f rows/min)' % (
+                totals.authors, totals.books, totals.copies, totals.users, rows / elapsed * 60 if elapsed else 0)))
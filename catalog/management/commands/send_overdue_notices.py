@@ -0,0 +1,87 @@
+import datetime
+import time
+from itertools import groupby
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from catalog.models import BookInstance
+
+
+class Command(BaseCommand):
+    """Напоминания читателям о просроченных книгах.
+
+    Просроченные выдачи читаются потоком, по одному письму на читателя со
+    всеми его просроченными книгами. Письма отправляются пачками через одно
+    соединение EMAIL_BACKEND. Отправленные экземпляры помечаются
+    last_notified, поэтому повторный запуск не пишет тем, кому уже напомнили
+    (до истечения --every дней или нового срока возврата).
+    """
+    help = 'Email each borrower one notice listing their overdue books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=7, help='Days before the same loan is reminded again')
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages per send_messages() call')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be sent')
+
+    def overdue_loans(self, today, every):
+        not_notified = Q(last_notified__isnull=True) | Q(last_notified__lt=F('due_back')) \
+            | Q(last_notified__lte=today - datetime.timedelta(days=every))
+        return BookInstance.objects.filter(status__exact='o', due_back__lt=today, borrower__isnull=False) \
+            .filter(not_notified) \
+            .order_by('borrower_id', 'due_back') \
+            .values_list('id', 'borrower_id', 'borrower__username', 'borrower__email', 'book__title', 'due_back') \
+            .iterator(chunk_size=2000)
+
+    @staticmethod
+    def message(username, email, loans, today):
+        lines = ['%s - срок возврата %s (просрочено на %d дн.)' % (title, due_back, (today - due_back).days)
+                 for title, due_back in loans]
+        body = 'Здравствуйте, %s!\n\nПожалуйста, верните в библиотеку:\n\n%s\n' % (username, '\n'.join(lines))
+        return EmailMessage('Просроченные книги', body, to=[email])
+
+    def handle(self, *args, **options):
+        today = datetime.date.today()
+        dry_run = options['dry_run']
+        totals = {'messages': 0, 'copies': 0, 'skipped': 0}
+        connection = None if dry_run else get_connection()
+        batch, batch_copies = [], []
+        start = time.monotonic()
+
+        def flush():
+            if not batch:
+                return
+            if not dry_run:
+                connection.send_messages(batch)
+                # помечаем только то, что действительно ушло
+                BookInstance.objects.filter(pk__in=batch_copies).update(last_notified=today)
+            totals['messages'] += len(batch)
+            totals['copies'] += len(batch_copies)
+            batch.clear()
+            batch_copies.clear()
+
+        if connection is not None:
+            connection.open()
+        try:
+            for (borrower_id, username, email), rows in groupby(self.overdue_loans(today, options['every']),
+                                                                key=lambda row: row[1:4]):
+                rows = list(rows)
+                if not email:
+                    totals['skipped'] += 1
+                    continue
+                batch.append(self.message(username, email, [(row[4], row[5]) for row in rows], today))
+                batch_copies.extend(row[0] for row in rows)
+                if len(batch) >= options['batch_size']:
+                    flush()
+            flush()
+        finally:
+            if connection is not None:
+                connection.close()
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(self.style.SUCCESS('%s %d notices for %d overdue copies, %d borrowers without email '
+                                             '(%.0f messages/s)' % (
+                                                 'Would send' if dry_run else 'Sent', totals['messages'],
+                                                 totals['copies'], totals['skipped'],
+                                                 totals['messages'] / elapsed if elapsed else 0)))
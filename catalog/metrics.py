@@ -0,0 +1,199 @@
+"""Профилирование запросов: заголовок Server-Timing и гистограммы для /metrics.
+
+ServerTimingMiddleware для каждого запроса считает число и время SQL-запросов
+(через dbwrappers.wrap - в том числе запросов из потоков sync_to_async), время рендеринга шаблонов (через бэкенд
+TimedDjangoTemplates) и общее время. Результат отдаётся заголовком
+
+    Server-Timing: db;desc="4 queries";dur=3.1, tpl;dur=5.2, total;dur=11.0
+
+(только INTERNAL_IPS и сотрудникам, как и /metrics: посторонним незачем
+знать, сколько запросов к базе делает страница) и складывается в
+гистограммы по имени представления (book-detail, all-borrowed,
+admin:index, ...). Гистограммы живут в памяти процесса: у
+каждого воркера gunicorn свои, Prometheus собирает их с каждого воркера
+отдельно. Накладные расходы - несколько вызовов perf_counter() на запрос и
+на SQL-запрос.
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+from . import caching, dbwrappers
+from .middleware import HybridMiddleware
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+UNRESOLVED = '<unresolved>'
+
+_timing = ContextVar('catalog_timing', default=None)
+
+
+class RequestTiming:
+    """Замеры одного запроса (SQL может выполняться в нескольких потоках сразу)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.db_seconds += elapsed
+                self.queries += 1
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками view."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, view, value):
+        with self.lock:
+            series = self.series.setdefault(view, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help_text), '# TYPE %s histogram' % self.name]
+        with self.lock:
+            for view, series in sorted(self.series.items()):
+                label = _escape(view)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append('%s_bucket{view="%s",le="%s"} %d' % (self.name, label, bound, count))
+                lines.append('%s_bucket{view="%s",le="+Inf"} %d' % (self.name, label, series['count']))
+                lines.append('%s_sum{view="%s"} %r' % (self.name, label, series['sum']))
+                lines.append('%s_count{view="%s"} %d' % (self.name, label, series['count']))
+        return lines
+
+    def reset(self):
+        with self.lock:
+            self.series.clear()
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('catalog_request_duration_seconds', 'Total request time', DURATION_BUCKETS)
+DB_SECONDS = Histogram('catalog_db_duration_seconds', 'Time spent in SQL per request', DURATION_BUCKETS)
+DB_QUERIES = Histogram('catalog_db_queries', 'SQL queries per request', QUERY_BUCKETS)
+TEMPLATE_SECONDS = Histogram('catalog_template_duration_seconds', 'Template render time per request',
+                             DURATION_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, TEMPLATE_SECONDS)
+
+
+def reset():
+    for histogram in HISTOGRAMS:
+        histogram.reset()
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render()
+    # попадания и промахи кэша страниц (catalog/caching.py)
+    for kind in ('hits', 'misses'):
+        name = 'catalog_cache_%s_total' % kind
+        lines += ['# HELP %s Page cache %s' % (name, kind), '# TYPE %s counter' % name]
+        for cache_name, values in sorted(caching.stats().items()):
+            lines.append('%s{cache="%s"} %d' % (name, _escape(cache_name), values[kind]))
+    return '\n'.join(lines) + '\n'
+
+
+def is_internal(request):
+    """Запрос с INTERNAL_IPS или от сотрудника: ему видны метрики и Server-Timing."""
+    if request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else UNRESOLVED
+
+
+class ServerTimingMiddleware(HybridMiddleware):
+    """Server-Timing и гистограммы по каждому запросу."""
+
+    def call(self, request):
+        timing = RequestTiming()
+        token = _timing.set(timing)
+        start = time.perf_counter()
+        try:
+            with dbwrappers.wrap(timing):
+                response = self.get_response(request)
+        finally:
+            _timing.reset(token)
+        return self.finish(request, response, timing, time.perf_counter() - start)
+
+    async def acall(self, request):
+        timing = RequestTiming()
+        token = _timing.set(timing)
+        start = time.perf_counter()
+        try:
+            with dbwrappers.wrap(timing):
+                response = await self.get_response(request)
+        finally:
+            _timing.reset(token)
+        return self.finish(request, response, timing, time.perf_counter() - start)
+
+    def finish(self, request, response, timing, total):
+        view = view_name(request)
+        REQUEST_SECONDS.observe(view, total)
+        DB_SECONDS.observe(view, timing.db_seconds)
+        DB_QUERIES.observe(view, timing.queries)
+        TEMPLATE_SECONDS.observe(view, timing.template_seconds)
+        if is_internal(request):
+            response['Server-Timing'] = 'db;desc="%d queries";dur=%.1f, tpl;dur=%.1f, total;dur=%.1f' % (
+                timing.queries, timing.db_seconds * 1000, timing.template_seconds * 1000, total * 1000)
+        return response
+
+
+class TimedTemplate:
+    """Шаблон бэкенда, время рендеринга которого учитывается в запросе."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timing = _timing.get()
+        if timing is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timing.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates с замером времени рендеринга ({% include %} не считается дважды)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
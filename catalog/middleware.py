@@ -0,0 +1,34 @@
+"""Основа middleware каталога для синхронной и асинхронной цепочек.
+
+Django вызывает синхронный middleware под ASGI через async_to_sync, а всё,
+что ниже него, - снова через sync_to_async: два перехода между потоками на
+каждый запрос, и асинхронное представление всё равно ждёт поток. Middleware
+с async_capable = True Django вызывает как корутину, если следующий
+обработчик - корутина.
+"""
+import asyncio
+
+
+class HybridMiddleware:
+    """Подкласс реализует call() для синхронной цепочки и acall() для асинхронной."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # так же, как django.utils.deprecation.MiddlewareMixin: экземпляр
+            # становится "корутинной функцией" для asyncio.iscoroutinefunction
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        raise NotImplementedError
+
+    async def acall(self, request):
+        raise NotImplementedError
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.2 on 2026-10-18 07:31
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    Author = apps.get_model('catalog', 'Author')
+    CatalogCounter = apps.get_model('catalog', 'CatalogCounter')
+    CatalogCounter.objects.bulk_create([
+        CatalogCounter(name='books', value=Book.objects.count()),
+        CatalogCounter(name='instances', value=BookInstance.objects.count()),
+        CatalogCounter(name='instances_available', value=BookInstance.objects.filter(status='a').count()),
+        CatalogCounter(name='authors', value=Author.objects.count()),
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.0.2 on 2026-10-18 07:33
+
+from django.db import migrations, models
+
+from catalog.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # На PostgreSQL индексы строятся CONCURRENTLY, без блокировки таблицы
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0002_catalogcounter'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='bookinstance',
+            index=models.Index(fields=['status', 'due_back'], name='bookinstance_status_due_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bookinstance',
+            index=models.Index(fields=['borrower', 'status', 'due_back'], name='bookinstance_borrower_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bookinstance',
+            index=models.Index(condition=models.Q(('status', 'o')), fields=['due_back'], name='bookinstance_on_loan_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bookinstance',
+            index=models.Index(fields=['due_back'], name='bookinstance_due_back_idx'),
+        ),
+    ]
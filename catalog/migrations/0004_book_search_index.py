@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# SQL на момент миграции: catalog/search.py может меняться, эта миграция - нет
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_fts "
+    "USING fts5(title, summary, author, genres, tokenize='unicode61 remove_diacritics 2')"
+)
+SQLITE_FILL = """
+    INSERT INTO catalog_book_fts (rowid, title, summary, author, genres)
+    SELECT b.id, b.title, b.summary,
+           COALESCE(a.first_name || ' ' || a.last_name, ''),
+           COALESCE((SELECT group_concat(g.name, ' ')
+                     FROM catalog_book_genre bg JOIN catalog_genre g ON g.id = bg.genre_id
+                     WHERE bg.book_id = b.id), '')
+    FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id
+"""
+
+# Без внешнего ключа на catalog_book: Django не знает об этой таблице, и
+# TRUNCATE без CASCADE (flush, очистка TransactionTestCase) не прошёл бы.
+# Строки удалённых книг удаляет сигнал (search.remove_books).
+POSTGRESQL_CREATE = (
+    "CREATE TABLE IF NOT EXISTS catalog_book_search ("
+    "book_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS catalog_book_search_document_idx ON catalog_book_search USING GIN (document)",
+)
+POSTGRESQL_FILL = """
+    INSERT INTO catalog_book_search (book_id, document)
+    SELECT b.id,
+           setweight(to_tsvector('simple', b.title), 'A')
+           || setweight(to_tsvector('simple', COALESCE(a.first_name || ' ' || a.last_name, '')), 'B')
+           || setweight(to_tsvector('simple', COALESCE((
+                  SELECT string_agg(g.name, ' ')
+                  FROM catalog_book_genre bg JOIN catalog_genre g ON g.id = bg.genre_id
+                  WHERE bg.book_id = b.id), '')), 'C')
+           || setweight(to_tsvector('simple', b.summary), 'D')
+    FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_CREATE:
+                cursor.execute(sql)
+            cursor.execute(POSTGRESQL_FILL)
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute(SQLITE_CREATE)
+            except connection.Database.OperationalError:
+                # SQLite собран без FTS5 - поиск работает через icontains
+                return
+            cursor.execute(SQLITE_FILL)
+
+
+def drop_search_index(apps, schema_editor):
+    table = {'postgresql': 'catalog_book_search', 'sqlite': 'catalog_book_fts'}.get(schema_editor.connection.vendor)
+    if table:
+        schema_editor.execute('DROP TABLE IF EXISTS %s' % table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_bookinstance_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
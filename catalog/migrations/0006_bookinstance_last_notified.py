@@ -0,0 +1,18 @@
+# Generated by Django 4.0.2 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinstance',
+            name='last_notified',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.0.2 on 2026-10-18 07:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_copies(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+
+    def copies(status=None):
+        queryset = BookInstance.objects.filter(book=OuterRef('pk'))
+        if status:
+            queryset = queryset.filter(status=status)
+        return Coalesce(Subquery(queryset.order_by().values('book').annotate(count=Count('pk')).values('count')), 0)
+
+    Book.objects.update(copies_total=copies(), copies_available=copies('a'), copies_on_loan=copies('o'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_bookinstance_last_notified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_copies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.0.2 on 2026-10-18 08:07
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+from catalog.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # На PostgreSQL индексы строятся CONCURRENTLY, без блокировки таблицы
+    atomic = False
+
+    dependencies = [
+        ('catalog', '0007_book_copies_counters'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='author',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), django.db.models.functions.text.Lower('first_name'), name='author_name_prefix_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='book',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='book_title_prefix_idx'),
+        ),
+    ]
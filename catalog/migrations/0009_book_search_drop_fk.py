@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def drop_foreign_key(apps, schema_editor):
+    # Внешний ключ catalog_book_search -> catalog_book из прежней версии 0004
+    # мешал TRUNCATE в flush и в очистке TransactionTestCase
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE catalog_book_search DROP CONSTRAINT IF EXISTS catalog_book_search_book_id_fkey')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_foreign_key, migrations.RunPython.noop),
+    ]
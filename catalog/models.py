@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
+from django.dispatch import Signal
+from django.utils import timezone
 import uuid
 from datetime import date
 from django.contrib.auth.models import User
@@ -36,15 +39,32 @@ class Book(models.Model):
                                       '">ISBN number</a>')
     genre = models.ManyToManyField(Genre, help_text="Select a genre for this book")
     language = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
+    # обновляется и при изменении экземпляров, жанров и языка книги (catalog/signals.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # число экземпляров по статусам, поддерживается сигналами экземпляров
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False)
+    copies_on_loan = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['title', 'author']
+        indexes = [
+            # автодополнение по началу названия без учёта регистра (catalog/autocomplete.py)
+            models.Index(Lower('title'), name='book_title_prefix_idx'),
+        ]
 
     def display_genre(self):
         return ', '.join([genre.name for genre in self.genre.all()[:3]])
 
     display_genre.short_description = 'Genre'
 
+    def status_counts(self):
+        """Количество экземпляров книги по статусам одним запросом."""
+        labels = dict(BookInstance.LOAN_STATUS)
+        rows = self.bookinstance_set.order_by('status').values('status').annotate(count=models.Count('id'))
+        return [{'status': row['status'], 'label': labels.get(row['status'], row['status']), 'count': row['count']}
+                for row in rows]
+
     def get_absolute_url(self):
         return reverse('book-detail', args=[str(self.id)])
 
@@ -52,6 +72,39 @@ class Book(models.Model):
         return self.title
 
 
+# Посылается BookInstanceQuerySet.update() со списком изменений
+# [(id, (старый статус, старая книга), (новый статус, новая книга))]
+copies_changed = Signal()
+
+
+class BookInstanceQuerySet(models.QuerySet):
+
+    # Поля, изменение которых не влияет ни на счётчики, ни на страницы каталога
+    QUIET_FIELDS = {'last_notified', 'updated_at'}
+
+    def update(self, **kwargs):
+        """UPDATE, после которого счётчики и страницы каталога остаются верными.
+
+        Строки блокируются, их статус и книга читаются до и после UPDATE, и
+        изменения передаются сигналом copies_changed.
+        """
+        if set(kwargs) <= self.QUIET_FIELDS:
+            return super().update(**kwargs)
+        kwargs.setdefault('updated_at', timezone.now())
+        base = self.model._base_manager.using(self.db)
+        with transaction.atomic(using=self.db):
+            before = {pk: (status, book_id) for pk, status, book_id
+                      in self.select_for_update().values_list('pk', 'status', 'book_id')}
+            if not before:
+                return 0
+            # обновляются ровно заблокированные строки
+            updated = base.filter(pk__in=before).update(**kwargs)
+            after = base.filter(pk__in=before).values_list('pk', 'status', 'book_id')
+            copies_changed.send(sender=self.model, changes=[(pk, before[pk], (status, book_id))
+                                                            for pk, status, book_id in after])
+        return updated
+
+
 class BookInstance(models.Model):
     """Модель экземпляра книги."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4,
@@ -60,11 +113,16 @@ class BookInstance(models.Model):
     imprint = models.CharField(max_length=200)
     due_back = models.DateField(null=True, blank=True)
     borrower = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # когда читателю последний раз напоминали о просрочке (send_overdue_notices)
+    last_notified = models.DateField(null=True, blank=True, editable=False)
 
     @property
     def is_overdue(self):
         return bool(self.due_back and date.today() > self.due_back)
 
+    objects = BookInstanceQuerySet.as_manager()
+
     LOAN_STATUS = (
         ('d', 'Maintenance'),
         ('o', 'On loan'),
@@ -82,9 +140,47 @@ class BookInstance(models.Model):
     class Meta:
         ordering = ['due_back']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # экземпляры с любым статусом по сроку возврата: фильтр status админки
+            models.Index(fields=['status', 'due_back'], name='bookinstance_status_due_idx'),
+            # книги конкретного читателя
+            models.Index(fields=['borrower', 'status', 'due_back'], name='bookinstance_borrower_idx'),
+            # все выданные книги по сроку возврата: в частичный индекс попадают
+            # только выданные экземпляры, и записи без выдачи его не обновляют
+            models.Index(fields=['due_back'], condition=models.Q(status='o'), name='bookinstance_on_loan_idx'),
+            # сортировка админки по умолчанию (ordering) и фильтр due_back по диапазону дат
+            models.Index(fields=['due_back'], name='bookinstance_due_back_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # статус и книга на момент загрузки, по ним сигналы видят изменения
+        if 'status' in instance.__dict__:
+            instance._loaded_status = instance.status
+        if 'book_id' in instance.__dict__:
+            instance._loaded_book_id = instance.book_id
+        return instance
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            if not self._state.adding:
+                # Статус и книгу перечитываем под блокировкой строки: иначе два
+                # параллельных сохранения посчитают одну смену статуса дважды
+                row = type(self)._base_manager.using(using).select_for_update().filter(pk=self.pk) \
+                    .values_list('status', 'book_id').first()
+                if row:
+                    self._loaded_status, self._loaded_book_id = row
+            # сигнал post_save выполняется в той же транзакции
+            super().save(*args, **kwargs)
 
     def __str__(self):
-        return '{0} ({1})'.format(self.id, self.book.title)
+        # название - только из уже загруженной книги (select_related), иначе
+        # страница подтверждения удаления или журнал админки делали бы запрос на строку
+        if self._meta.get_field('book').is_cached(self) and self.book is not None:
+            return '{0} ({1})'.format(self.id, self.book.title)
+        return '{0} (book #{1})'.format(self.id, self.book_id)
 
 
 class Author(models.Model):
@@ -93,12 +189,31 @@ class Author(models.Model):
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True)
     date_of_death = models.DateField('died', null=True, blank=True)
+    # обновляется и при удалении книги автора или её переносе к другому автору
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            # автодополнение по началу фамилии и имени (catalog/autocomplete.py)
+            models.Index(Lower('last_name'), Lower('first_name'), name='author_name_prefix_idx'),
+        ]
 
     def get_absolute_url(self):
         return reverse('author-detail', args=[str(self.id)])
 
     def __str__(self):
         return '{0}, {1}'.format(self.last_name, self.first_name)
+
+
+class CatalogCounter(models.Model):
+    """Материализованный счётчик каталога для домашней страницы.
+
+    Поддерживается сигналами из catalog/signals.py, пересчитывается
+    командой rebuild_counters.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return '{0}={1}'.format(self.name, self.value)
@@ -0,0 +1,35 @@
+"""Операции миграций каталога."""
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(AddIndex):
+    """AddIndex, который на PostgreSQL строит индекс CREATE INDEX CONCURRENTLY.
+
+    Построение не блокирует запись в таблицу. На остальных базах работает как
+    обычный AddIndex. Миграция с этой операцией должна быть atomic = False,
+    потому что CONCURRENTLY нельзя выполнять внутри транзакции.
+    """
+
+    def _concurrently(self, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return False
+        if schema_editor.atomic_migration:
+            raise ValueError('%s requires a non-atomic migration (atomic = False).' % self.__class__.__name__)
+        return True
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._concurrently(schema_editor):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(self.index.create_sql(model, schema_editor, concurrently=True), params=None)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if not self._concurrently(schema_editor):
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(self.index.remove_sql(model, schema_editor, concurrently=True))
+
+    def describe(self):
+        return 'Concurrently create index %s on %s' % (self.index.name, self.model_name)
@@ -0,0 +1,214 @@
+"""Курсорная (keyset) пагинация списков каталога.
+
+Вместо OFFSET/LIMIT и COUNT(*) следующая страница выбирается условием
+"ключ сортировки больше последнего показанного", поэтому глубокие
+страницы стоят столько же, сколько первая. Курсор - непрозрачная строка
+с ключом сортировки крайней записи страницы.
+
+Для админки, где нужны номера страниц, есть EstimatedCountPaginator с
+приблизительным числом строк вместо COUNT(*) по всей таблице.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """Страница курсорной пагинации, аналог django.core.paginator.Page без номера страницы."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_fields(model):
+    """Ключ сортировки модели: поля Meta.ordering и pk для уникальности.
+
+    Внешние ключи сравниваются по *_id, без сортировки по полям связанной модели.
+    """
+    fields = []
+    for name in model._meta.ordering:
+        fields.append(model._meta.get_field(name).attname)
+    return fields + ['pk']
+
+
+def _field(model, name):
+    return model._meta.pk if name == 'pk' else model._meta.get_field(name)
+
+
+def encode_cursor(direction, values):
+    data = json.dumps([direction, values], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_raw_cursor(cursor, length):
+    """Возвращает направление и значения ключа в том виде, как они лежат в JSON."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, values = json.loads(data)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+def decode_cursor(cursor, model, fields):
+    """Возвращает направление и значения ключа, приведённые к типам полей."""
+    direction, values = decode_raw_cursor(cursor, len(fields))
+    try:
+        return direction, [None if value is None else _field(model, name).to_python(value)
+                           for name, value in zip(fields, values)]
+    except (ValidationError, FieldDoesNotExist):
+        raise InvalidCursor(cursor)
+
+
+def _seek(fields, values, direction):
+    """Условие "строго после" (или "строго до") ключа values при сортировке NULLS FIRST."""
+    condition = None
+    equal = Q()
+    for name, value in zip(fields, values):
+        if direction == NEXT:
+            beyond = Q(**{name + '__isnull': False}) if value is None else Q(**{name + '__gt': value})
+        elif value is None:
+            beyond = None  # раньше NULL ничего нет
+        else:
+            beyond = Q(**{name + '__lt': value}) | Q(**{name + '__isnull': True})
+        if beyond is not None:
+            condition = equal & beyond if condition is None else condition | (equal & beyond)
+        equal &= Q(**{name + '__isnull': True}) if value is None else Q(**{name: value})
+    return condition
+
+
+def _key(obj, fields):
+    if isinstance(obj, dict):
+        # строки queryset.values()
+        return [obj[name] for name in fields]
+    return [obj.pk if name == 'pk' else getattr(obj, name) for name in fields]
+
+
+def paginate(queryset, cursor, per_page, fields=None):
+    """Возвращает KeysetPage для курсора (пустой курсор - первая страница).
+
+    Выполняет ровно один запрос: per_page + 1 строк без COUNT(*).
+    """
+    fields = fields or keyset_fields(queryset.model)
+    direction, values = decode_cursor(cursor, queryset.model, fields) if cursor else (NEXT, None)
+
+    if direction == NEXT:
+        ordering = [F(name).asc(nulls_first=True) for name in fields]
+    else:
+        ordering = [F(name).desc(nulls_last=True) for name in fields]
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(_seek(fields, values, direction))
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == NEXT:
+        has_next, has_previous = has_more, values is not None
+    else:
+        rows.reverse()
+        has_next, has_previous = True, has_more
+
+    page = KeysetPage(rows)
+    if rows and has_next:
+        page.next_cursor = encode_cursor(NEXT, _key(rows[-1], fields))
+    if rows and has_previous:
+        page.previous_cursor = encode_cursor(PREVIOUS, _key(rows[0], fields))
+    return page
+
+
+class KeysetPaginationMixin:
+    """Курсорная пагинация для ListView.
+
+    Включается параметром ?cursor= (пустое значение - первая страница) или
+    для всех списков настройкой CATALOG_KEYSET_PAGINATION = True. В контекст
+    вместо Page попадает KeysetPage, а paginator равен None.
+    """
+    keyset_fields = None
+    cursor_kwarg = 'cursor'
+
+    def use_keyset(self):
+        return self.cursor_kwarg in self.request.GET or getattr(settings, 'CATALOG_KEYSET_PAGINATION', False)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset():
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = paginate(queryset, self.request.GET.get(self.cursor_kwarg), page_size, self.keyset_fields)
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+        return None, page, page.object_list, page.has_other_pages()
+
+
+# Меньше этого числа строк точный COUNT(*) дешевле неточной оценки
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """Оценка числа строк нефильтрованного queryset по статистике базы.
+
+    Только PostgreSQL (pg_class.reltuples); None, если оценки нет.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator or query.low_mark or query.high_mark is not None:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                       [connection.ops.quote_name(queryset.model._meta.db_table)])
+        row = cursor.fetchone()
+    # -1: таблица ещё не анализировалась
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который для больших нефильтрованных таблиц не считает COUNT(*).
+
+    Число строк берётся из статистики PostgreSQL; при фильтрации, на других
+    базах и на небольших таблицах считается точно.
+    """
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
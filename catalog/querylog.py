@@ -0,0 +1,161 @@
+"""Журнал медленных и повторяющихся SQL-запросов (включается настройкой).
+
+При CATALOG_QUERY_LOG = True QueryLogMiddleware оборачивает запросы всех
+соединений через dbwrappers.wrap и пишет в логгер catalog.querylog:
+
+- запросы дольше CATALOG_SLOW_QUERY_MS миллисекунд - с планом EXPLAIN и
+  местом вызова: первая строка кода проекта в стеке и, если запрос выполнен
+  при рендеринге, шаблон и строка в нём;
+- запросы, которые после нормализации (литералы и списки IN заменены на ?)
+  выполнились за один HTTP-запрос больше CATALOG_DUPLICATE_QUERY_LIMIT раз -
+  типичный признак N+1.
+
+Для команд и shell то же самое даёт with querylog.capture('label'): ...
+"""
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import Resolver404, resolve
+
+from . import dbwrappers
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)', re.I)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SPACES = re.compile(r'\s+')
+
+PROJECT_DIR = Path(settings.BASE_DIR).resolve()
+
+
+def enabled():
+    return getattr(settings, 'CATALOG_QUERY_LOG', False)
+
+
+def normalize(sql):
+    """SQL без конкретных значений: запросы, отличающиеся только ими, совпадают."""
+    sql = _IN_LIST.sub('IN (?)', sql)
+    sql = _NUMBERS.sub('?', _STRINGS.sub('?', sql))
+    return _SPACES.sub(' ', sql).replace('%s', '?').strip()
+
+
+def call_site():
+    """Место вызова запроса: 'файл:строка' кода проекта и 'шаблон:строка'."""
+    code = template = None
+    frame = sys._getframe(1)
+    # обёртки execute_wrapper (этот журнал, метрики) тоже код проекта - пропускаем их
+    outer = frame
+    while outer is not None and outer.f_code.co_name != '_execute_with_wrappers':
+        outer = outer.f_back
+    if outer is not None:
+        frame = outer
+    while frame is not None and (code is None or template is None):
+        filename = Path(frame.f_code.co_filename)
+        if code is None and PROJECT_DIR in filename.parents and 'site-packages' not in filename.parts:
+            code = '%s:%d' % (filename.relative_to(PROJECT_DIR), frame.f_lineno)
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            # ближайший к запросу узел шаблона
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            if origin is not None and getattr(node, 'token', None) is not None:
+                template = '%s:%d' % (origin.template_name or origin.name, node.token.lineno)
+        frame = frame.f_back
+    return ', '.join(part for part in (code, template) if part) or '<unknown>'
+
+
+class QueryLog:
+    """Обёртка execute_wrapper: медленные запросы сразу, повторы - в report()."""
+
+    def __init__(self, label, slow_ms=None, duplicate_limit=None, explain=True):
+        self.label = label
+        self.slow_ms = getattr(settings, 'CATALOG_SLOW_QUERY_MS', 100) if slow_ms is None else slow_ms
+        self.duplicate_limit = getattr(settings, 'CATALOG_DUPLICATE_QUERY_LIMIT', 5) \
+            if duplicate_limit is None else duplicate_limit
+        self.explain = explain
+        self.counts = Counter()
+        self.sites = {}
+        self.slow = []
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self._explaining:
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        key = normalize(sql)
+        self.counts[key] += 1
+        if key not in self.sites:
+            self.sites[key] = call_site()
+        if elapsed_ms >= self.slow_ms:
+            site = self.sites[key] if self.counts[key] == 1 else call_site()
+            plan = self.explain_plan(context['connection'], sql, params) if self.explain and not many else None
+            self.slow.append((elapsed_ms, sql, site, plan))
+            logger.warning('Slow query in %s (%.1f ms) at %s:\n%s%s', self.label, elapsed_ms, site, sql,
+                           '\nPlan:\n%s' % plan if plan else '')
+        return result
+
+    def explain_plan(self, connection, sql, params):
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return None
+        self._explaining = True
+        try:
+            # в точке сохранения: ошибка EXPLAIN не должна ломать транзакцию запроса
+            with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+                cursor.execute('%s %s' % (connection.ops.explain_query_prefix(), sql), params)
+                return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+        except Exception as e:
+            return 'EXPLAIN failed: %s' % e
+        finally:
+            self._explaining = False
+
+    def duplicates(self):
+        """[(число выполнений, нормализованный SQL, место первого вызова)]"""
+        return [(count, key, self.sites[key]) for key, count in self.counts.most_common()
+                if count > self.duplicate_limit]
+
+    def report(self):
+        for count, key, site in self.duplicates():
+            logger.warning('%s ran the same query %d times (first at %s): %s', self.label, count, site, key)
+
+
+@contextmanager
+def capture(label, **options):
+    """Журналирует запросы всех соединений внутри блока; отдаёт QueryLog."""
+    log = QueryLog(label, **options)
+    with dbwrappers.wrap(log):
+        yield log
+    log.report()
+
+
+class QueryLogMiddleware(HybridMiddleware):
+    """Журнал запросов каждого HTTP-запроса при CATALOG_QUERY_LOG = True."""
+
+    def call(self, request):
+        if not enabled():
+            return self.get_response(request)
+        with capture(self.label(request)):
+            return self.get_response(request)
+
+    async def acall(self, request):
+        if not enabled():
+            return await self.get_response(request)
+        with capture(self.label(request)):
+            return await self.get_response(request)
+
+    @staticmethod
+    def label(request):
+        try:
+            return '%s (%s)' % (resolve(request.path_info).view_name, request.path)
+        except Resolver404:
+            return request.path
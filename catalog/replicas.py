@@ -0,0 +1,158 @@
+"""Чтение каталога с реплик базы данных.
+
+ReplicaRouter отправляет чтения моделей каталога на одну из реплик
+CATALOG_REPLICAS, а все записи - в 'default'. Реплика пропускается, если
+она недоступна или отстаёт больше чем на CATALOG_REPLICA_MAX_LAG секунд;
+результат проверки запоминается на CATALOG_REPLICA_CHECK_INTERVAL секунд.
+Без реплик роутер ни во что не вмешивается.
+
+Чтение своих записей:
+
+- после записи все чтения до конца запроса (или команды) идут в 'default';
+- ReplicaPinMiddleware ставит cookie, и следующие запросы этого посетителя
+  ещё CATALOG_REPLICA_STICKY_SECONDS секунд тоже читают из 'default';
+- внутри транзакции чтения тоже идут в 'default'.
+
+Локально можно проверить на двух SQLite-базах, см. DATABASE_REPLICA_URLS
+в settings.py.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .middleware import HybridMiddleware
+
+COOKIE = 'catalog_primary'
+
+# Чтение из 'default' для текущего запроса, команды или потока:
+# True - была запись, 'cookie' - запись была в недавнем запросе
+_pinned = ContextVar('catalog_pinned', default=None)
+
+# Результаты проверок реплик: {alias: (время проверки, пригодна ли)}
+_health = {}
+
+
+def replicas():
+    return list(getattr(settings, 'CATALOG_REPLICAS', []))
+
+
+def sticky_seconds():
+    return getattr(settings, 'CATALOG_REPLICA_STICKY_SECONDS', 5)
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах; DatabaseError, если она недоступна."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT CASE WHEN NOT pg_is_in_recovery() '
+                'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+                'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END')
+            return float(cursor.fetchone()[0] or 0)
+        # для остальных баз отставание не измерить, проверяем только соединение
+        cursor.execute('SELECT 1')
+        return 0
+
+
+def is_healthy(alias):
+    """Доступна ли реплика и не отстаёт ли она (с кэшированием результата)."""
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked and now - checked[0] < getattr(settings, 'CATALOG_REPLICA_CHECK_INTERVAL', 5):
+        return checked[1]
+    try:
+        healthy = replica_lag(alias) <= getattr(settings, 'CATALOG_REPLICA_MAX_LAG', 10)
+    except DatabaseError:
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def reset_health():
+    _health.clear()
+
+
+def pin():
+    """Направляет чтения текущего контекста в 'default'."""
+    _pinned.set(True)
+
+
+def is_pinned():
+    return bool(_pinned.get()) or connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+    """Чтения каталога - с реплик, записи - в 'default'."""
+    app_label = 'catalog'
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or model._meta.app_label != self.app_label or is_pinned():
+            return None
+        healthy = [alias for alias in aliases if is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not replicas():
+            return None
+        pin()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # реплики получают схему репликацией
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware(HybridMiddleware):
+    """Читает из 'default' в течение CATALOG_REPLICA_STICKY_SECONDS после записи."""
+
+    def call(self, request):
+        if not replicas():
+            return self.get_response(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+            wrote = _pinned.get() is True
+        finally:
+            _pinned.reset(token)
+        return self.finish(response, wrote)
+
+    async def acall(self, request):
+        if not replicas():
+            return await self.get_response(request)
+        # запись в потоке sync_to_async видна здесь: asgiref возвращает
+        # изменения ContextVar в вызывающий контекст
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+            wrote = _pinned.get() is True
+        finally:
+            _pinned.reset(token)
+        return self.finish(response, wrote)
+
+    @staticmethod
+    def start(request):
+        try:
+            pinned = float(request.COOKIES.get(COOKIE, 0)) > time.time()
+        except ValueError:
+            pinned = False
+        return _pinned.set('cookie' if pinned else None)
+
+    @staticmethod
+    def finish(response, wrote):
+        if wrote:
+            response.set_cookie(COOKIE, '%d' % (time.time() + sticky_seconds()), max_age=sticky_seconds(),
+                                httponly=True, samesite='Lax')
+        return response
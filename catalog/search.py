@@ -0,0 +1,243 @@
+"""Полнотекстовый поиск книг.
+
+Индекс хранится рядом с таблицей книг:
+
+- SQLite: виртуальная таблица FTS5 catalog_book_fts (rowid = id книги);
+- PostgreSQL: таблица catalog_book_search с колонкой tsvector и GIN-индексом.
+
+Таблицы создаёт миграция 0004_book_search_index. Если ни один вариант
+недоступен (другая база или SQLite без FTS5), поиск работает через
+icontains. Индекс обновляется сигналами при сохранении и удалении книг,
+авторов и жанров (catalog/signals.py), а целиком перестраивается командой
+rebuild_search_index. Внешнего ключа на catalog_book у таблицы PostgreSQL
+нет: Django о ней не знает и очищает таблицы TRUNCATE без CASCADE.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Book
+from .pagination import NEXT, InvalidCursor, decode_raw_cursor, encode_cursor
+
+FTS5 = 'fts5'
+POSTGRESQL = 'postgresql'
+BASIC = 'basic'
+
+SQLITE_TABLE = 'catalog_book_fts'
+POSTGRESQL_TABLE = 'catalog_book_search'
+
+# Веса колонок: название, описание, автор, жанры
+SQLITE_WEIGHTS = '10.0, 1.0, 5.0, 2.0'
+
+BATCH_SIZE = 500
+
+# Бэкенд по (alias, имя базы), чтобы не проверять наличие таблицы на каждый запрос
+_backends = {}
+
+SQLITE_INDEX = """
+    INSERT INTO catalog_book_fts (rowid, title, summary, author, genres)
+    SELECT b.id, b.title, b.summary,
+           COALESCE(a.first_name || ' ' || a.last_name, ''),
+           COALESCE((SELECT group_concat(g.name, ' ')
+                     FROM catalog_book_genre bg JOIN catalog_genre g ON g.id = bg.genre_id
+                     WHERE bg.book_id = b.id), '')
+    FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id
+    WHERE {where}
+"""
+POSTGRESQL_INDEX = """
+    INSERT INTO catalog_book_search (book_id, document)
+    SELECT b.id,
+           setweight(to_tsvector('simple', b.title), 'A')
+           || setweight(to_tsvector('simple', COALESCE(a.first_name || ' ' || a.last_name, '')), 'B')
+           || setweight(to_tsvector('simple', COALESCE((
+                  SELECT string_agg(g.name, ' ')
+                  FROM catalog_book_genre bg JOIN catalog_genre g ON g.id = bg.genre_id
+                  WHERE bg.book_id = b.id), '')), 'C')
+           || setweight(to_tsvector('simple', b.summary), 'D')
+    FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id
+    WHERE {where}
+    ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+SQLITE_SEARCH = """
+    SELECT id, title, author_id, first_name, last_name, rank FROM (
+        SELECT b.id, b.title, a.id AS author_id, a.first_name, a.last_name,
+               bm25(catalog_book_fts, {weights}) AS rank
+        FROM catalog_book_fts f
+        JOIN catalog_book b ON b.id = f.rowid
+        LEFT JOIN catalog_author a ON a.id = b.author_id
+        WHERE catalog_book_fts MATCH %s
+    ) r
+    WHERE {seek}
+    ORDER BY rank, id
+    LIMIT %s
+"""
+POSTGRESQL_SEARCH = """
+    SELECT id, title, author_id, first_name, last_name, rank FROM (
+        SELECT b.id, b.title, a.id AS author_id, a.first_name, a.last_name,
+               -ts_rank(s.document, q.query)::float8 AS rank
+        FROM catalog_book_search s
+        CROSS JOIN to_tsquery('simple', %s) AS q (query)
+        JOIN catalog_book b ON b.id = s.book_id
+        LEFT JOIN catalog_author a ON a.id = b.author_id
+        WHERE s.document @@ q.query
+    ) r
+    WHERE {seek}
+    ORDER BY rank, id
+    LIMIT %s
+"""
+
+
+def _backend_key(conn):
+    return conn.alias, str(conn.settings_dict['NAME'])
+
+
+def backend(conn=None):
+    """Какой поиск доступен на соединении: fts5, postgresql или basic."""
+    conn = conn or connection
+    key = _backend_key(conn)
+    if key not in _backends:
+        if conn.vendor == 'postgresql':
+            _backends[key] = POSTGRESQL
+        elif conn.vendor == 'sqlite' and SQLITE_TABLE in conn.introspection.table_names():
+            _backends[key] = FTS5
+        else:
+            _backends[key] = BASIC
+    return _backends[key]
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BATCH_SIZE):
+        yield ids[start:start + BATCH_SIZE]
+
+
+def _reindex(where, params):
+    kind = backend()
+    if kind == BASIC:
+        return
+    with connection.cursor() as cursor:
+        if kind == FTS5:
+            cursor.execute('DELETE FROM catalog_book_fts WHERE rowid IN (SELECT b.id FROM catalog_book b WHERE %s)'
+                           % where, params)
+            cursor.execute(SQLITE_INDEX.format(where=where), params)
+        else:
+            cursor.execute(POSTGRESQL_INDEX.format(where=where), params)
+
+
+def index_books(book_ids):
+    """Переиндексирует книги с указанными id."""
+    for chunk in _chunks(book_ids):
+        _reindex('b.id IN (%s)' % ', '.join(['%s'] * len(chunk)), chunk)
+
+
+def index_author_books(author_id):
+    """Переиндексирует все книги автора (после смены его имени)."""
+    _reindex('b.author_id = %s', [author_id])
+
+
+def index_genre_books(genre_id):
+    """Переиндексирует все книги жанра (после смены его названия)."""
+    _reindex('b.id IN (SELECT bg.book_id FROM catalog_book_genre bg WHERE bg.genre_id = %s)', [genre_id])
+
+
+def remove_books(book_ids):
+    """Удаляет книги из индекса."""
+    kind = backend()
+    if kind == BASIC:
+        return
+    sql = 'DELETE FROM catalog_book_fts WHERE rowid IN (%s)' if kind == FTS5 \
+        else 'DELETE FROM catalog_book_search WHERE book_id IN (%s)'
+    with connection.cursor() as cursor:
+        for chunk in _chunks(book_ids):
+            cursor.execute(sql % ', '.join(['%s'] * len(chunk)), chunk)
+
+
+def rebuild(conn=None):
+    """Перестраивает индекс целиком; возвращает имя бэкенда."""
+    conn = conn or connection
+    kind = backend(conn)
+    if kind == FTS5:
+        with conn.cursor() as cursor:
+            cursor.execute('DELETE FROM catalog_book_fts')
+            cursor.execute(SQLITE_INDEX.format(where='1 = 1'))
+    elif kind == POSTGRESQL:
+        with conn.cursor() as cursor:
+            cursor.execute('DELETE FROM catalog_book_search')
+            cursor.execute(POSTGRESQL_INDEX.format(where='TRUE'))
+    return kind
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _fts5_query(terms):
+    # каждое слово в кавычках, последнее - как префикс
+    phrases = ['"%s"' % term for term in terms]
+    phrases[-1] += '*'
+    return ' AND '.join(phrases)
+
+
+def _tsquery(terms):
+    return ' & '.join(terms[:-1] + ['%s:*' % terms[-1]])
+
+
+def _basic_search(terms, after, limit):
+    queryset = Book.objects.all()
+    for term in terms:
+        queryset = queryset.filter(
+            Q(title__icontains=term) | Q(summary__icontains=term) | Q(author__first_name__icontains=term)
+            | Q(author__last_name__icontains=term) | Q(genre__name__icontains=term))
+    if after:
+        queryset = queryset.filter(pk__gt=after[1])
+    rows = queryset.distinct().order_by('pk') \
+        .values_list('id', 'title', 'author_id', 'author__first_name', 'author__last_name')[:limit]
+    return [row + (0.0,) for row in rows]
+
+
+def search(query, cursor=None, per_page=10):
+    """Ищет книги одним ранжированным запросом.
+
+    Возвращает (results, next_cursor), где results - список словарей с
+    ключами id, title, author_id, author, rank (меньше - релевантнее).
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], None
+    after = None
+    if cursor:
+        direction, after = decode_raw_cursor(cursor, 2)
+        if direction != NEXT or not all(isinstance(value, (int, float)) for value in after):
+            raise InvalidCursor(cursor)
+
+    kind = backend()
+    if kind == BASIC:
+        rows = _basic_search(terms, after, per_page + 1)
+    else:
+        if after:
+            seek, seek_params = '(rank > %s OR (rank = %s AND id > %s))', [after[0], after[0], after[1]]
+        else:
+            seek, seek_params = '1 = 1', []
+        if kind == FTS5:
+            sql = SQLITE_SEARCH.format(weights=SQLITE_WEIGHTS, seek=seek)
+            params = [_fts5_query(terms)] + seek_params + [per_page + 1]
+        else:
+            sql = POSTGRESQL_SEARCH.format(seek=seek)
+            params = [_tsquery(terms)] + seek_params + [per_page + 1]
+        with connection.cursor() as db_cursor:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+
+    results = [{
+        'id': book_id,
+        'title': title,
+        'author_id': author_id,
+        'author': '{0}, {1}'.format(last_name, first_name) if author_id else '',
+        'rank': rank,
+    } for book_id, title, author_id, first_name, last_name, rank in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor(NEXT, [results[-1]['rank'], results[-1]['id']])
+    return results, next_cursor
@@ -0,0 +1,205 @@
+"""Генератор большого синтетического каталога для нагрузочных тестов.
+
+Все значения берутся из random.Random, инициализированного seed и числом
+уже сгенерированных строк, поэтому одинаковые параметры на одинаковой базе
+дают одинаковые данные. Строки вставляются пачками через
+bulk.insert (COPY на PostgreSQL, bulk_create на остальных базах) без
+сигналов; счётчики, индекс поиска и кэш обновляются в конце.
+
+Перекос задаётся показателем закона Ципфа: k-й по популярности автор
+получает книг пропорционально 1 / k ** skew, так же распределяются
+экземпляры по книгам и выдачи по читателям. skew = 0 - равномерно.
+"""
+import datetime
+import itertools
+import random
+import uuid
+from collections import namedtuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import bulk, caching, counters, search
+from .models import Author, Book, BookInstance, Genre, Language
+
+Totals = namedtuple('Totals', ['authors', 'books', 'copies', 'users', 'genres', 'languages'])
+
+GENRES = ('Fantasy', 'Science Fiction', 'Detective', 'Romance', 'History', 'Poetry', 'Biography',
+          'Horror', 'Adventure', 'Philosophy', 'Children', 'Drama', 'Travel', 'Cooking', 'Science')
+LANGUAGES = ('English', 'Russian', 'French', 'German', 'Spanish', 'Italian', 'Japanese', 'Chinese')
+FIRST_NAMES = ('Anna', 'Boris', 'Clara', 'David', 'Elena', 'Fyodor', 'Grace', 'Henry', 'Irina', 'James',
+               'Kira', 'Leo', 'Maria', 'Nikolai', 'Olga', 'Peter', 'Rosa', 'Sergei', 'Tatiana', 'Victor')
+LAST_NAMES = ('Smith', 'Ivanov', 'Dubois', 'Muller', 'Garcia', 'Rossi', 'Tanaka', 'Chen', 'Petrov', 'Brown',
+              'Novak', 'Kowalski', 'Larsen', 'Silva', 'Murphy', 'Volkov', 'Schmidt', 'Moreau', 'Sato', 'Wright')
+ADJECTIVES = ('Silent', 'Red', 'Lost', 'Hidden', 'Last', 'Golden', 'Broken', 'Distant', 'Secret', 'Winter',
+              'Burning', 'Quiet', 'Endless', 'Forgotten', 'Northern', 'Glass', 'Iron', 'Wild', 'Dark', 'Bright')
+NOUNS = ('River', 'Garden', 'Empire', 'Letter', 'Station', 'Mountain', 'Library', 'Kingdom', 'Voyage', 'Mirror',
+         'Island', 'Forest', 'City', 'Harbor', 'Tower', 'Road', 'Storm', 'Season', 'House', 'Sea')
+PUBLISHERS = ('Penguin', 'Eksmo', 'Gallimard', 'Suhrkamp', 'Anagrama', 'Einaudi', 'Kodansha', 'HarperCollins')
+
+# Доли статусов экземпляров: доступен, выдан, зарезервирован, на обслуживании
+STATUS_WEIGHTS = {'a': 50, 'o': 30, 'r': 10, 'd': 10}
+
+
+def isbn13(number, prefix='979'):
+    """ISBN-13 с правильной контрольной цифрой из порядкового номера."""
+    digits = '%s%09d' % (prefix, number)
+    check = (10 - sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10) % 10
+    return digits + str(check)
+
+
+class Zipf:
+    """Выбор индексов 0..n-1 с весами 1 / (k + 1) ** skew."""
+
+    def __init__(self, rng, n, skew):
+        self.rng = rng
+        self.population = range(n)
+        self.cum_weights = list(itertools.accumulate(1 / (k + 1) ** skew for k in range(n)))
+
+    def sample(self, k):
+        return self.rng.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(model, objects, batch_size):
+    """Вставляет объекты пачками; возвращает число строк."""
+    count = 0
+    for batch in _batched(objects, batch_size):
+        bulk.insert(model, batch)
+        count += len(batch)
+    return count
+
+
+def _insert_returning_ids(model, objects, batch_size):
+    """Вставляет объекты с автоинкрементным ключом; возвращает id новых строк по порядку."""
+    last = model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    _insert(model, objects, batch_size)
+    return list(model.objects.filter(pk__gt=last).order_by('pk').values_list('pk', flat=True))
+
+
+def _by_name(model, names):
+    """id строк справочника с данными именами; недостающие создаются."""
+    ids = dict(model.objects.filter(name__in=names).values_list('name', 'pk'))
+    missing = [name for name in names if name not in ids]
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing])
+        ids.update(model.objects.filter(name__in=missing).values_list('name', 'pk'))
+    return [ids[name] for name in names]
+
+
+def _next_number(queryset, field, prefix, length, digits=None):
+    """Номер после наибольшего из значений prefix + номер (номера дополнены нулями до length цифр).
+
+    Диапазон по полю - для индекса, регулярное выражение отсеивает остальные строки в нём.
+    """
+    last = queryset.filter(**{field + '__gte': prefix, field + '__lt': prefix + ':',
+                              field + '__regex': r'^%s[0-9]{%d}$' % (prefix, length)}) \
+        .order_by('-' + field).values_list(field, flat=True).first()
+    if last is None:
+        return 0
+    number = last[len(prefix):]
+    return int(number[:digits] if digits else number) + 1
+
+
+def seed(authors, books, copies, users, seed=0, skew=1.0, password='patron', batch_size=bulk.BATCH_SIZE,
+         progress=None):
+    """Добавляет в базу синтетический каталог; возвращает Totals.
+
+    progress(модель, число строк) вызывается после каждой таблицы.
+    """
+    # номера новых читателей и книг продолжают самые большие из уже
+    # существующих (удаление строк не приводит к повтору имени или ISBN);
+    # от них и от числа экземпляров зависит состояние генератора, поэтому
+    # повторный запуск с тем же seed добавляет другие строки
+    user_offset = _next_number(User.objects.all(), 'username', 'patron', 7)
+    book_offset = _next_number(Book.objects.all(), 'isbn', '979', 10, digits=9)
+    rng = random.Random('%s:%d:%d:%d' % (seed, user_offset, book_offset, BookInstance.objects.count()))
+    report = progress or (lambda model, count: None)
+    today = datetime.date.today()
+
+    genre_ids = _by_name(Genre, list(GENRES))
+    language_ids = _by_name(Language, list(LANGUAGES))
+
+    # у всех читателей один пароль: нагрузочный тест входит под любым из них
+    password_hash = make_password(password)
+    joined = timezone.now()
+    user_ids = _insert_returning_ids(User, (
+        User(username='patron%07d' % (user_offset + i), email='patron%07d@example.com' % (user_offset + i),
+             password=password_hash, date_joined=joined)
+        for i in range(users)), batch_size)
+    report(User, len(user_ids))
+
+    def make_authors():
+        for _ in range(authors):
+            born = datetime.date(1800, 1, 1) + datetime.timedelta(days=rng.randrange(200 * 365))
+            died = born + datetime.timedelta(days=rng.randrange(40 * 365, 90 * 365)) if rng.random() < 0.4 else None
+            yield Author(first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                         date_of_birth=born, date_of_death=died if died and died < today else None)
+
+    author_ids = _insert_returning_ids(Author, make_authors(), batch_size)
+    report(Author, len(author_ids))
+
+    # самые "популярные" авторы, книги и читатели - в случайных местах таблиц
+    rng.shuffle(author_ids)
+
+    def make_books():
+        author_choice = Zipf(rng, len(author_ids), skew)
+        language_choice = Zipf(rng, len(language_ids), 1.5)
+        words = [word.lower() for word in ADJECTIVES + NOUNS]
+        for start in range(0, books, batch_size):
+            size = min(batch_size, books - start)
+            authors_sample = author_choice.sample(size) if author_ids else [None] * size
+            for i, author_index, language_index in zip(range(start, start + size), authors_sample,
+                                                       language_choice.sample(size)):
+                yield Book(title='The %s %s' % (rng.choice(ADJECTIVES), rng.choice(NOUNS)),
+                           summary=' '.join(rng.choices(words, k=rng.randint(8, 30))),
+                           isbn=isbn13(book_offset + i),
+                           author_id=author_ids[author_index] if author_index is not None else None,
+                           language_id=language_ids[language_index])
+
+    book_ids = _insert_returning_ids(Book, make_books(), batch_size)
+    report(Book, len(book_ids))
+
+    through = Book.genre.through
+    _insert(through, (through(book_id=book_id, genre_id=genre_id) for book_id in book_ids
+                      for genre_id in rng.sample(genre_ids, rng.randint(1, 3))), batch_size)
+
+    rng.shuffle(book_ids)
+    rng.shuffle(user_ids)
+    statuses = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+
+    def make_copies():
+        book_choice = Zipf(rng, len(book_ids), skew)
+        borrower_choice = Zipf(rng, len(user_ids), skew)
+        for start in range(0, copies, batch_size):
+            size = min(batch_size, copies - start)
+            borrowers = iter(borrower_choice.sample(size) if user_ids else [None] * size)
+            for book_index, status in zip(book_choice.sample(size), rng.choices(statuses, status_weights, k=size)):
+                borrower_index = next(borrowers)
+                on_loan = status == 'o'
+                yield BookInstance(
+                    id=uuid.UUID(int=rng.getrandbits(128), version=4), book_id=book_ids[book_index], status=status,
+                    imprint='%s, %d' % (rng.choice(PUBLISHERS), rng.randint(1950, today.year)),
+                    due_back=today + datetime.timedelta(days=rng.randint(-30, 28)) if on_loan else None,
+                    borrower_id=user_ids[borrower_index] if on_loan and borrower_index is not None else None)
+
+    num_copies = _insert(BookInstance, make_copies(), batch_size) if book_ids else 0
+    report(BookInstance, num_copies)
+
+    # bulk-вставки не посылают сигналов
+    counters.rebuild()
+    counters.rebuild_book_copies()
+    search.rebuild()
+    caching.invalidate(caching.GLOBAL_TAG)
+    counters.bump(counters.BOOK_LIST_VERSION, counters.AUTHOR_LIST_VERSION)
+    return Totals(len(author_ids), len(book_ids), num_copies, len(user_ids), len(genre_ids), len(language_ids))
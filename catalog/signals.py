@@ -0,0 +1,217 @@
+"""Обработчики сигналов моделей каталога: счётчики, поиск и кэш страниц."""
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching, counters, search
+from .models import Author, Book, BookInstance, Genre, Language, copies_changed
+
+
+def invalidate_books(book_ids):
+    caching.invalidate(*['book:%s' % pk for pk in book_ids])
+
+
+def invalidate_authors(author_ids):
+    caching.invalidate(*['author:%s' % pk for pk in author_ids if pk is not None])
+
+
+def touch_books(book_ids):
+    """Обновляет updated_at книг, чьи страницы изменились без сохранения книги."""
+    book_ids = [pk for pk in book_ids if pk is not None]
+    if book_ids:
+        Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+
+
+def touch_authors(author_ids):
+    author_ids = [pk for pk in author_ids if pk is not None]
+    if author_ids:
+        Author.objects.filter(pk__in=author_ids).update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=Book)
+def book_saving(sender, instance, **kwargs):
+    # при смене автора страницу прежнего автора тоже нужно сбросить
+    if not instance._state.adding:
+        instance._old_author_id = Book.objects.filter(pk=instance.pk).values_list('author_id', flat=True).first()
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.add(books=1)
+    search.index_books([instance.pk])
+    caching.invalidate('book-list')
+    counters.bump(counters.BOOK_LIST_VERSION)
+    invalidate_books([instance.pk])
+    old_author_id = getattr(instance, '_old_author_id', None)
+    invalidate_authors([instance.author_id, old_author_id])
+    if old_author_id != instance.author_id:
+        touch_authors([old_author_id])
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    counters.add(books=-1)
+    search.remove_books([instance.pk])
+    caching.invalidate('book-list')
+    counters.bump(counters.BOOK_LIST_VERSION)
+    invalidate_books([instance.pk])
+    invalidate_authors([instance.author_id])
+    touch_authors([instance.author_id])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # genre.book_set.clear(): после очистки книги жанра уже не найти
+        instance._book_ids = list(instance.book_set.values_list('pk', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        book_ids = [instance.pk]
+    else:
+        book_ids = pk_set if action != 'post_clear' else getattr(instance, '_book_ids', [])
+    search.index_books(book_ids)
+    invalidate_books(book_ids)
+    touch_books(book_ids)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, **kwargs):
+    # имена авторов выводятся в обоих списках
+    caching.invalidate('author-list', 'book-list')
+    counters.bump(counters.AUTHOR_LIST_VERSION, counters.BOOK_LIST_VERSION)
+    invalidate_authors([instance.pk])
+    if created:
+        counters.add(authors=1)
+    else:
+        search.index_author_books(instance.pk)
+        invalidate_books(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # после удаления у книг будет author_id = NULL, запоминаем их заранее
+    instance._book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    counters.add(authors=-1)
+    search.index_books(getattr(instance, '_book_ids', []))
+    caching.invalidate('author-list', 'book-list')
+    counters.bump(counters.AUTHOR_LIST_VERSION, counters.BOOK_LIST_VERSION)
+    invalidate_authors([instance.pk])
+    invalidate_books(getattr(instance, '_book_ids', []))
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_genre_books(instance.pk)
+        book_ids = list(instance.book_set.values_list('pk', flat=True))
+        invalidate_books(book_ids)
+        touch_books(book_ids)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance, **kwargs):
+    instance._book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, instance, **kwargs):
+    search.index_books(getattr(instance, '_book_ids', []))
+    invalidate_books(getattr(instance, '_book_ids', []))
+    touch_books(getattr(instance, '_book_ids', []))
+
+
+@receiver(post_save, sender=Language)
+def language_saved(sender, instance, created, **kwargs):
+    if not created:
+        book_ids = list(instance.book_set.values_list('pk', flat=True))
+        invalidate_books(book_ids)
+        touch_books(book_ids)
+
+
+@receiver(pre_delete, sender=Language)
+def language_deleting(sender, instance, **kwargs):
+    instance._book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Language)
+def language_deleted(sender, instance, **kwargs):
+    invalidate_books(getattr(instance, '_book_ids', []))
+    touch_books(getattr(instance, '_book_ids', []))
+
+
+def apply_copy_changes(changes):
+    """Обновляет счётчики, updated_at и кэш после изменения экземпляров.
+
+    changes - [(id, (старый статус, старая книга), (новый статус, новая книга))],
+    None вместо пары - экземпляр создан или удалён.
+    """
+    instances = available = 0
+    books = {}
+    for pk, old, new in changes:
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            status, book_id = state
+            instances += sign
+            available += sign * (status == 'a')
+            delta = books.setdefault(book_id, [0, 0, 0])
+            delta[0] += sign
+            delta[1] += sign * (status == 'a')
+            delta[2] += sign * (status == 'o')
+    counters.add(instances=instances, instances_available=available)
+
+    books.pop(None, None)
+    for book_id, (total, on_shelf, on_loan) in books.items():
+        if total or on_shelf or on_loan:
+            Book.objects.filter(pk=book_id).update(copies_total=F('copies_total') + total,
+                                                   copies_available=F('copies_available') + on_shelf,
+                                                   copies_on_loan=F('copies_on_loan') + on_loan)
+    touch_books(books)
+    invalidate_books(books)
+    invalidate_authors(set(Book.objects.filter(pk__in=books).values_list('author_id', flat=True)))
+
+
+@receiver(pre_save, sender=BookInstance)
+def book_instance_loaded_status(sender, instance, **kwargs):
+    # Экземпляр, сохранённый в обход save() (loaddata), или загруженный без
+    # полей status/book (defer/only), не знает прежних значений - берём их из базы
+    if not instance._state.adding and not (hasattr(instance, '_loaded_status')
+                                           and hasattr(instance, '_loaded_book_id')):
+        row = BookInstance.objects.filter(pk=instance.pk).values_list('status', 'book_id').first()
+        if row:
+            instance._loaded_status, instance._loaded_book_id = row
+
+
+@receiver(post_save, sender=BookInstance)
+def book_instance_saved(sender, instance, created, **kwargs):
+    old = None
+    if not created and hasattr(instance, '_loaded_status'):
+        old = (instance._loaded_status, getattr(instance, '_loaded_book_id', instance.book_id))
+    apply_copy_changes([(instance.pk, old, (instance.status, instance.book_id))])
+    instance._loaded_status, instance._loaded_book_id = instance.status, instance.book_id
+
+
+@receiver(pre_delete, sender=BookInstance)
+def book_instance_deleting(sender, instance, **kwargs):
+    # удаление идёт в транзакции; блокируем строку и берём её текущие значения
+    row = BookInstance.objects.select_for_update().filter(pk=instance.pk).values_list('status', 'book_id').first()
+    if row:
+        instance._loaded_status, instance._loaded_book_id = row
+
+
+@receiver(post_delete, sender=BookInstance)
+def book_instance_deleted(sender, instance, **kwargs):
+    old = (getattr(instance, '_loaded_status', instance.status), getattr(instance, '_loaded_book_id', instance.book_id))
+    apply_copy_changes([(instance.pk, old, None)])
+
+
+@receiver(copies_changed, sender=BookInstance)
+def book_instances_updated(sender, changes, **kwargs):
+    apply_copy_changes(changes)
@@ -0,0 +1,52 @@
+// Автодополнение для <select data-autocomplete-url> (catalog.forms.AutocompleteSelect):
+// над списком появляется поле ввода, варианты подгружаются по мере ввода.
+(function () {
+    'use strict';
+
+    var DELAY = 200;
+
+    function setup(select) {
+        var input = document.createElement('input');
+        var timer = null;
+        var request = 0;
+        input.type = 'search';
+        input.placeholder = 'Начните вводить...';
+        input.autocomplete = 'off';
+        select.parentNode.insertBefore(input, select);
+
+        function load() {
+            var current = ++request;
+            var url = select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+            fetch(url, {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (current !== request) {
+                        return;  // пришёл ответ на устаревший ввод
+                    }
+                    Array.prototype.slice.call(select.options).forEach(function (option) {
+                        if (!option.selected && option.value) {
+                            select.removeChild(option);
+                        }
+                    });
+                    data.results.forEach(function (result) {
+                        if (String(result.id) !== select.value) {
+                            select.appendChild(new Option(result.text, result.id));
+                        }
+                    });
+                    select.size = Math.min(select.options.length, 10);
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(load, DELAY);
+        });
+        select.addEventListener('change', function () {
+            select.size = 0;
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        Array.prototype.forEach.call(document.querySelectorAll('select[data-autocomplete-url]'), setup);
+    });
+})();
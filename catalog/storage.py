@@ -0,0 +1,79 @@
+"""Хранилище статики: бандлы CSS поверх сжатия и хэширования WhiteNoise.
+
+При collectstatic исходные файлы каждого бандла из CATALOG_STATIC_BUNDLES
+минифицируются и склеиваются в один файл, который затем, как и остальная
+статика, получает хэш в имени и сжатые .gz/.br копии (brotli - если
+установлен пакет Brotli). WhiteNoise отдаёт файлы с хэшем с заголовком
+Cache-Control: max-age=315360000, public, immutable.
+
+WhiteNoiseMiddleware здесь - тот же middleware WhiteNoise, но без перехода
+в поток под ASGI (whitenoise 6.0 умеет только синхронную цепочку).
+"""
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from whitenoise import middleware
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .middleware import HybridMiddleware
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+_SPACES = re.compile(r'\s+')
+# пробел перед ':' не трогаем: '.a :hover' и '.a:hover' - разные селекторы
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*|(:)\s+')
+
+
+def bundles():
+    """{имя бандла: [исходные файлы]}"""
+    return getattr(settings, 'CATALOG_STATIC_BUNDLES', {})
+
+
+def minify_css(css):
+    """Убирает комментарии и лишние пробелы."""
+    css = _SPACES.sub(' ', _COMMENTS.sub('', css))
+    css = _PUNCTUATION.sub(lambda match: match.group(1) or match.group(2), css).replace(';}', '}')
+    return css.strip()
+
+
+class CatalogStaticFilesStorage(CompressedManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in bundles().items():
+                content = '\n'.join(self.read_source(paths, source) for source in sources)
+                if self.exists(name):
+                    self.delete(name)
+                self.save(name, ContentFile(minify_css(content).encode()))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run, **options)
+
+    @staticmethod
+    def read_source(paths, source):
+        storage, path = paths[source]
+        with storage.open(path) as f:
+            return f.read().decode()
+
+
+class WhiteNoiseMiddleware(HybridMiddleware, middleware.WhiteNoiseMiddleware):
+    """WhiteNoiseMiddleware для синхронной и асинхронной цепочек."""
+
+    def __init__(self, get_response=None, settings=settings):
+        middleware.WhiteNoiseMiddleware.__init__(self, get_response, settings)
+        HybridMiddleware.__init__(self, get_response)
+
+    def call(self, request):
+        return middleware.WhiteNoiseMiddleware.__call__(self, request)
+
+    async def acall(self, request):
+        if self.autorefresh:
+            # DEBUG: файл ищется на диске
+            response = await sync_to_async(self.process_request)(request)
+        else:
+            static_file = self.files.get(request.path_info)
+            # открытие файла - в потоке, поиск в словаре - нет
+            response = await sync_to_async(self.serve)(static_file, request) if static_file is not None else None
+        if response is None:
+            response = await self.get_response(request)
+        return response
@@ -0,0 +1,18 @@
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from catalog import storage
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheets(name):
+    """Ссылки на CSS-бандл: собранный файл после collectstatic, иначе исходные файлы."""
+    if name in getattr(staticfiles_storage, 'hashed_files', {}):
+        urls = [static(name)]
+    else:
+        urls = [static(source) for source in storage.bundles()[name]]
+    return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((url,) for url in urls))
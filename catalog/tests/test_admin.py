@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre
+from catalog.pagination import EstimatedCountPaginator
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AdminChangeListTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='12345', email='admin@example.com')
+        cls.genres = [Genre.objects.create(name='Genre %s' % i) for i in range(3)]
+
+    def setUp(self):
+        self.client.login(username='admin', password='12345')
+
+    def add_books(self, count):
+        start = Book.objects.count()
+        for i in range(start, start + count):
+            author = Author.objects.create(first_name='First', last_name='Last %s' % i)
+            book = Book.objects.create(title='Title %s' % i, summary='Summary', isbn='%013d' % i, author=author)
+            book.genre.set(self.genres)
+            BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_books(2)
+        few = self.count_queries(url)
+        self.add_books(8)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_book_changelist(self):
+        self.assertConstantQueries(reverse('admin:catalog_book_changelist'))
+
+    def test_bookinstance_changelist(self):
+        self.assertConstantQueries(reverse('admin:catalog_bookinstance_changelist'))
+
+    def test_delete_selected_copies_confirmation(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.post(reverse('admin:catalog_bookinstance_changelist'), {
+                    'action': 'delete_selected', '_selected_action': BookInstance.objects.values_list('pk', flat=True)})
+            # книги загружены вместе с экземплярами - названия без запроса на строку
+            self.assertContains(resp, ' (Title ', count=BookInstance.objects.count())
+            return len(queries)
+
+        self.add_books(2)
+        few = count()
+        self.add_books(8)
+        self.assertEqual(count(), few)
+
+    def test_author_change_form(self):
+        self.add_books(1)
+        author = Author.objects.get()
+        Book.objects.create(title='Other', summary='Summary', isbn='9999999999999', author=author)
+        Genre.objects.create(name='Unused genre')
+        resp = self.client.get(reverse('admin:catalog_author_change', args=[author.pk]))
+        self.assertContains(resp, 'admin-autocomplete')
+        # в виджетах только выбранные жанры, а не все жанры каталога
+        self.assertContains(resp, 'Genre 2</option>')
+        self.assertNotContains(resp, 'Unused genre')
+
+    def test_author_autocomplete_searches_by_prefix(self):
+        Author.objects.create(first_name='John', last_name='Smith')
+        # icontains нашёл бы и этого автора, поиск по началу - нет
+        Author.objects.create(first_name='Anna', last_name='Goldsmith')
+        resp = self.client.get(reverse('admin:autocomplete'), {
+            'term': 'smi', 'app_label': 'catalog', 'model_name': 'book', 'field_name': 'author'})
+        self.assertEqual([row['text'] for row in resp.json()['results']], ['Smith, John'])
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    def test_exact_count_without_estimate(self):
+        for i in range(3):
+            Genre.objects.create(name='Genre %s' % i)
+        paginator = EstimatedCountPaginator(Genre.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+        self.assertEqual(EstimatedCountPaginator(Genre.objects.filter(name='Genre 1').order_by('pk'), 2).count, 1)
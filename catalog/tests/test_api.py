@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        language = Language.objects.create(name='English')
+        fantasy = Genre.objects.create(name='Fantasy')
+        adventure = Genre.objects.create(name='Adventure')
+        cls.books = []
+        for i in range(5):
+            book = Book.objects.create(title='Book %s' % i, summary='Summary', isbn='%013d' % i,
+                                       author=cls.author if i % 2 == 0 else None, language=language)
+            book.genre.set([fantasy, adventure] if i == 0 else [fantasy])
+            cls.books.append(book)
+        for status in ('a', 'a', 'o'):
+            BookInstance.objects.create(book=cls.books[0], imprint='Imprint', status=status)
+
+    def get(self, name, **params):
+        resp = self.client.get(reverse(name), params)
+        return resp, resp.json()
+
+    def test_books_with_embedded_relations(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp, data = self.get('api-books', limit=2)
+        # страница, авторы, жанры
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(resp['Content-Type'], 'application/json')
+        self.assertEqual(data['results'][0], {
+            'id': self.books[0].pk,
+            'title': 'Book 0',
+            'author': {'id': self.author.pk, 'first_name': 'John', 'last_name': 'Tolkien'},
+            'genres': [{'id': self.books[0].genre.get(name='Adventure').pk, 'name': 'Adventure'},
+                       {'id': self.books[0].genre.get(name='Fantasy').pk, 'name': 'Fantasy'}],
+        })
+        self.assertIsNone(data['results'][1]['author'])
+        self.assertIsNone(data['previous'])
+
+    def test_cursor_walks_all_books(self):
+        titles = []
+        cursor = ''
+        while cursor is not None:
+            _, data = self.get('api-books', fields='title', limit=2, cursor=cursor)
+            titles += [row['title'] for row in data['results']]
+            cursor = data['next']
+        self.assertEqual(titles, ['Book %s' % i for i in range(5)])
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            _, data = self.get('api-books', fields='id,isbn,language')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(data['results'][0], {'id': self.books[0].pk, 'isbn': '0000000000000', 'language': 'English'})
+
+    def test_bad_requests(self):
+        self.assertEqual(self.get('api-books', fields='title,password')[0].status_code, 400)
+        self.assertEqual(self.get('api-books', cursor='garbage')[0].status_code, 400)
+        self.assertEqual(self.get('api-books', author='x')[0].status_code, 400)
+        self.assertEqual(self.get('api-availability')[0].status_code, 400)
+
+    def test_authors_and_copies(self):
+        _, data = self.get('api-authors')
+        self.assertEqual(data['results'], [{'id': self.author.pk, 'first_name': 'John', 'last_name': 'Tolkien'}])
+
+        _, data = self.get('api-copies', book=self.books[0].pk, status='a')
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(data['results'][0]['book'], {'id': self.books[0].pk, 'title': 'Book 0'})
+        self.assertNotIn('borrower', data['results'][0])
+
+    def test_availability(self):
+        with self.assertNumQueries(1):
+            _, data = self.get('api-availability', book='%s,%s' % (self.books[0].pk, self.books[1].pk))
+        self.assertEqual(data['results'], [
+            {'book': self.books[0].pk, 'total': 3, 'available': 2, 'on_loan': 1},
+            {'book': self.books[1].pk, 'total': 0, 'available': 0, 'on_loan': 0},
+        ])
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.template import Context, Template
+from django.templatetags.static import static
+from django.test import AsyncClient, Client, SimpleTestCase, override_settings
+
+from catalog import checks
+from catalog.storage import minify_css
+
+
+class MinifyCssTest(SimpleTestCase):
+
+    def test_minify(self):
+        css = '/* comment */\n.a > .b ,\n.c {\n    color: red;\n    margin: 0 auto;\n}\n.d :hover { top: 0; }\n'
+        self.assertEqual(minify_css(css), '.a>.b,.c{color:red;margin:0 auto}.d :hover{top:0}')
+
+
+class ExternalAssetsCheckTest(SimpleTestCase):
+
+    def test_project_templates_are_self_hosted(self):
+        self.assertEqual(checks.check_external_assets(None), [])
+
+    def test_external_asset_fails_collectstatic(self):
+        templates = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, templates)
+        Path(templates, 'page.html').write_text(
+            '<a href="https://example.com/">ok</a>\n'
+            '<script src="//cdn.example.com/app.js"></script>\n')
+        with override_settings(TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                                           'DIRS': [templates]}]):
+            errors = checks.check_external_assets(None)
+            self.assertEqual([error.id for error in errors], ['catalog.E001'])
+            self.assertIn('//cdn.example.com/app.js', errors[0].msg)
+            self.assertTrue(errors[0].obj.endswith('page.html:2'))
+            with self.assertRaises(SystemCheckError):
+                call_command('collectstatic', interactive=False, verbosity=0, skip_checks=False)
+
+
+class StaticBundleTest(SimpleTestCase):
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_sources_linked_before_collectstatic(self):
+        html = Template("{% load catalog_assets %}{% stylesheets 'css/catalog.css' %}").render(Context())
+        self.assertInHTML('<link rel="stylesheet" href="/static/css/layout.css">', html)
+        self.assertInHTML('<link rel="stylesheet" href="/static/css/styles.css">', html)
+
+    def test_collectstatic_builds_compressed_immutable_bundle(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        with override_settings(STATIC_ROOT=root, STATICFILES_STORAGE='catalog.storage.CatalogStaticFilesStorage'):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            staticfiles_storage.hashed_files = staticfiles_storage.load_manifest()
+
+            hashed = staticfiles_storage.stored_name('css/catalog.css')
+            self.assertNotEqual(hashed, 'css/catalog.css')
+            content = Path(root, hashed).read_text()
+            self.assertIn('.text-danger{color:#dc3545}', content)
+            self.assertIn('.sidebar-nav{', content)
+            self.assertTrue(Path(root, hashed + '.gz').exists())
+
+            html = Template("{% load catalog_assets %}{% stylesheets 'css/catalog.css' %}").render(Context())
+            self.assertHTMLEqual(html, '<link rel="stylesheet" href="%s">' % static('css/catalog.css'))
+
+            # под ASGI файл отдаёт асинхронная ветка WhiteNoiseMiddleware
+            for get in (Client().get, async_to_sync(AsyncClient().get)):
+                resp = get(static('css/catalog.css'))
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn('immutable', resp['Cache-Control'])
+                resp.close()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission, User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+
+from catalog import counters, views
+from catalog.models import Author, Book, BookInstance
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+        cls.user = User.objects.create_user(username='librarian', password='12345')
+        cls.user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=cls.user)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+
+    def test_views_are_coroutines(self):
+        for url_name in ('index', 'my-borrowed', 'all-borrowed'):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(reverse(url_name)).func), url_name)
+        self.assertIs(resolve(reverse('all-borrowed')).func.view_class, views.LoanedBooksAllListView)
+
+    @override_settings(DEBUG=True)
+    def test_middleware_is_not_adapted(self):
+        # при DEBUG Django пишет в django.request о каждом обработчике, который
+        # пришлось обернуть в async_to_sync или sync_to_async
+        with self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    async def test_index(self):
+        resp = await self.async_client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['num_instances'], 2)
+        self.assertEqual(resp.context['num_instances_available'], 1)
+
+    async def test_loan_lists(self):
+        resp = await self.async_client.get(reverse('my-borrowed'))
+        self.assertEqual(resp.status_code, 302)
+
+        await sync_to_async(self.async_client.force_login)(self.user)
+        for url_name in ('my-borrowed', 'all-borrowed'):
+            resp = await self.async_client.get(reverse(url_name))
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(len(resp.context['bookinstance_list']), 1)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ConcurrentCountersTest(TransactionTestCase):
+
+    def setUp(self):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+
+    async def test_counters_are_read_concurrently(self):
+        # три чтения дождутся друг друга, только если идут одновременно
+        barrier = threading.Barrier(3, timeout=5)
+        read = counters.read
+
+        def waiting_read(names):
+            barrier.wait()
+            return read(names)
+
+        with mock.patch.object(counters, 'read', waiting_read):
+            resp = await self.async_client.get(reverse('index'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.context['num_books'], resp.context['num_instances'], resp.context['num_authors']),
+                         (1, 1, 1))
+
+    async def test_server_timing_counts_queries_of_all_threads(self):
+        resp = await self.async_client.get(reverse('index'))
+        self.assertIn('db;desc="3 queries"', resp['Server-Timing'])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BenchmarkHttpTest(LiveServerTestCase):
+
+    def test_reports_throughput_and_latency(self):
+        out = StringIO()
+        call_command('benchmark_http', self.live_server_url, '--path', reverse('index'), '--path', '/missing/',
+                     '--requests', '10', '--concurrency', '2', '--warmup', '0', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        index_line, missing_line = lines[1].split(), lines[2].split()
+        self.assertEqual(index_line[1], '0')
+        self.assertEqual(missing_line[1], '10')
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import autocomplete
+from catalog.forms import BookForm
+from catalog.models import Author, Book, Genre, Language
+
+
+class AutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.smith = Author.objects.create(first_name='John', last_name='Smith')
+        cls.smithers = Author.objects.create(first_name='Anna', last_name='smithers')
+        cls.jones = Author.objects.create(first_name='Smith', last_name='Jones')
+        Book.objects.create(title='The Silent River', summary='Summary', isbn='9791234567890', author=cls.smith)
+        Book.objects.create(title='the silver key', summary='Summary', isbn='9781111111111', author=cls.jones)
+        Book.objects.create(title='Silence', summary='Summary', isbn='9792222222222', author=cls.jones)
+        Book.objects.create(title='1984', summary='Summary', isbn='9780451524935', author=cls.smith)
+
+    def get(self, name, q):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse(name), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_authors_by_last_name_prefix_ignoring_case(self):
+        data = self.get('api-author-autocomplete', 'SMI')
+        self.assertEqual([row['text'] for row in data['results']], ['Smith, John', 'smithers, Anna'])
+        self.assertEqual(data['results'][0]['id'], self.smith.pk)
+        self.assertFalse(data['more'])
+
+    def test_authors_by_last_and_first_name(self):
+        for q in ('smi an', 'smi, an'):
+            data = self.get('api-author-autocomplete', q)
+            self.assertEqual([row['id'] for row in data['results']], [self.smithers.pk], q)
+
+    def test_books_by_title_or_isbn(self):
+        data = self.get('api-book-autocomplete', 'the sil')
+        self.assertEqual([row['text'] for row in data['results']],
+                         ['The Silent River (9791234567890)', 'the silver key (9781111111111)'])
+        data = self.get('api-book-autocomplete', '979-')
+        self.assertEqual(len(data['results']), 2)
+        self.assertEqual(self.get('api-book-autocomplete', '97912')['results'][0]['text'],
+                         'The Silent River (9791234567890)')
+
+    def test_digits_match_title_and_isbn(self):
+        data = self.get('api-book-autocomplete', '1984')
+        self.assertEqual([row['text'] for row in data['results']], ['1984 (9780451524935)'])
+        data = self.get('api-book-autocomplete', '978')
+        self.assertEqual([row['text'] for row in data['results']],
+                         ['1984 (9780451524935)', 'the silver key (9781111111111)'])
+
+    def test_more_results(self):
+        rows, more = autocomplete.search(autocomplete.authors(''), limit=2)
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(more)
+
+    def test_lookups_use_index(self):
+        plan = autocomplete.authors('smi jo')[:21].explain()
+        self.assertIn('author_name_prefix_idx', plan)
+        plan = autocomplete.books('the sil')[:21].explain()
+        self.assertIn('book_title_prefix_idx', plan)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BookFormAutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='librarian', password='secret')
+        cls.user.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        cls.authors = [Author.objects.create(first_name='First%d' % i, last_name='Last%d' % i) for i in range(5)]
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.language = Language.objects.create(name='English')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123',
+                                       author=cls.authors[3], language=cls.language)
+
+    def test_only_selected_author_is_rendered(self):
+        html = str(BookForm(instance=self.book)['author'])
+        self.assertIn('data-autocomplete-url="%s"' % reverse('api-author-autocomplete'), html)
+        self.assertIn('<option value="%d" selected>Last3, First3</option>' % self.authors[3].pk, html)
+        self.assertNotIn('Last0', html)
+
+    def test_book_update_page(self):
+        self.client.login(username='librarian', password='secret')
+        response = self.client.get(reverse('book-update', args=[self.book.pk]))
+        self.assertContains(response, 'js/autocomplete.js')
+        self.assertNotContains(response, 'Last0')
+
+        response = self.client.post(reverse('book-update', args=[self.book.pk]), {
+            'title': 'Book Title', 'author': self.authors[0].pk, 'summary': 'Summary', 'isbn': '1234567890123',
+            'genre': [self.genre.pk], 'language': self.language.pk})
+        self.assertEqual(response.status_code, 302)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.author, self.authors[0])
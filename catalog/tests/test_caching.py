@@ -0,0 +1,243 @@
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from catalog import caching, checks
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+                   CATALOG_PAGE_CACHE_TIMEOUT=300)
+class PageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tolkien = Author.objects.create(first_name='John', last_name='Tolkien')
+        cls.herbert = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.language = Language.objects.create(name='English')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.hobbit = Book.objects.create(title='The Hobbit', summary='Hobbits', isbn='0000000000001',
+                                         author=cls.tolkien, language=cls.language)
+        cls.hobbit.genre.add(cls.genre)
+        cls.dune = Book.objects.create(title='Dune', summary='Spice', isbn='0000000000002',
+                                       author=cls.herbert, language=cls.language)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def get(self, name, *args):
+        # записи и сброс тегов происходят после коммита
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(reverse(name, args=args))
+
+    def change(self, func, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return func(*args, **kwargs)
+
+    def assertCached(self, name, *args):
+        resp = self.get(name, *args)
+        self.assertEqual(resp['X-Cache'], 'HIT', name)
+        return resp
+
+    def assertNotCached(self, name, *args):
+        resp = self.get(name, *args)
+        self.assertEqual(resp['X-Cache'], 'MISS', name)
+        return resp
+
+    def test_hit_without_rendering_queries(self):
+        first = self.assertNotCached('book-detail', self.hobbit.pk)
+        # остаётся только проверка времени изменения
+        with self.assertNumQueries(1):
+            second = self.assertCached('book-detail', self.hobbit.pk)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+
+    def test_copy_change_invalidates_book_and_author_only(self):
+        pages = [('book-detail', self.hobbit.pk), ('author-detail', self.tolkien.pk),
+                 ('book-detail', self.dune.pk), ('author-detail', self.herbert.pk), ('books',), ('authors',)]
+        for page in pages:
+            self.get(*page)
+
+        copy = self.change(BookInstance.objects.create, book=self.hobbit, imprint='Imprint', status='a')
+        self.assertContains(self.assertNotCached('book-detail', self.hobbit.pk), 'Imprint')
+        self.assertNotCached('author-detail', self.tolkien.pk)
+        for page in pages[2:]:
+            self.assertCached(*page)
+
+        copy.status = 'o'
+        self.change(copy.save)
+        self.assertNotCached('book-detail', self.hobbit.pk)
+
+    def test_author_rename_invalidates_lists_and_books(self):
+        for page in [('books',), ('authors',), ('book-detail', self.hobbit.pk), ('book-detail', self.dune.pk)]:
+            self.get(*page)
+
+        self.tolkien.last_name = 'Tolkin'
+        self.change(self.tolkien.save)
+        self.assertContains(self.assertNotCached('books'), 'Tolkin')
+        self.assertNotCached('authors')
+        self.assertNotCached('book-detail', self.hobbit.pk)
+        self.assertCached('book-detail', self.dune.pk)
+
+    def test_book_moved_to_another_author(self):
+        self.get('author-detail', self.tolkien.pk)
+        self.get('author-detail', self.herbert.pk)
+
+        self.hobbit.author = self.herbert
+        self.change(self.hobbit.save)
+        self.assertNotContains(self.assertNotCached('author-detail', self.tolkien.pk), 'The Hobbit')
+        self.assertContains(self.assertNotCached('author-detail', self.herbert.pk), 'The Hobbit')
+
+    def test_genre_and_language_changes(self):
+        self.get('book-detail', self.hobbit.pk)
+        self.get('book-detail', self.dune.pk)
+
+        self.genre.name = 'High Fantasy'
+        self.change(self.genre.save)
+        self.assertNotCached('book-detail', self.hobbit.pk)
+        self.assertCached('book-detail', self.dune.pk)
+
+        self.language.name = 'British English'
+        self.change(self.language.save)
+        self.assertNotCached('book-detail', self.hobbit.pk)
+        self.assertNotCached('book-detail', self.dune.pk)
+
+    def test_uncommitted_pages_are_not_stored(self):
+        self.client.get(reverse('book-detail', args=[self.hobbit.pk]))
+        self.assertNotCached('book-detail', self.hobbit.pk)
+
+    def test_global_tag(self):
+        self.get('books')
+        self.change(caching.invalidate, caching.GLOBAL_TAG)
+        self.assertNotCached('books')
+
+    def test_authenticated_users_bypass_cache(self):
+        User.objects.create_user(username='reader', password='12345')
+        self.client.login(username='reader', password='12345')
+        self.assertNotIn('X-Cache', self.get('books'))
+
+    @override_settings(CATALOG_PAGE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertNotIn('X-Cache', self.get('books'))
+
+    def test_stats(self):
+        self.get('books')
+        self.get('books')
+        self.get('book-detail', self.hobbit.pk)
+        stats = caching.stats()
+        self.assertEqual(stats['books'], {'hits': 1, 'misses': 1})
+        self.assertEqual(stats['book-detail'], {'hits': 0, 'misses': 1})
+        self.assertEqual(set(stats), set(caching.NAMES))
+
+        librarian = User.objects.create_user(username='librarian', password='12345')
+        librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('cache-stats'))
+        self.assertEqual(resp.json()['books']['hit_rate'], 0.5)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ConditionalGetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Tolkien')
+        cls.genre = Genre.objects.create(name='Fantasy')
+        cls.book = Book.objects.create(title='The Hobbit', summary='Hobbits', isbn='0000000000001', author=cls.author)
+        cls.book.genre.add(cls.genre)
+        cls.other = Author.objects.create(first_name='Frank', last_name='Herbert')
+
+    def revalidate(self, name, *args):
+        """Второй запрос с валидаторами из первого ответа."""
+        resp = self.client.get(reverse(name, args=args))
+        headers = {'HTTP_IF_NONE_MATCH': resp['ETag']}
+        if resp.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = resp['Last-Modified']
+        return resp, headers
+
+    def assertNotModified(self, name, *args, headers):
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse(name, args=args), **headers)
+        self.assertEqual(resp.status_code, 304)
+
+    def assertModified(self, name, *args, headers):
+        resp = self.client.get(reverse(name, args=args), **headers)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_detail_pages(self):
+        for name, pk in (('book-detail', self.book.pk), ('author-detail', self.author.pk)):
+            resp, headers = self.revalidate(name, pk)
+            self.assertIn('no-cache', resp['Cache-Control'])
+            self.assertNotModified(name, pk, headers=headers)
+
+    def test_copy_change_bubbles_to_book_and_author(self):
+        _, book_headers = self.revalidate('book-detail', self.book.pk)
+        _, author_headers = self.revalidate('author-detail', self.author.pk)
+        before = Book.objects.get(pk=self.book.pk).updated_at
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        self.assertGreater(Book.objects.get(pk=self.book.pk).updated_at, before)
+        self.assertModified('book-detail', self.book.pk, headers=book_headers)
+        self.assertModified('author-detail', self.author.pk, headers=author_headers)
+
+    def test_related_changes(self):
+        _, headers = self.revalidate('book-detail', self.book.pk)
+        self.genre.name = 'High Fantasy'
+        self.genre.save()
+        self.assertModified('book-detail', self.book.pk, headers=headers)
+
+        _, headers = self.revalidate('book-detail', self.book.pk)
+        self.author.last_name = 'Tolkin'
+        self.author.save()
+        self.assertModified('book-detail', self.book.pk, headers=headers)
+
+    def test_book_moved_to_another_author(self):
+        _, headers = self.revalidate('author-detail', self.author.pk)
+        self.book.author = self.other
+        self.book.save()
+        self.assertModified('author-detail', self.author.pk, headers=headers)
+
+    def test_lists_detect_deletes(self):
+        Book.objects.create(title='Dune', summary='Spice', isbn='0000000000002', author=self.other)
+        resp, headers = self.revalidate('books')
+        self.assertFalse(resp.has_header('Last-Modified'))
+        self.assertNotModified('books', headers=headers)
+        Book.objects.get(isbn='0000000000002').delete()
+        self.assertModified('books', headers=headers)
+
+        _, headers = self.revalidate('authors')
+        self.assertNotModified('authors', headers=headers)
+        Author.objects.create(first_name='Jane', last_name='Doe')
+        self.assertModified('authors', headers=headers)
+
+    def test_author_rename_changes_book_list(self):
+        _, headers = self.revalidate('books')
+        self.author.last_name = 'Tolkin'
+        self.author.save()
+        self.assertModified('books', headers=headers)
+
+    def test_validators_depend_on_user(self):
+        _, headers = self.revalidate('book-detail', self.book.pk)
+        User.objects.create_user(username='reader', password='12345')
+        self.client.login(username='reader', password='12345')
+        self.assertModified('book-detail', self.book.pk, headers=headers)
+
+    def test_missing_object(self):
+        resp = self.client.get(reverse('book-detail', args=[self.book.pk + 100]))
+        self.assertEqual(resp.status_code, 404)
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+
+    @override_settings(CATALOG_PAGE_CACHE_TIMEOUT=300)
+    def test_page_cache_needs_shared_backend(self):
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['catalog.E002'])
+
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                                   'LOCATION': 'catalog_cache'}}):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+    @override_settings(CATALOG_PAGE_CACHE_TIMEOUT=0)
+    def test_disabled_page_cache(self):
+        self.assertEqual(checks.check_shared_cache(None), [])
@@ -0,0 +1,226 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.test import TestCase
+
+from catalog import counters, search
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ImportCatalogTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv(self):
+        path = self.write('books.csv', (
+            'title,isbn,summary,author_first_name,author_last_name,genres,language,copies,imprint\n'
+            'The Hobbit,0000000000001,Hobbits,John,Tolkien,Fantasy;Adventure,English,3,Allen\n'
+            'The Silmarillion,0000000000002,Elves,John,Tolkien,Fantasy,English,1,Allen\n'
+            'Dune,0000000000003,Spice,Frank,Herbert,,English,0,\n'
+        ))
+        call_command('import_catalog', path, '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 2)
+        self.assertEqual(Genre.objects.count(), 2)
+        self.assertEqual(Language.objects.count(), 1)
+        self.assertEqual(BookInstance.objects.count(), 4)
+        hobbit = Book.objects.get(isbn='0000000000001')
+        self.assertEqual(set(hobbit.genre.values_list('name', flat=True)), {'Adventure', 'Fantasy'})
+        self.assertEqual(str(hobbit.author), 'Tolkien, John')
+        self.assertEqual(counters.read(), counters.compute())
+        self.assertEqual([row['id'] for row in search.search('hobbit')[0]], [hobbit.pk])
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_import_jsonl_is_idempotent(self):
+        records = [{'title': 'Book %d' % i, 'isbn': '%013d' % i, 'author_first_name': 'Jane',
+                    'author_last_name': 'Doe', 'genres': ['Poetry'], 'language': 'French', 'copies': 2}
+                   for i in range(5)]
+        path = self.write('books.jsonl', '\n'.join(json.dumps(record) for record in records))
+        call_command('import_catalog', path, stdout=StringIO())
+        call_command('import_catalog', path, stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 5)
+        self.assertEqual(BookInstance.objects.count(), 10)
+        self.assertEqual(Author.objects.count(), 1)
+
+    def test_failed_batch_can_be_resumed(self):
+        good = {'title': 'Good', 'isbn': '0000000000001', 'author_last_name': 'Doe', 'author_first_name': 'J',
+                'copies': 3, 'status': 'o'}
+        bad = {'title': 'Bad', 'isbn': '0000000000002', 'copies': 'many'}
+        path = self.write('books.jsonl', '\n'.join(json.dumps(record) for record in (good, bad)))
+        with self.assertRaises(CommandError):
+            call_command('import_catalog', path, '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 1)
+        with open(path + '.checkpoint') as f:
+            self.assertEqual(f.read(), '1')
+        # счётчики сохранённой пачки уже верны
+        self.assertEqual(counters.read(), counters.compute())
+        self.assertEqual(counters.book_copies_drift(), {})
+
+        bad['copies'] = 1
+        self.write('books.jsonl', '\n'.join(json.dumps(record) for record in (good, bad)))
+        out = StringIO()
+        call_command('import_catalog', path, '--resume', stdout=out)
+        self.assertIn('Resuming after 1 records', out.getvalue())
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(BookInstance.objects.count(), 4)
+        self.assertEqual(counters.read(), counters.compute())
+        self.assertEqual(counters.book_copies_drift(), {})
+
+
+class ExportCatalogTest(TestCase):
+
+    def test_export_to_file(self):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+        BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'copies.jsonl')
+            call_command('export_catalog', 'copies', '--format', 'jsonl', '--output', path)
+            with open(path, encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['title'], 'Book Title')
+        self.assertEqual(records[0]['status'], 'a')
+
+
+class SendOverdueNoticesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        today = datetime.date.today()
+        book = Book.objects.create(title='The Hobbit', summary='Hobbits', isbn='0000000000001')
+        other = Book.objects.create(title='Dune', summary='Spice', isbn='0000000000002')
+        cls.alice = User.objects.create_user(username='alice', email='alice@example.com')
+        cls.bob = User.objects.create_user(username='bob', email='bob@example.com')
+        nomail = User.objects.create_user(username='nomail')
+        for borrower, title_book, days in ((cls.alice, book, 3), (cls.alice, other, 10), (cls.bob, book, 1),
+                                           (nomail, other, 2)):
+            BookInstance.objects.create(book=title_book, imprint='Imprint', status='o', borrower=borrower,
+                                        due_back=today - datetime.timedelta(days=days))
+        # не просрочена
+        BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=cls.bob,
+                                    due_back=today + datetime.timedelta(days=3))
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('send_overdue_notices', *args, stdout=out)
+        return out.getvalue()
+
+    def test_one_message_per_borrower(self):
+        out = self.run_command()
+        self.assertIn('Sent 2 notices for 3 overdue copies, 1 borrowers without email', out)
+        by_recipient = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(set(by_recipient), {'alice@example.com', 'bob@example.com'})
+        self.assertIn('The Hobbit', by_recipient['alice@example.com'].body)
+        self.assertIn('Dune', by_recipient['alice@example.com'].body)
+        self.assertEqual(BookInstance.objects.filter(last_notified=datetime.date.today()).count(), 3)
+
+    def test_idempotent(self):
+        self.run_command()
+        self.assertIn('Sent 0 notices', self.run_command())
+        self.assertEqual(len(mail.outbox), 2)
+
+        # продлённая и снова просроченная книга - повод напомнить ещё раз
+        copy = BookInstance.objects.get(borrower=self.bob, last_notified__isnull=False)
+        BookInstance.objects.filter(pk=copy.pk).update(last_notified=copy.due_back - datetime.timedelta(days=1))
+        self.assertIn('Sent 1 notices', self.run_command())
+
+    def test_dry_run(self):
+        out = self.run_command('--dry-run')
+        self.assertIn('Would send 2 notices', out)
+        self.assertEqual(mail.outbox, [])
+        self.assertFalse(BookInstance.objects.filter(last_notified__isnull=False).exists())
+
+    def test_batches_reuse_one_connection(self):
+        with mock.patch.object(EmailBackend, 'send_messages', autospec=True,
+                               side_effect=lambda backend, messages: len(messages)) as send, \
+                mock.patch.object(EmailBackend, 'open', autospec=True) as open_connection:
+            self.run_command('--batch-size', '1')
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(len({id(call.args[0]) for call in send.call_args_list}), 1)
+        open_connection.assert_called_once()
+
+
+class SeedCatalogTest(TestCase):
+
+    def seed(self, **options):
+        options = {'authors': 20, 'books': 200, 'copies': 2000, 'users': 30, 'batch_size': 300, **options}
+        out = StringIO()
+        call_command('seed_catalog', *['--%s=%s' % (name.replace('_', '-'), value)
+                                       for name, value in options.items()], stdout=out)
+        return out.getvalue()
+
+    def snapshot(self):
+        return (list(Book.objects.order_by('isbn').values_list('isbn', 'title', 'author__last_name')),
+                list(BookInstance.objects.order_by('id').values_list('id', 'status', 'book__isbn')))
+
+    def test_generates_all_tables(self):
+        out = self.seed()
+        self.assertIn('Seeded 20 authors, 200 books, 2000 copies and 30 users', out)
+        self.assertEqual(Book.objects.values('isbn').distinct().count(), 200)
+        self.assertTrue(all(len(isbn) == 13 for isbn in Book.objects.values_list('isbn', flat=True)))
+        self.assertFalse(Book.objects.filter(genre__isnull=True).exists())
+        self.assertEqual(set(BookInstance.objects.values_list('status', flat=True)),
+                         {status for status, _ in BookInstance.LOAN_STATUS})
+        self.assertFalse(BookInstance.objects.filter(status__exact='o', borrower__isnull=True).exists())
+        self.assertTrue(self.client.login(username='patron0000000', password='patron'))
+        # счётчики и индекс поиска обновлены после bulk-вставок
+        self.assertEqual(counters.read(), counters.compute())
+        self.assertEqual(counters.book_copies_drift(), {})
+
+    def test_deterministic(self):
+        with transaction.atomic():
+            self.seed(seed=7)
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_skew(self):
+        self.seed(skew=2.0)
+        top = Book.objects.values('author').annotate(n=Count('id')).order_by('-n')[0]['n']
+        # самый плодовитый автор при skew=2 пишет больше половины книг
+        self.assertGreater(top, 100)
+
+        top_loans = BookInstance.objects.filter(status__exact='o').values('book') \
+            .annotate(n=Count('id')).order_by('-n')[0]['n']
+        self.assertGreater(top_loans, BookInstance.objects.filter(status__exact='o').count() // 3)
+
+    def test_appends_with_unique_isbns(self):
+        self.seed()
+        self.seed()
+        self.assertEqual(Book.objects.values('isbn').distinct().count(), 400)
+        self.assertEqual(User.objects.filter(username__startswith='patron').count(), 60)
+
+    def test_appends_after_deletes_and_real_isbns(self):
+        self.seed(books=20, copies=50, users=5)
+        User.objects.get(username='patron0000001').delete()
+        book = Book.objects.filter(isbn__startswith='979').order_by('isbn').first()
+        book.bookinstance_set.all().delete()
+        book.delete()
+        # настоящая книга с префиксом 979 и номером больше сгенерированных
+        Book.objects.create(title='Real', summary='Summary', isbn='9791000000005')
+        self.seed(books=20, copies=50, users=5)
+        self.assertEqual(Book.objects.count(), 40)
+        self.assertEqual(User.objects.filter(username__startswith='patron').count(), 9)
+        self.assertTrue(User.objects.filter(username='patron0000009').exists())
@@ -0,0 +1,166 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import counters, loans
+from catalog.models import Author, Book, BookInstance, CatalogCounter
+
+
+class CatalogCounterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=cls.author)
+
+    def assertCountersMatch(self):
+        self.assertEqual(counters.read(), counters.compute())
+
+    def test_create_and_delete(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o')
+        self.assertEqual(counters.read()[counters.INSTANCES_AVAILABLE], 1)
+        self.assertCountersMatch()
+
+        copy.delete()
+        Author.objects.create(first_name='Jane', last_name='Doe').delete()
+        self.assertCountersMatch()
+
+    def test_status_change(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o')
+        copy.status = 'a'
+        copy.save()
+        self.assertEqual(counters.read()[counters.INSTANCES_AVAILABLE], 1)
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.status = 'd'
+        copy.save()
+        # повторное сохранение без смены статуса счётчик не меняет
+        copy.save()
+        self.assertCountersMatch()
+
+    def test_status_change_of_deferred_instance(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        copy = BookInstance.objects.defer('status').get(pk=copy.pk)
+        copy.status = 'o'
+        copy.save()
+        self.assertCountersMatch()
+
+    def test_missing_counter_rows_are_rebuilt(self):
+        CatalogCounter.objects.all().delete()
+        Book.objects.create(title='Other', summary='Summary', isbn='1234567890124')
+        self.assertCountersMatch()
+
+    def test_rebuild_command_reports_drift(self):
+        CatalogCounter.objects.filter(name=counters.BOOKS).update(value=42)
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        self.assertIn('books: stored 42, actual 1', out.getvalue())
+        self.assertEqual(counters.read()[counters.BOOKS], 42)
+
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCountersMatch()
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_index_reads_counters_without_count(self):
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('index'))
+        catalog_queries = [query['sql'] for query in queries if 'catalog_' in query['sql']]
+        # книги, экземпляры и авторы - три независимых чтения строк CatalogCounter
+        self.assertEqual(len(catalog_queries), 3)
+        self.assertTrue(all('catalog_catalogcounter' in sql and 'COUNT(' not in sql for sql in catalog_queries))
+        self.assertEqual(resp.context['num_books'], 1)
+        self.assertEqual(resp.context['num_instances_available'], 1)
+        self.assertEqual(resp.context['num_authors'], 1)
+
+
+class BookCopiesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=cls.author)
+        cls.other = Book.objects.create(title='Other', summary='Summary', isbn='1234567890124', author=cls.author)
+
+    def copies(self, book):
+        return Book.objects.filter(pk=book.pk).values_list('copies_total', 'copies_available', 'copies_on_loan').get()
+
+    def assertCopiesMatch(self):
+        self.assertEqual(counters.book_copies_drift(), {})
+        self.assertEqual(counters.read(), counters.compute())
+
+    def test_create_status_change_and_delete(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='o')
+        self.assertEqual(self.copies(self.book), (2, 1, 1))
+
+        copy.status = 'o'
+        copy.save()
+        copy.save()
+        self.assertEqual(self.copies(self.book), (2, 0, 2))
+
+        copy.delete()
+        self.assertEqual(self.copies(self.book), (1, 0, 1))
+        self.assertCopiesMatch()
+
+    def test_move_to_other_book(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        copy.book = self.other
+        copy.save()
+        self.assertEqual(self.copies(self.book), (0, 0, 0))
+        self.assertEqual(self.copies(self.other), (1, 1, 0))
+        self.assertCopiesMatch()
+
+    def test_stale_instance_does_not_count_twice(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        stale = BookInstance.objects.get(pk=copy.pk)
+        copy.status = 'o'
+        copy.save()
+        # второй объект загружен до смены статуса; прежний статус берётся из базы
+        stale.status = 'o'
+        stale.save()
+        self.assertEqual(self.copies(self.book), (1, 0, 1))
+        self.assertCopiesMatch()
+
+    def test_queryset_update(self):
+        for status in ('a', 'a', 'o', 'd'):
+            BookInstance.objects.create(book=self.book, imprint='Imprint', status=status)
+        self.assertEqual(BookInstance.objects.filter(status__exact='a').update(status='o'), 2)
+        self.assertEqual(self.copies(self.book), (4, 0, 3))
+
+        BookInstance.objects.filter(status__exact='o').update(book=self.other, status='a')
+        self.assertEqual(self.copies(self.book), (1, 0, 0))
+        self.assertEqual(self.copies(self.other), (3, 3, 0))
+        self.assertCopiesMatch()
+
+    def test_quiet_update_skips_bookkeeping(self):
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='o')
+        with self.assertNumQueries(1):
+            BookInstance.objects.filter(pk=copy.pk).update(last_notified=datetime.date.today())
+
+    def test_bulk_loans(self):
+        copies = [BookInstance.objects.create(book=self.book, imprint='Imprint', status='o') for _ in range(3)]
+        loans.mark_returned([copy.pk for copy in copies[:2]])
+        self.assertEqual(self.copies(self.book), (3, 2, 1))
+        loans.set_status([copies[2].pk], 'r')
+        self.assertEqual(self.copies(self.book), (3, 2, 0))
+        self.assertCopiesMatch()
+
+    def test_rebuild_command_fixes_book_drift(self):
+        BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        Book.objects.filter(pk=self.book.pk).update(copies_total=5, copies_available=0)
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        self.assertIn('book %s copies (total, available, on loan): stored (5, 0, 0), actual (1, 1, 0)'
+                      % self.book.pk, out.getvalue())
+        self.assertEqual(self.copies(self.book), (5, 0, 0))
+
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.copies(self.book), (1, 1, 0))
+        self.assertCopiesMatch()
@@ -0,0 +1,62 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from catalog import loadtest
+from catalog.models import Author, Book, BookInstance
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class LoadTestCommandTest(LiveServerTestCase):
+
+    def setUp(self):
+        patron = User.objects.create_user(username='patron0000000', password='patron')
+        librarian = User.objects.create_user(username='librarian', password='secret')
+        librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+        self.copy = BookInstance.objects.create(book=book, imprint='Imprint', status='o', borrower=patron,
+                                                due_back=datetime.date.today())
+
+    def loadtest(self, *args):
+        out = StringIO()
+        call_command('loadtest', self.live_server_url, '--patron-count', '1', *args, stdout=out)
+        return {line.split()[0]: line.split() for line in out.getvalue().splitlines()[1:-1]}
+
+    def test_reports_every_url_name(self):
+        # тестовая база SQLite в памяти не выдерживает параллельных записей
+        # сессий, поэтому смеси запускаются по одному пользователю
+        rows = self.loadtest('--patrons', '1', '--librarians', '0', '--duration', '0.5')
+        rows.update(self.loadtest('--patrons', '0', '--librarians', '1', '--librarian', 'librarian:secret',
+                                  '--duration', '0.5'))
+        self.assertEqual(set(rows), {'login', 'books', 'book-detail', 'my-borrowed', 'all-borrowed',
+                                     'renew-book-librarian'})
+        for url_name, row in rows.items():
+            self.assertEqual(row[2], '0', url_name)
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.due_back, datetime.date.today() + datetime.timedelta(weeks=2))
+
+    def test_wrong_password_is_an_error(self):
+        rows = self.loadtest('--patrons', '1', '--librarians', '0', '--patron-password', 'wrong',
+                             '--duration', '0.1')
+        self.assertEqual(rows, {'login': rows['login']})
+        self.assertEqual(rows['login'][1:3], ['2', '1'])
+
+    def test_librarians_need_credentials(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', self.live_server_url, '--librarians', '1', stdout=StringIO())
+
+
+class SummarizeTest(SimpleTestCase):
+
+    def test_percentiles_per_url_name(self):
+        samples = [loadtest.Sample('books', i / 100, True) for i in range(1, 101)]
+        samples.append(loadtest.Sample('books', 5.0, False))
+        samples.append(loadtest.Sample('my-borrowed', 0.2, True))
+        books, borrowed = loadtest.summarize(samples, 10)
+        self.assertEqual(books, loadtest.Summary('books', 101, 1, 10.0, 0.5, 0.95, 0.99))
+        self.assertEqual(borrowed.url_name, 'my-borrowed')
+        self.assertEqual(borrowed.p99, 0.2)
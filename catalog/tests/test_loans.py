@@ -0,0 +1,157 @@
+import datetime
+import uuid
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import counters, loans
+from catalog.models import Author, Book, BookInstance
+
+
+class BulkLoansTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = datetime.date.today()
+        cls.reader = User.objects.create_user(username='reader', password='12345')
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+
+    def copy(self, status='o', days=5):
+        due_back = self.today + datetime.timedelta(days=days) if days is not None else None
+        return BookInstance.objects.create(book=self.book, imprint='Imprint', status=status,
+                                           borrower=self.reader if status == 'o' else None, due_back=due_back)
+
+    def assertSingleUpdate(self, queries):
+        updates = [query for query in queries
+                   if query['sql'].startswith('UPDATE') and 'catalog_bookinstance' in query['sql'].split()[1]]
+        self.assertEqual(len(updates), 1)
+
+    def test_mark_returned(self):
+        loaned = [self.copy() for _ in range(3)]
+        available = self.copy(status='a', days=None)
+        with CaptureQueriesContext(connection) as queries:
+            result = loans.mark_returned([copy.pk for copy in loaned] + [available.pk])
+        self.assertSingleUpdate(queries)
+        self.assertCountEqual(result.updated, [copy.pk for copy in loaned])
+        self.assertEqual(list(result.rejected), [available.pk])
+        self.assertEqual(BookInstance.objects.filter(status='a', borrower=None, due_back=None).count(), 4)
+        self.assertEqual(counters.read(), counters.compute())
+
+    def test_renew_uses_renewal_rules(self):
+        soon = self.copy(days=5)
+        late = self.copy(days=20)
+        overdue = self.copy(days=-30)
+        missing = uuid.uuid4()
+        with CaptureQueriesContext(connection) as queries:
+            result = loans.renew([soon.pk, late.pk, overdue.pk, missing], weeks=2)
+        self.assertSingleUpdate(queries)
+        self.assertEqual(result.updated, [soon.pk])
+        self.assertEqual(result.rejected, {
+            late.pk: 'Invalid date - renewal more than 4 weeks ahead',
+            overdue.pk: 'Invalid date - renewal in past',
+            missing: 'Copy not found',
+        })
+        soon.refresh_from_db()
+        self.assertEqual(soon.due_back, self.today + datetime.timedelta(days=19))
+        late.refresh_from_db()
+        self.assertEqual(late.due_back, self.today + datetime.timedelta(days=20))
+
+    def test_set_status(self):
+        copies = [self.copy(status='a', days=None), self.copy(status='d', days=None)]
+        result = loans.set_status([copy.pk for copy in copies], 'r')
+        self.assertEqual(len(result.updated), 2)
+        self.assertEqual(BookInstance.objects.filter(status='r').count(), 2)
+        self.assertEqual(counters.read(), counters.compute())
+        with self.assertRaises(ValueError):
+            loans.set_status([copies[0].pk], 'x')
+
+    def test_set_status_ends_loan(self):
+        loaned = self.copy()
+        with CaptureQueriesContext(connection) as queries:
+            result = loans.set_status([loaned.pk], 'd')
+        self.assertSingleUpdate(queries)
+        self.assertEqual(result.updated, [loaned.pk])
+        loaned.refresh_from_db()
+        self.assertEqual((loaned.status, loaned.borrower, loaned.due_back), ('d', None, None))
+        self.assertEqual(counters.book_copies_drift(), {})
+
+    def test_set_status_on_loan_needs_borrower(self):
+        available = self.copy(status='a', days=None)
+        loaned = self.copy()
+        result = loans.set_status([available.pk, loaned.pk], 'o')
+        self.assertEqual(result.updated, [loaned.pk])
+        self.assertEqual(result.rejected, {available.pk: 'A copy can only be lent with a borrower and a due date'})
+        available.refresh_from_db()
+        self.assertEqual(available.status, 'a')
+        loaned.refresh_from_db()
+        self.assertEqual((loaned.borrower, loaned.due_back), (self.reader, self.today + datetime.timedelta(days=5)))
+
+    def test_book_updated_at_bubbles_up(self):
+        copy = self.copy()
+        before = Book.objects.get(pk=self.book.pk).updated_at
+        loans.mark_returned([copy.pk])
+        self.assertGreater(Book.objects.get(pk=self.book.pk).updated_at, before)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BulkLoansViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='12345', is_staff=True)
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        User.objects.create_user(username='reader', password='12345')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123')
+        due_back = datetime.date.today() + datetime.timedelta(days=5)
+        cls.copies = [BookInstance.objects.create(book=book, imprint='Imprint', status='o', due_back=due_back)
+                      for _ in range(2)]
+        cls.returned = BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+
+    def post(self, data, username='librarian'):
+        self.client.login(username=username, password='12345')
+        return self.client.post(reverse('bulk-loans'), data)
+
+    def test_requires_permission(self):
+        resp = self.post({'copies': [self.copies[0].pk], 'action': 'return'}, username='reader')
+        self.assertEqual(resp.status_code, 403)
+
+    def test_list_has_checkboxes(self):
+        self.client.login(username='librarian', password='12345')
+        resp = self.client.get(reverse('all-borrowed'))
+        self.assertContains(resp, 'name="copies"', count=2)
+
+    def test_renew(self):
+        resp = self.post({'copies': [copy.pk for copy in self.copies] + [self.returned.pk],
+                          'action': 'renew', 'weeks': 1})
+        self.assertEqual(resp.context['num_updated'], 2)
+        self.assertEqual(resp.context['rejected'], [(self.returned, 'Copy is not on loan')])
+        self.assertContains(resp, 'Copy is not on loan')
+
+    def test_invalid_form(self):
+        resp = self.post({'copies': ['not-a-uuid'], 'action': 'renew'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(resp.context['form'].is_valid())
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BulkLoansAdminTest(TestCase):
+
+    def test_action_reports_rejections(self):
+        User.objects.create_superuser(username='admin', password='12345', email='admin@example.com')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123')
+        loaned = BookInstance.objects.create(book=book, imprint='Imprint', status='o')
+        available = BookInstance.objects.create(book=book, imprint='Imprint', status='a')
+        self.client.login(username='admin', password='12345')
+        resp = self.client.post(reverse('admin:catalog_bookinstance_changelist'), {
+            'action': 'mark_returned',
+            '_selected_action': [loaned.pk, available.pk],
+        }, follow=True)
+        messages = [str(message) for message in resp.context['messages']]
+        self.assertIn('Updated 1 copies.', messages)
+        self.assertIn('Rejected 1 copies: %s: Copy is not on loan' % available.pk, messages)
+        loaned.refresh_from_db()
+        self.assertEqual(loaned.status, 'a')
@@ -0,0 +1,75 @@
+import re
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from catalog import metrics
+from catalog.models import Author, Book
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+                   CATALOG_PAGE_CACHE_TIMEOUT=0)
+class ServerTimingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book Title', summary='Summary', isbn='1234567890123', author=author)
+
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def timings(self, response):
+        return {name: (desc, float(dur)) for name, desc, dur in re.findall(
+            r'(\w+);(?:desc="([^"]*)";)?dur=([\d.]+)', response['Server-Timing'])}
+
+    def test_server_timing_header(self):
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('book-detail', args=[self.book.pk]))
+        timings = self.timings(resp)
+        self.assertEqual(timings['db'][0], '4 queries')
+        self.assertGreater(timings['tpl'][1], 0)
+        self.assertGreaterEqual(timings['total'][1], timings['tpl'][1])
+
+    def test_metrics_by_view_name(self):
+        self.client.get(reverse('book-detail', args=[self.book.pk]))
+        self.client.get(reverse('book-detail', args=[self.book.pk]))
+        self.client.get('/catalog/no-such-page/')
+        resp = self.client.get(reverse('metrics'))
+        self.assertEqual(resp.status_code, 200)
+        text = resp.content.decode()
+        self.assertIn('catalog_request_duration_seconds_count{view="book-detail"} 2', text)
+        self.assertIn('catalog_db_queries_bucket{view="book-detail",le="5"} 2', text)
+        self.assertIn('catalog_db_queries_bucket{view="book-detail",le="2"} 0', text)
+        self.assertIn('catalog_template_duration_seconds_count{view="<unresolved>"} 1', text)
+        self.assertIn('catalog_cache_hits_total{cache="books"} 0', text)
+
+    def test_server_timing_hidden_from_outside(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.assertNotIn('Server-Timing', self.client.get(url, REMOTE_ADDR='10.0.0.1'))
+        # гистограммы пополняются и без заголовка
+        self.assertEqual(metrics.REQUEST_SECONDS.series['book-detail']['count'], 1)
+
+        self.client.force_login(User.objects.create_user(username='staff', is_staff=True))
+        self.assertIn('Server-Timing', self.client.get(url, REMOTE_ADDR='10.0.0.1'))
+
+    def test_metrics_hidden_from_outside(self):
+        resp = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(resp.status_code, 403)
+
+
+class HistogramTest(SimpleTestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test_seconds', 'Test', (0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe('books', value)
+        self.assertEqual(histogram.render()[2:], [
+            'test_seconds_bucket{view="books",le="0.1"} 1',
+            'test_seconds_bucket{view="books",le="1"} 2',
+            'test_seconds_bucket{view="books",le="+Inf"} 3',
+            'test_seconds_sum{view="books"} 5.55',
+            'test_seconds_count{view="books"} 3',
+        ])
@@ -1,6 +1,7 @@
 from django.test import TestCase
 
 import datetime
+from unittest import mock
 
 from catalog.models import Author
 from catalog.models import Genre
@@ -8,6 +9,18 @@ from catalog.models import Book
 from catalog.models import BookInstance
 from catalog.models import Language
 from catalog.models import User
+from catalog.operations import AddIndexConcurrently
+
+
+# Тесты ниже подменяют дескрипторы полей моделей на классе, после них
+# дескрипторы нужно вернуть, иначе сломаются модели в остальных тестах
+def save_descriptors(model, names):
+    return [(model, name, model.__dict__[name]) for name in names]
+
+
+def restore_descriptors(saved):
+    for model, name, descriptor in saved:
+        setattr(model, name, descriptor)
 
 
 class AuthorModelTest(TestCase):
@@ -93,6 +106,11 @@ class GenreModelTest(TestCase):
 
 class BookModelTest(TestCase):
 
+    @classmethod
+    def tearDownClass(cls):
+        restore_descriptors(cls.saved_descriptors)
+        super().tearDownClass()
+
     @classmethod
     def setUpTestData(cls):
         # Настройка немодифицированных объектов, используемых всеми методами тестирования
@@ -105,6 +123,7 @@ class BookModelTest(TestCase):
             summary='Great book very well',
             isbn='123456789',
         )
+        cls.saved_descriptors = save_descriptors(Book, ['author', 'genre', 'language'])
         Book.author = Author.objects.get(id=1)
         Book.genre = Genre.objects.get(id=1)
         Book.language = Language.objects.get(id=1)
@@ -192,6 +211,11 @@ class BookModelTest(TestCase):
 
 class BookInstanceModelTest(TestCase):
 
+    @classmethod
+    def tearDownClass(cls):
+        restore_descriptors(cls.saved_descriptors)
+        super().tearDownClass()
+
     @classmethod
     def setUpTestData(cls):
         # Настройка немодифицированных объектов, используемых всеми методами тестирования
@@ -205,6 +229,7 @@ class BookInstanceModelTest(TestCase):
             summary='Great book very well',
             isbn='123456789',
         )
+        cls.saved_descriptors = save_descriptors(Book, ['author', 'genre', 'language'])
         Book.author = Author.objects.get(id=1)
         Book.genre = Genre.objects.get(id=1)
         Book.language = Language.objects.get(id=1)
@@ -212,6 +237,7 @@ class BookInstanceModelTest(TestCase):
         BookInstance.objects.create(imprint='Book in the list',
                                     due_back=datetime.date.fromisoformat('2019-12-04'),
                                     )
+        cls.saved_descriptors += save_descriptors(BookInstance, ['book', 'borrower'])
         BookInstance.book = Book.objects.get(id=1)
         BookInstance.borrower = User.objects.get(id=1)
 
@@ -265,3 +291,49 @@ class BookInstanceModelTest(TestCase):
 
 
 
+
+
+class BookInstanceStrTest(TestCase):
+
+    def test_title_only_from_loaded_book(self):
+        book = Book.objects.create(title='Big love', summary='Summary', isbn='123456789')
+        copy = BookInstance.objects.create(book=book, imprint='Imprint')
+        copy = BookInstance.objects.get(pk=copy.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(copy), '%s (book #%s)' % (copy.pk, book.pk))
+        copy = BookInstance.objects.select_related('book').get(pk=copy.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(copy), '%s (Big love)' % copy.pk)
+
+
+class BookInstanceIndexTest(TestCase):
+
+    def test_loans_use_index(self):
+        plan = BookInstance.objects.filter(status__exact='o').order_by('due_back').explain()
+        self.assertIn('bookinstance_', plan)
+        self.assertNotIn('TEMP B-TREE', plan.upper())
+
+    def test_admin_filters_use_index(self):
+        plan = BookInstance.objects.filter(status__exact='a').order_by('due_back').explain()
+        self.assertIn('bookinstance_status_due_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan.upper())
+
+        today = datetime.date.today()
+        plan = BookInstance.objects.filter(due_back__gte=today, due_back__lt=today + datetime.timedelta(days=7)) \
+            .explain()
+        self.assertIn('bookinstance_due_back_idx', plan)
+        # сортировка списка админки: по индексу, досортировка только внутри одной даты
+        plan = BookInstance.objects.order_by('due_back', '-id').explain()
+        self.assertIn('bookinstance_due_back_idx', plan)
+
+    def test_borrower_loans_use_index(self):
+        user = User.objects.create_user('reader')
+        plan = BookInstance.objects.filter(borrower=user, status__exact='o').order_by('due_back').explain()
+        self.assertIn('bookinstance_borrower_idx', plan)
+
+    def test_concurrent_index_requires_non_atomic_migration(self):
+        operation = AddIndexConcurrently('bookinstance', BookInstance._meta.indexes[0])
+        schema_editor = mock.Mock(atomic_migration=True)
+        schema_editor.connection.vendor = 'postgresql'
+        with self.assertRaises(ValueError):
+            operation.database_forwards('catalog', schema_editor, None, None)
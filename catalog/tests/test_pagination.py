@@ -0,0 +1,99 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import datetime
+
+from catalog.models import Author, Book, BookInstance
+from catalog.pagination import keyset_fields, paginate
+
+
+class KeysetPaginateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Одинаковые фамилии проверяют, что pk разрешает равенство ключей
+        for author_num in range(13):
+            Author.objects.create(first_name='Christian %s' % (author_num % 4),
+                                  last_name='Surname %s' % (author_num % 3))
+
+    def walk_forward(self, per_page):
+        pages, cursor = [], ''
+        while cursor is not None:
+            page = paginate(Author.objects.all(), cursor, per_page)
+            pages.append(list(page))
+            cursor = page.next_cursor
+        return pages, page
+
+    def test_keyset_fields_follow_meta_ordering(self):
+        self.assertEqual(keyset_fields(Author), ['last_name', 'first_name', 'pk'])
+        self.assertEqual(keyset_fields(Book), ['title', 'author_id', 'pk'])
+        self.assertEqual(keyset_fields(BookInstance), ['due_back', 'pk'])
+
+    def test_forward_walk_returns_every_row_in_order(self):
+        pages, last = self.walk_forward(5)
+        self.assertEqual([len(page) for page in pages], [5, 5, 3])
+        expected = list(Author.objects.order_by('last_name', 'first_name', 'pk'))
+        self.assertEqual(sum(pages, []), expected)
+        self.assertFalse(last.has_next())
+
+    def test_backward_walk_returns_same_pages(self):
+        pages, last = self.walk_forward(5)
+        page = paginate(Author.objects.all(), last.previous_cursor, 5)
+        self.assertEqual(list(page), pages[1])
+        page = paginate(Author.objects.all(), page.previous_cursor, 5)
+        self.assertEqual(list(page), pages[0])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_single_query_without_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            paginate(Author.objects.all(), '', 5)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'].upper())
+
+    def test_nullable_key(self):
+        today = datetime.date.today()
+        for days in (None, 3, None, 1, 2):
+            BookInstance.objects.create(imprint='Imprint', status='o',
+                                        due_back=None if days is None else today + datetime.timedelta(days=days))
+        rows, cursor = [], ''
+        while cursor is not None:
+            page = paginate(BookInstance.objects.all(), cursor, 2)
+            rows += list(page)
+            cursor = page.next_cursor
+        self.assertEqual([row.due_back for row in rows][:2], [None, None])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len({row.pk for row in rows}), 5)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class KeysetListViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for author_num in range(13):
+            Author.objects.create(first_name='Christian %s' % author_num, last_name='Surname %s' % author_num)
+
+    def test_cursor_mode(self):
+        resp = self.client.get(reverse('authors') + '?cursor=')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNone(resp.context['paginator'])
+        self.assertEqual(len(resp.context['author_list']), 10)
+        next_cursor = resp.context['page_obj'].next_cursor
+        self.assertContains(resp, '?cursor=%s' % next_cursor)
+
+        resp = self.client.get(reverse('authors'), {'cursor': next_cursor})
+        self.assertEqual(len(resp.context['author_list']), 3)
+        self.assertFalse(resp.context['page_obj'].has_next())
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(reverse('authors') + '?cursor=garbage')
+        self.assertEqual(resp.status_code, 404)
+
+    @override_settings(CATALOG_KEYSET_PAGINATION=True)
+    def test_keyset_by_default(self):
+        resp = self.client.get(reverse('authors'))
+        self.assertIsNone(resp.context['paginator'])
+        self.assertTrue(resp.context['is_paginated'])
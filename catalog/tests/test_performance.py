@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from catalog import benchmark
+
+
+# Шаблоны используют {% static %}, а манифест в тестах не собран
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ViewQueryCountTest(TestCase):
+    """Число запросов каждого представления не должно зависеть от объёма данных."""
+
+    small_size = 40
+    large_size = 400
+
+    def measure(self, url_name, size, page_size=None):
+        # Каждый набор данных создаётся в точке сохранения и откатывается
+        with transaction.atomic():
+            fixture = benchmark.seed_catalog(size)
+            self.client.force_login(fixture.librarian)
+            target = [t for t in benchmark.targets(fixture) if t.url_name == url_name][0]
+            result = benchmark.measure(self.client, target, repeat=0, size=page_size)
+            transaction.set_rollback(True)
+        self.assertIn(result.status_code, (200, 302))
+        return result.queries
+
+    def assertConstantQueries(self, url_name, page_sizes=(None,)):
+        counts = {self.measure(url_name, size, page_size)
+                  for size in (self.small_size, self.large_size) for page_size in page_sizes}
+        self.assertEqual(len(counts), 1, '%s: %s' % (url_name, sorted(counts)))
+
+    def test_index(self):
+        self.assertConstantQueries('index')
+
+    def test_book_list(self):
+        self.assertConstantQueries('books', page_sizes=(5, 20))
+
+    def test_book_detail(self):
+        self.assertConstantQueries('book-detail')
+
+    def test_author_list(self):
+        self.assertConstantQueries('authors', page_sizes=(5, 20))
+
+    def test_author_detail(self):
+        self.assertConstantQueries('author-detail')
+
+    def test_my_borrowed(self):
+        self.assertConstantQueries('my-borrowed', page_sizes=(5, 20))
+
+    def test_all_borrowed(self):
+        self.assertConstantQueries('all-borrowed', page_sizes=(5, 20))
+
+    def test_renew_book_librarian(self):
+        self.assertConstantQueries('renew-book-librarian')
+
+    def test_author_edit_views(self):
+        for url_name in ('author-create', 'author-update', 'author-delete'):
+            self.assertConstantQueries(url_name)
+
+    def test_book_edit_views(self):
+        for url_name in ('book-create', 'book-update', 'book-delete'):
+            self.assertConstantQueries(url_name)
+
+    def test_search(self):
+        self.assertConstantQueries('search')
+
+    def test_api(self):
+        for url_name in ('api-books', 'api-authors', 'api-copies'):
+            self.assertConstantQueries(url_name, page_sizes=(5, 20))
+        self.assertConstantQueries('api-availability')
+
+    def test_find_growth(self):
+        measurements = [
+            benchmark.Measurement('books', 5, 200, 4, 0.0, 0),
+            benchmark.Measurement('books', 20, 200, 19, 0.0, 0),
+            benchmark.Measurement('index', None, 200, 6, 0.0, 0),
+            benchmark.Measurement('index', None, 200, 6, 0.0, 0),
+        ]
+        self.assertEqual(benchmark.find_growth(measurements), ['books'])
+
+    def test_percentile(self):
+        timings = [0.001 * i for i in range(1, 101)]
+        self.assertAlmostEqual(benchmark.percentile(timings, 0.5), 0.05)
+        self.assertAlmostEqual(benchmark.percentile(timings, 0.99), 0.099)
+        self.assertEqual(benchmark.percentile([], 0.99), 0.0)
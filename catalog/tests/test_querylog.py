@@ -0,0 +1,80 @@
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import querylog
+from catalog.models import Author, Book
+
+
+class NormalizeTest(TestCase):
+
+    def test_values_are_replaced(self):
+        self.assertEqual(
+            querylog.normalize('SELECT "id"  FROM "t"\nWHERE "id" IN (%s, %s, %s) AND "n" = \'x\' LIMIT 21'),
+            'SELECT "id" FROM "t" WHERE "id" IN (?) AND "n" = ? LIMIT ?')
+        self.assertEqual(querylog.normalize('SELECT 1 WHERE "id" IN (%s)'), 'SELECT ? WHERE "id" IN (?)')
+
+
+class QueryLogTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(4):
+            author = Author.objects.create(first_name='First', last_name='Last %d' % i)
+            Book.objects.create(title='Book %d' % i, summary='Summary', isbn='%013d' % i, author=author)
+
+    def test_duplicate_queries_are_reported(self):
+        with self.assertLogs('catalog.querylog', 'WARNING') as logs:
+            with querylog.capture('n+1', slow_ms=10000, duplicate_limit=3) as log:
+                [book.author.last_name for book in Book.objects.all()]
+        (count, sql, site), = log.duplicates()
+        self.assertEqual(count, 4)
+        self.assertIn('FROM "catalog_author"', sql)
+        self.assertRegex(site, r'^catalog/tests/test_querylog\.py:\d+$')
+        self.assertIn('n+1 ran the same query 4 times', logs.output[0])
+
+    def test_no_duplicates_with_select_related(self):
+        with querylog.capture('select_related', slow_ms=10000, duplicate_limit=3) as log:
+            [book.author.last_name for book in Book.objects.select_related('author')]
+        self.assertEqual(log.duplicates(), [])
+
+    def test_slow_query_logged_with_plan_and_template_site(self):
+        template = Template('{% for book in books %}\n{{ book.author }}{% endfor %}')
+        with self.assertLogs('catalog.querylog', 'WARNING') as logs:
+            with querylog.capture('template', slow_ms=0, duplicate_limit=100) as log:
+                template.render(Context({'books': Book.objects.all()}))
+        elapsed_ms, sql, site, plan = log.slow[-1]
+        self.assertIn('catalog_author', sql)
+        self.assertIn('<unknown source>:2', site)
+        self.assertTrue(plan)
+        self.assertIn('Plan:', logs.output[-1])
+
+    def test_explain_only_for_select(self):
+        with self.assertLogs('catalog.querylog', 'WARNING'), querylog.capture('update', slow_ms=0) as log:
+            Author.objects.filter(last_name='Last 0').update(first_name='Changed')
+        self.assertIsNone(log.slow[0][3])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+                   CATALOG_PAGE_CACHE_TIMEOUT=0, CATALOG_SLOW_QUERY_MS=0, CATALOG_DUPLICATE_QUERY_LIMIT=100)
+class QueryLogMiddlewareTest(TestCase):
+
+    def test_disabled_by_default(self):
+        with self.assertNoLogs('catalog.querylog', 'WARNING'):
+            self.client.get(reverse('books'))
+
+    @override_settings(CATALOG_QUERY_LOG=True)
+    def test_logs_view_name(self):
+        with self.assertLogs('catalog.querylog', 'WARNING') as logs:
+            self.client.get(reverse('books'))
+        self.assertIn('Slow query in books (/catalog/books/)', logs.output[-1])
+        # первый запрос списка - версия для ETag
+        self.assertIn(' at catalog/counters.py:', logs.output[0])
+
+    @override_settings(CATALOG_QUERY_LOG=True)
+    async def test_logs_async_requests(self):
+        # запросы index выполняются в потоках sync_to_async
+        with self.assertLogs('catalog.querylog', 'WARNING') as logs:
+            await self.async_client.get(reverse('index'))
+        self.assertIn('Slow query in index (/catalog/)', logs.output[0])
+        self.assertIn(' at catalog/counters.py:', logs.output[0])
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from catalog import replicas
+from catalog.models import Book
+from catalog.replicas import ReplicaPinMiddleware, ReplicaRouter
+
+
+@override_settings(CATALOG_REPLICAS=['replica'], CATALOG_REPLICA_MAX_LAG=10, CATALOG_REPLICA_CHECK_INTERVAL=5)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        token = replicas._pinned.set(None)
+        self.addCleanup(replicas._pinned.reset, token)
+        replicas.reset_health()
+        self.addCleanup(replicas.reset_health)
+        patcher = mock.patch.object(replicas, 'replica_lag', return_value=0)
+        self.replica_lag = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_catalog_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Book), 'replica')
+        # остальные приложения читают из 'default'
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_reads_after_write_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+        self.assertIsNone(self.router.db_for_read(Book))
+
+    def test_lagging_or_broken_replica_is_skipped(self):
+        self.replica_lag.return_value = 60
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+        replicas.reset_health()
+        self.replica_lag.side_effect = DatabaseError('connection refused')
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_health_is_cached(self):
+        self.router.db_for_read(Book)
+        self.router.db_for_read(Book)
+        self.assertEqual(self.replica_lag.call_count, 1)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'catalog'))
+        self.assertIsNone(self.router.allow_migrate('default', 'catalog'))
+
+    @override_settings(CATALOG_REPLICAS=[])
+    def test_no_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Book))
+        self.assertIsNone(self.router.db_for_write(Book))
+
+
+@override_settings(CATALOG_REPLICAS=['replica'], CATALOG_REPLICA_STICKY_SECONDS=5)
+class ReplicaPinMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def view(self, write):
+        def view(request):
+            self.seen.append(replicas.is_pinned())
+            if write:
+                ReplicaRouter().db_for_write(Book)
+            return HttpResponse()
+        return view
+
+    def test_write_sets_sticky_cookie(self):
+        response = ReplicaPinMiddleware(self.view(write=True))(self.factory.post('/'))
+        self.assertEqual(self.seen, [False])
+        cookie = response.cookies[replicas.COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+
+        request = self.factory.get('/')
+        request.COOKIES[replicas.COOKIE] = cookie.value
+        response = ReplicaPinMiddleware(self.view(write=False))(request)
+        self.assertEqual(self.seen, [False, True])
+        # чтение не продлевает окно
+        self.assertNotIn(replicas.COOKIE, response.cookies)
+        # после запроса контекст не закреплён
+        self.assertFalse(replicas.is_pinned())
+
+    async def test_write_in_thread_pins_async_request(self):
+        view = self.view(write=True)
+
+        async def async_view(request):
+            return await sync_to_async(view)(request)
+
+        middleware = ReplicaPinMiddleware(async_view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = await middleware(self.factory.post('/'))
+        self.assertIn(replicas.COOKIE, response.cookies)
+        self.assertFalse(replicas.is_pinned())
+
+    def test_expired_cookie_is_ignored(self):
+        request = self.factory.get('/')
+        request.COOKIES[replicas.COOKIE] = '%d' % (time.time() - 1)
+        ReplicaPinMiddleware(self.view(write=False))(request)
+        self.assertEqual(self.seen, [False])
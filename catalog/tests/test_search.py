@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import search
+from catalog.models import Author, Book, Genre
+
+
+class BookSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tolkien = Author.objects.create(first_name='John', last_name='Tolkien')
+        cls.fantasy = Genre.objects.create(name='Fantasy')
+        cls.hobbit = Book.objects.create(title='The Hobbit', summary='There and back again',
+                                         isbn='1234567890123', author=cls.tolkien)
+        cls.hobbit.genre.add(cls.fantasy)
+        cls.rings = Book.objects.create(title='The Lord of the Rings', summary='One ring to rule them all',
+                                        isbn='1234567890124', author=cls.tolkien)
+        Book.objects.create(title='Dune', summary='Spice and sand, hobbit free', isbn='1234567890125')
+
+    def ids(self, query):
+        return [row['id'] for row in search.search(query)[0]]
+
+    def test_backend(self):
+        expected = {'sqlite': search.FTS5, 'postgresql': search.POSTGRESQL}.get(connection.vendor, search.BASIC)
+        self.assertEqual(search.backend(), expected)
+
+    def test_title_ranks_above_summary(self):
+        ids = self.ids('hobbit')
+        self.assertEqual(ids[0], self.hobbit.pk)
+        self.assertEqual(len(ids), 2)
+
+    def test_prefix_and_author(self):
+        self.assertEqual(set(self.ids('tolk')), {self.hobbit.pk, self.rings.pk})
+        self.assertEqual(self.ids('tolkien ring'), [self.rings.pk])
+
+    def test_genre(self):
+        self.assertEqual(self.ids('fantasy'), [self.hobbit.pk])
+
+    def test_index_follows_changes(self):
+        self.tolkien.last_name = 'Tolkin'
+        self.tolkien.save()
+        self.assertEqual(self.ids('tolkien'), [])
+        self.assertEqual(len(self.ids('tolkin')), 2)
+
+        self.hobbit.genre.clear()
+        self.assertEqual(self.ids('fantasy'), [])
+        self.fantasy.book_set.add(self.rings)
+        self.assertEqual(self.ids('fantasy'), [self.rings.pk])
+
+        self.rings.delete()
+        self.assertEqual(self.ids('ring'), [])
+
+    def test_keyset_pages(self):
+        first, cursor = search.search('the', per_page=1)
+        second, last = search.search('the', cursor, per_page=1)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+        self.assertNotEqual(first[0]['id'], second[0]['id'])
+        self.assertIsNone(last)
+
+    def test_single_query(self):
+        search.backend()
+        with self.assertNumQueries(1):
+            search.search('hobbit')
+
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_view(self):
+        resp = self.client.get(reverse('search'), {'q': 'hobbit'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'catalog/search.html')
+        self.assertContains(resp, 'The Hobbit')
+
+        resp = self.client.get(reverse('search'), {'q': 'hobbit', 'cursor': 'garbage'})
+        self.assertEqual(resp.status_code, 404)
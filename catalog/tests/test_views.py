@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth.models import Permission
@@ -6,7 +8,11 @@ from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User  # Необходимо для представления User как borrower
 
+import csv
 import datetime
+import gzip
+import io
+import json
 
 from catalog.models import Author, BookInstance, Book, Genre, Language
 from catalog.views import CreateView
@@ -363,3 +369,144 @@ class AuthorCreateTest(TestCase):
         # Проверка ответа на запрос
         self.assertEqual(resp.status_code, 200)
 
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BookDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        cls.book = Book.objects.create(title='Book Title', summary='My book summary', isbn='1234567890123',
+                                       author=author, language=language)
+        cls.book.genre.set([Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Poetry')])
+        for status in ('a', 'a', 'o', 'd'):
+            BookInstance.objects.create(book=cls.book, imprint='Unlikely Imprint, 2016', status=status)
+
+    def test_view_uses_correct_template(self):
+        resp = self.client.get(reverse('book-detail', args=[self.book.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertTemplateUsed(resp, 'catalog/book_detail.html')
+
+    def test_detail_graph_in_fixed_number_of_queries(self):
+        # время изменения, книга с автором и языком, жанры, экземпляры
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('book-detail', args=[self.book.pk]))
+        self.assertContains(resp, 'Fantasy, Poetry')
+        self.assertContains(resp, 'Unlikely Imprint', count=4)
+
+    def test_group_copies_by_status(self):
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('book-detail', args=[self.book.pk]) + '?group=status')
+        self.assertEqual(resp.context['status_counts'], [
+            {'status': 'a', 'label': 'Available', 'count': 2},
+            {'status': 'd', 'label': 'Maintenance', 'count': 1},
+            {'status': 'o', 'label': 'On loan', 'count': 1},
+        ])
+        self.assertNotContains(resp, 'Unlikely Imprint')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AuthorDetailViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='John', last_name='Smith')
+        # 13 книг для проверки разбиения на страницы, у первой три экземпляра
+        for book_num in range(13):
+            book = Book.objects.create(title='Book %02d' % book_num, summary='Summary', isbn='%013d' % book_num,
+                                       author=cls.author)
+            if book_num == 0:
+                for status in ('a', 'a', 'o'):
+                    BookInstance.objects.create(book=book, imprint='Imprint', status=status)
+
+    def test_books_annotated_in_fixed_number_of_queries(self):
+        # время изменения, автор, число книг, страница книг со счётчиками экземпляров
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('author-detail', args=[self.author.pk]))
+        self.assertEqual(resp.status_code, 200)
+        first = resp.context['book_list'][0]
+        self.assertEqual((first.copies_total, first.copies_available), (3, 2))
+        self.assertEqual(resp.context['book_list'][1].copies_total, 0)
+
+    def test_books_are_paginated(self):
+        resp = self.client.get(reverse('author-detail', args=[self.author.pk]))
+        self.assertTrue(resp.context['is_paginated'])
+        self.assertEqual(len(resp.context['book_list']), 10)
+
+        resp = self.client.get(reverse('author-detail', args=[self.author.pk]) + '?page=2')
+        self.assertEqual(len(resp.context['book_list']), 3)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class IndexVisitsTest(TestCase):
+
+    def test_visits_counted_without_session_write(self):
+        for expected in (1, 2, 3):
+            with CaptureQueriesContext(connection) as queries:
+                resp = self.client.get(reverse('index'))
+            self.assertEqual(resp.context['num_visits'], expected)
+            self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+    def test_tampered_cookie_resets_count(self):
+        self.client.cookies['num_visits'] = '100'
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 1)
+
+    @override_settings(CATALOG_VISITS_STORAGE='session')
+    def test_session_storage(self):
+        self.client.get(reverse('index'))
+        resp = self.client.get(reverse('index'))
+        self.assertEqual(resp.context['num_visits'], 2)
+        self.assertEqual(self.client.session['num_visits'], 3)
+
+
+class ExportViewTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        cls.book = Book.objects.create(title='Book, "Title"', summary='Summary', isbn='1234567890123', author=author)
+        cls.borrower = User.objects.create_user(username='borrower', password='12345')
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='o', borrower=cls.borrower,
+                                    due_back=datetime.date(2030, 1, 1))
+        cls.librarian = User.objects.create_user(username='librarian', password='12345')
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+
+    def get(self, dataset, file_format, **params):
+        self.client.login(username='librarian', password='12345')
+        return self.client.get(reverse('export', args=[dataset, file_format]), params)
+
+    def test_requires_permission(self):
+        self.client.login(username='borrower', password='12345')
+        resp = self.client.get(reverse('export', args=['books', 'csv']))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_csv(self):
+        resp = self.get('books', 'csv')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        self.assertIn('books.csv', resp['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(b''.join(resp.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'title', 'isbn'])
+        self.assertEqual(rows[1][:3], [str(self.book.pk), 'Book, "Title"', '1234567890123'])
+
+    def test_jsonl_loans(self):
+        resp = self.get('loans', 'jsonl')
+        records = [json.loads(line) for line in b''.join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]['borrower'], 'borrower')
+        self.assertEqual(records[0]['due_back'], '2030-01-01')
+
+    def test_gzip(self):
+        resp = self.get('copies', 'csv', gzip='1')
+        self.assertIn('copies.csv.gz', resp['Content-Disposition'])
+        lines = gzip.decompress(b''.join(resp.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_unknown_dataset_or_format(self):
+        self.assertEqual(self.get('users', 'csv').status_code, 404)
+        self.assertEqual(self.get('books', 'xml').status_code, 404)
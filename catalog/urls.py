@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -9,6 +9,7 @@ urlpatterns = [
     path('authors/', views.AuthorListView.as_view(), name='authors'),
     path('author/<int:pk>',
          views.AuthorDetailView.as_view(), name='author-detail'),
+    path('search/', views.search, name='search'),
 ]
 
 urlpatterns += [
@@ -18,6 +19,12 @@ urlpatterns += [
 
 urlpatterns += [
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+    path('borrowed/bulk/', views.bulk_loans, name='bulk-loans'),
+]
+
+urlpatterns += [
+    path('export/<slug:dataset>.<slug:file_format>', views.export, name='export'),
+    path('cache-stats/', views.cache_stats, name='cache-stats'),
 ]
 
 urlpatterns += [
@@ -31,3 +38,12 @@ urlpatterns += [
     path('book/<int:pk>/update/', views.BookUpdate.as_view(), name='book-update'),
     path('book/<int:pk>/delete/', views.BookDelete.as_view(), name='book-delete'),
 ]
+
+urlpatterns += [
+    path('api/books/', api.BookListApi.as_view(), name='api-books'),
+    path('api/authors/', api.AuthorListApi.as_view(), name='api-authors'),
+    path('api/copies/', api.CopyListApi.as_view(), name='api-copies'),
+    path('api/availability/', api.AvailabilityApi.as_view(), name='api-availability'),
+    path('api/autocomplete/authors/', api.AuthorAutocompleteApi.as_view(), name='api-author-autocomplete'),
+    path('api/autocomplete/books/', api.BookAutocompleteApi.as_view(), name='api-book-autocomplete'),
+]
@@ -1,3 +1,8 @@
+import asyncio
+from functools import update_wrapper, wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, transaction
 from django.shortcuts import render
 from django.views import generic
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -8,63 +13,219 @@ from django.http import HttpResponseRedirect
 from django.urls import reverse
 import datetime
 from django.contrib.auth.decorators import login_required, permission_required
-from catalog.forms import RenewBookForm
+from catalog.forms import BookForm, BulkLoanForm, RenewBookForm
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
+from django.core.paginator import Paginator
+from django.db.models import Max
+from .pagination import KeysetPaginationMixin
+from . import counters, exports, loans, metrics as request_metrics, search as book_search, visits
+from . import caching
+from .caching import CachedPageMixin, ConditionalGetMixin
+from .pagination import InvalidCursor
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+
+
+def _own_connection(func):
+    """func для отдельного потока: его соединения закрываются, как в конце запроса."""
+    @wraps(func)
+    def run(*args):
+        close_old_connections()
+        try:
+            return func(*args)
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_reads(*calls):
+    """Выполняет независимые чтения (функция, *аргументы) параллельно, каждое в своём потоке и соединении.
+
+    Внутри транзакции (ATOMIC_REQUESTS, TestCase) другие соединения не видят
+    её данных - тогда чтения идут по очереди в потоке запроса.
+    """
+    if await sync_to_async(lambda: transaction.get_connection().in_atomic_block)():
+        return [await sync_to_async(func)(*args) for func, *args in calls]
+    return await asyncio.gather(*[sync_to_async(_own_connection(func), thread_sensitive=False)(*args)
+                                  for func, *args in calls])
+
+
+async def index(request):
+    """Домашняя страница.
+
+    Асинхронная: под ASGI цикл событий обслуживает другие запросы, пока
+    счётчики книг, экземпляров и авторов читаются параллельно в потоках.
+    """
+    books, instances, authors = await gather_reads(
+        (counters.read, [counters.BOOKS]),
+        (counters.read, [counters.INSTANCES, counters.INSTANCES_AVAILABLE]),
+        (counters.read, [counters.AUTHORS]),
+    )
+    num_books = books[counters.BOOKS]
+    num_instances = instances[counters.INSTANCES]
+    num_instances_available = instances[counters.INSTANCES_AVAILABLE]
+    num_authors = authors[counters.AUTHORS]
 
+    # сессия и шаблон (пользователь, права) тоже обращаются к базе
+    num_visits = await sync_to_async(visits.get_visits)(request)
 
-def index(request):
-    """Домашняя страница"""
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_instances_available = BookInstance.objects.filter(status__exact='a').count()
-    num_authors = Author.objects.count()
-
-    num_visits = request.session.get('num_visits', 1)
-    request.session['num_visits'] = num_visits + 1
-
-    return render(
+    response = await sync_to_async(render)(
         request,
         'index.html',
         context={'num_books': num_books, 'num_instances': num_instances,
                  'num_instances_available': num_instances_available, 'num_authors': num_authors,
                  'num_visits': num_visits},
     )
+    return await sync_to_async(visits.remember_visit)(request, response, num_visits)
 
 
-class BookListView(generic.ListView):
+class BookListView(ConditionalGetMixin, CachedPageMixin, KeysetPaginationMixin, generic.ListView):
     """Список книг"""
     model = Book
     paginate_by = 10
+    cache_name = 'books'
+
+    def get_cache_tags(self):
+        return ['book-list']
 
+    def get_validators(self):
+        # версию списка увеличивают сигналы книг и авторов (catalog/signals.py)
+        return counters.list_version(counters.BOOK_LIST_VERSION, counters.BOOKS), None
 
-class BookDetailView(generic.DetailView):
-    """Конкретная книга"""
+    def get_queryset(self):
+        return Book.objects.select_related('author')
+
+
+class BookDetailView(ConditionalGetMixin, CachedPageMixin, generic.DetailView):
+    """Конкретная книга.
+
+    Автор, язык, жанры и экземпляры загружаются фиксированным числом запросов.
+    С параметром ?group=status вместо списка экземпляров выводится их
+    количество по статусам.
+    """
     model = Book
+    cache_name = 'book-detail'
+
+    def get_cache_tags(self):
+        return ['book:%s' % self.kwargs['pk']]
+
+    def get_validators(self):
+        row = Book.objects.filter(pk=self.kwargs['pk']).values_list('updated_at', 'author__updated_at').first()
+        if row is None:
+            return None, None
+        last_modified = max(value for value in row if value)
+        return last_modified.isoformat(), last_modified
 
+    def group_by_status(self):
+        return self.request.GET.get('group') == 'status'
 
-class AuthorListView(generic.ListView):
+    def get_queryset(self):
+        queryset = Book.objects.select_related('author', 'language').prefetch_related('genre')
+        if not self.group_by_status():
+            queryset = queryset.prefetch_related('bookinstance_set')
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['group_by_status'] = self.group_by_status()
+        if context['group_by_status']:
+            context['status_counts'] = self.object.status_counts()
+        return context
+
+
+class AuthorListView(ConditionalGetMixin, CachedPageMixin, KeysetPaginationMixin, generic.ListView):
     """Список авторов"""
     model = Author
     paginate_by = 10
+    cache_name = 'authors'
+
+    def get_cache_tags(self):
+        return ['author-list']
+
+    def get_validators(self):
+        return counters.list_version(counters.AUTHOR_LIST_VERSION, counters.AUTHORS), None
 
 
-class AuthorDetailView(generic.DetailView):
-    """Конкретный автор"""
+class AuthorDetailView(ConditionalGetMixin, CachedPageMixin, generic.DetailView):
+    """Конкретный автор.
+
+    Книги автора выводятся постранично, число экземпляров и доступных
+    экземпляров берётся из счётчиков книги (Book.copies_*).
+    """
     model = Author
+    paginate_books_by = 10
+    cache_name = 'author-detail'
+
+    def get_cache_tags(self):
+        return ['author:%s' % self.kwargs['pk']]
+
+    def get_validators(self):
+        row = Author.objects.filter(pk=self.kwargs['pk']).annotate(books_updated_at=Max('book__updated_at')) \
+            .values_list('updated_at', 'books_updated_at').first()
+        if row is None:
+            return None, None
+        last_modified = max(value for value in row if value)
+        return last_modified.isoformat(), last_modified
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = Paginator(self.object.book_set.all(), self.paginate_books_by)
+        page_obj = paginator.get_page(self.request.GET.get('page'))
+        context.update({
+            'book_list': page_obj.object_list,
+            'paginator': paginator,
+            'page_obj': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+        })
+        return context
+
+
+def search(request):
+    """Полнотекстовый поиск книг по названию, описанию, автору и жанрам"""
+    query = request.GET.get('q', '').strip()
+    try:
+        results, next_cursor = book_search.search(query, request.GET.get('cursor'), per_page=10)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+
+    return render(
+        request,
+        'catalog/search.html',
+        context={'query': query, 'results': results, 'next_cursor': next_cursor},
+    )
+
 
+class AsyncViewMixin:
+    """Делает представление-класс корутиной для ASGI.
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+    В Django 4.0 у View нет асинхронных обработчиков, а ORM синхронный,
+    поэтому обработка запроса целиком выполняется через sync_to_async.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        sync_view = sync_to_async(view)
+
+        async def async_view(request, *args, **kwargs):
+            return await sync_view(request, *args, **kwargs)
+
+        return update_wrapper(async_view, view)
+
+
+class LoanedBooksByUserListView(AsyncViewMixin, LoginRequiredMixin, KeysetPaginationMixin, generic.ListView):
     """Книги конкретного пользователя"""
     model = BookInstance
     template_name = 'catalog/bookinstance_list_borrowed_user.html'
     paginate_by = 10
 
     def get_queryset(self):
-        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o').order_by('due_back')
+        return BookInstance.objects.filter(borrower=self.request.user).filter(status__exact='o') \
+            .select_related('book').order_by('due_back')
 
 
-class LoanedBooksAllListView(PermissionRequiredMixin, generic.ListView):
+class LoanedBooksAllListView(AsyncViewMixin, PermissionRequiredMixin, KeysetPaginationMixin, generic.ListView):
     """Все книги на руках"""
     model = BookInstance
     permission_required = 'catalog.can_mark_returned'
@@ -72,7 +233,7 @@ class LoanedBooksAllListView(PermissionRequiredMixin, generic.ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact='o').order_by('due_back')
+        return BookInstance.objects.filter(status__exact='o').select_related('book', 'borrower').order_by('due_back')
 
 
 @login_required
@@ -103,6 +264,69 @@ def renew_book_librarian(request, pk):
     return render(request, 'catalog/book_renew_librarian.html', context)
 
 
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+@require_POST
+def bulk_loans(request):
+    """Продление или возврат библиотекарем сразу нескольких книг"""
+    form = BulkLoanForm(request.POST)
+    if not form.is_valid():
+        return render(request, 'catalog/bookinstance_bulk_result.html', {'form': form}, status=400)
+
+    copies = form.cleaned_data['copies']
+    if form.cleaned_data['action'] == BulkLoanForm.RENEW:
+        result = loans.renew(copies, form.cleaned_data['weeks'])
+    else:
+        result = loans.mark_returned(copies)
+
+    found = BookInstance.objects.select_related('book').in_bulk(result.rejected)
+    rejected = [(found.get(pk, pk), reason) for pk, reason in result.rejected.items()]
+    context = {
+        'form': form,
+        'num_updated': len(result.updated),
+        'rejected': rejected,
+    }
+    return render(request, 'catalog/bookinstance_bulk_result.html', context)
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def export(request, dataset, file_format):
+    """Потоковая выгрузка книг, экземпляров или выданных книг (?gzip=1 - со сжатием)"""
+    gzip = request.GET.get('gzip') == '1'
+    try:
+        content = exports.stream(dataset, file_format, gzip=gzip)
+    except KeyError:
+        raise Http404('Unknown export')
+
+    response = StreamingHttpResponse(content, content_type=exports.FORMATS[file_format])
+    filename = '%s.%s%s' % (dataset, file_format, '.gz' if gzip else '')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    if gzip:
+        response['Content-Type'] = 'application/gzip'
+    return response
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def cache_stats(request):
+    """Попадания и промахи кэша страниц каталога (?reset=1 - обнулить)"""
+    stats = caching.stats()
+    for values in stats.values():
+        total = values['hits'] + values['misses']
+        values['hit_rate'] = round(values['hits'] / total, 3) if total else None
+    if request.GET.get('reset') == '1':
+        caching.reset_stats()
+    return JsonResponse(stats)
+
+
+def metrics(request):
+    """Метрики запросов и кэша для Prometheus; доступны с INTERNAL_IPS и сотрудникам"""
+    if not request_metrics.is_internal(request):
+        return HttpResponseForbidden()
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 class AuthorCreate(PermissionRequiredMixin, CreateView):
     """Создание автора"""
     model = Author
@@ -128,14 +352,14 @@ class AuthorDelete(PermissionRequiredMixin, DeleteView):
 class BookCreate(PermissionRequiredMixin, CreateView):
     """Создание книги"""
     model = Book
-    fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language']
+    form_class = BookForm
     permission_required = 'catalog.can_mark_returned'
 
 
 class BookUpdate(PermissionRequiredMixin, UpdateView):
     """Обновление книги"""
     model = Book
-    fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language']
+    form_class = BookForm
     permission_required = 'catalog.can_mark_returned'
 
 
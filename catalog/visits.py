@@ -0,0 +1,36 @@
+"""Счётчик посещений домашней страницы.
+
+По умолчанию счётчик хранится в подписанной cookie, поэтому посещение не
+записывает сессию в базу. Прежнее поведение (счётчик в сессии) включается
+настройкой CATALOG_VISITS_STORAGE = 'session'.
+"""
+from django.conf import settings
+from django.core import signing
+
+KEY = 'num_visits'
+SALT = 'catalog.visits'
+MAX_AGE = 365 * 24 * 60 * 60
+
+
+def use_session():
+    return getattr(settings, 'CATALOG_VISITS_STORAGE', 'cookie') == 'session'
+
+
+def get_visits(request):
+    """Номер текущего посещения посетителя, начиная с 1."""
+    if use_session():
+        return request.session.get(KEY, 1)
+    try:
+        return max(1, int(request.get_signed_cookie(KEY, salt=SALT, max_age=MAX_AGE)))
+    except (KeyError, ValueError, signing.BadSignature):
+        return 1
+
+
+def remember_visit(request, response, num_visits):
+    """Сохраняет номер следующего посещения."""
+    if use_session():
+        request.session[KEY] = num_visits + 1
+    else:
+        response.set_signed_cookie(KEY, num_visits + 1, salt=SALT, max_age=MAX_AGE,
+                                   httponly=True, samesite='Lax')
+    return response
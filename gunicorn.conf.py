@@ -0,0 +1,42 @@
+"""Настройки gunicorn (читаются из текущего каталога автоматически).
+
+WSGI, синхронные воркеры - каждый воркер ждёт базу на каждом запросе:
+
+    gunicorn locallibrary.wsgi
+
+ASGI, воркеры uvicorn - index и списки выданных книг асинхронные, все
+middleware проекта (metrics, replicas, querylog, storage.WhiteNoiseMiddleware)
+работают в асинхронной цепочке без перехода в поток; счётчики index читаются
+параллельно. ORM в Django 4.0 синхронный, поэтому сами запросы к базе идут
+в потоках sync_to_async:
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn locallibrary.asgi
+
+Замер benchmark_http (1 CPU, SQLite, 5000 книг и 50000 экземпляров,
+WEB_CONCURRENCY=2, 1000 запросов, concurrency 50, DEBUG = True):
+
+    url                  sync req/s  p99 ms   uvicorn req/s  p99 ms
+    /catalog/                   152     415             150     483
+    /catalog/mybooks/           198     279             131     615
+    /catalog/borrowed/          117     465              84     839
+
+На одном ядре и с базой, отвечающей за доли миллисекунды, переходы между
+потоками и циклом событий стоят дороже, чем ожидание базы, - синхронные
+воркеры быстрее. ASGI имеет смысл с удалённой базой (PostgreSQL по сети),
+медленными клиентами и долгими соединениями; сравните до перехода.
+
+У каждого воркера своя память: кэш страниц каталога включается только с
+общим кэшем (CACHE_URL в locallibrary/settings.py).
+
+Для сравнения развёртываний при одинаковой нагрузке:
+
+    python manage.py benchmark_http http://127.0.0.1:8000 http://127.0.0.1:8001 --concurrency 50
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:%s' % os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+accesslog = '-'
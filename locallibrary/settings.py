@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 
 from pathlib import Path
 import os
+from urllib.parse import urlsplit
+
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,8 +34,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # первым, чтобы в общее время попадали остальные middleware
+    'catalog.metrics.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'catalog.storage.WhiteNoiseMiddleware',
+    'catalog.replicas.ReplicaPinMiddleware',
+    'catalog.querylog.QueryLogMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -46,7 +52,8 @@ ROOT_URLCONF = 'locallibrary.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендеринга для Server-Timing
+        'BACKEND': 'catalog.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -94,14 +101,82 @@ USE_TZ = True
 
 LOGIN_REDIRECT_URL = '/'
 
+# Адреса, с которых /metrics доступен без входа (сервер Prometheus)
+INTERNAL_IPS = ['127.0.0.1']
+
+# Курсорная пагинация списков каталога вместо ?page=N (см. catalog/pagination.py)
+CATALOG_KEYSET_PAGINATION = False
+
+# Где хранить счётчик посещений домашней страницы: 'cookie' (без записи
+# сессии в базу на каждый запрос) или 'session'
+CATALOG_VISITS_STORAGE = 'cookie'
+
+# Кэш, общий для всех процессов (воркеров gunicorn и management-команд):
+# CACHE_URL=redis://host:6379/0 (нужен пакет redis), memcached://host:11211
+# (пакет pymemcache) или db://catalog_cache (после manage.py createcachetable).
+# Без CACHE_URL кэш свой у каждого процесса.
+CACHE_URL = urlsplit(os.environ.get('CACHE_URL', ''))
+CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', CACHE_URL.geturl()),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', CACHE_URL.netloc),
+    'db': ('django.core.cache.backends.db.DatabaseCache', CACHE_URL.netloc),
+}
+if CACHE_URL.scheme:
+    backend, location = CACHE_BACKENDS[CACHE_URL.scheme]
+    CACHES = {'default': {'BACKEND': backend, 'LOCATION': location, 'KEY_PREFIX': 'locallibrary'}}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'locallibrary',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Время жизни кэша страниц каталога для анонимных посетителей, в секундах;
+# 0 отключает кэш (см. catalog/caching.py). Версии тегов должны быть общими
+# для всех процессов, поэтому с локальным кэшем он выключен (проверка catalog.E002)
+CATALOG_PAGE_CACHE_TIMEOUT = 300 if CACHE_URL.scheme else 0
+
+# Журнал медленных и повторяющихся SQL-запросов (см. catalog/querylog.py)
+CATALOG_QUERY_LOG = False
+# Запросы дольше стольких миллисекунд пишутся в журнал с планом EXPLAIN
+CATALOG_SLOW_QUERY_MS = 100
+# Одинаковый SQL больше стольких раз за HTTP-запрос считается N+1
+CATALOG_DUPLICATE_QUERY_LIMIT = 5
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
 
+# Реплики для чтения каталога (см. catalog/replicas.py), через запятую, например
+# DATABASE_REPLICA_URLS=sqlite:////tmp/replica.sqlite3 - копия db.sqlite3
+CATALOG_REPLICAS = []
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), 1):
+    alias = 'replica%d' % number
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=500)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    CATALOG_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['catalog.replicas.ReplicaRouter']
+
+# Сколько секунд после записи посетитель читает из основной базы
+CATALOG_REPLICA_STICKY_SECONDS = 5
+# Реплика, отстающая больше чем на столько секунд, пропускается
+CATALOG_REPLICA_MAX_LAG = 10
+# Как часто перепроверять доступность и отставание реплики, в секундах
+CATALOG_REPLICA_CHECK_INTERVAL = 5
+
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATIC_URL = '/static/'
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+# WhiteNoise: хэш в имени, сжатые .gz/.br копии и CSS-бандлы (см. catalog/storage.py)
+STATICFILES_STORAGE = 'catalog.storage.CatalogStaticFilesStorage'
+
+# Бандл: исходные файлы склеиваются и минифицируются при collectstatic
+CATALOG_STATIC_BUNDLES = {
+    'css/catalog.css': ['css/layout.css', 'css/styles.css'],
+}
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
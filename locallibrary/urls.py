@@ -19,6 +19,7 @@ from django.views.generic import RedirectView
 from django.urls import include
 from django.conf import settings
 from django.conf.urls.static import static
+from catalog import views as catalog_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -37,3 +38,7 @@ urlpatterns += [
 urlpatterns += [
     path('accounts/', include('django.contrib.auth.urls')),
 ]
+
+urlpatterns += [
+    path('metrics', catalog_views.metrics, name='metrics'),
+]